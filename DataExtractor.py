@@ -7,17 +7,38 @@
 # Credit to https://github.com/GerbenJavado/LinkFinder for the idea and regex
 #
 
-import re
+import os
+import sys
 import json
-import base64
-import binascii
 import string
 import random
-from urlparse import *
-
-from burp import IBurpExtender, IScannerCheck, ITab
+import threading
+
+try:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+except NameError:
+    pass
+
+from dataextractor_core.log import _print, trace, formatTrace
+from dataextractor_core.config import *
+from dataextractor_core.engine import ScanEngine
+from dataextractor_core.response import Response
+from dataextractor_core.workers import ScanPool, POLICIES
+from dataextractor_core.stats import formatStats
+from dataextractor_core.content import burpMimeType, parseMimeTypes
+from dataextractor_core.store import exportFormat
+from dataextractor_core.rescan import BodyCache, RescanJob, RESCAN_SOURCES
+from dataextractor_core.lint import lintPatterns, formatReports
+from dataextractor_core.registry import REGEX_BACKENDS
+
+from burp import IBurpExtender, IScannerCheck, ITab, IExtensionStateListener, IScopeChangeListener
 
 from java.lang import Runnable
+from java.lang import String
+from java.lang import Exception as JavaException
+from java.security import MessageDigest
+from java.nio import ByteBuffer
+from java.nio.charset import StandardCharsets
 
 from java.awt import EventQueue
 from java.awt import Font, Color, Dimension
@@ -34,12 +55,20 @@ from javax.swing import JTabbedPane
 from javax.swing import JScrollPane
 from javax.swing import JSplitPane
 from javax.swing import GroupLayout
+from javax.swing import JList
+from javax.swing import AbstractListModel
+from javax.swing import JComboBox
+from javax.swing import Timer
+from javax.swing import JProgressBar
+from javax.swing import JOptionPane
 
 
 EXTENSION_HELP = """- A single click on any "Apply changes" button will save all your settings
 
 - Settings / Follow scope rules:
-do not parse out of scope urls as defined in the target scope tab
+do not parse out of scope urls as defined in the target scope tab,
+the verdicts of Burp's scope are cached per host, or per path prefix when the scope rules look at the path, and forgotten when the scope changes.
+Their hit rate is in the Stats tab
 
 - Settings / Remove duplicates:
 remove duplicates from datas tabs
@@ -48,20 +77,102 @@ remove duplicates from datas tabs
 do not parse urls with those extensions
 
 
+- Settings / Results cache:
+identical bodies (same vendor bundle on several hosts, cache-busting query strings...) are only grepped once, their results are replayed from the cache.
+The cache is emptied as soon as a config or a "Remove from results" list changes
+
+- Settings / Scan workers:
+responses are queued and grepped by those threads so Burp's own scanner isn't slowed down, 0 means grepping on Burp's threads.
+When the queue is full: "spill" (default) saves the response in a temporary file until a worker is free, "drop" skips it, "block" holds Burp's thread until there's a free slot
+
+- Settings / Pattern timeout:
+time budget of one regexp on one response, a slower regexp is reported in the output with the url and its key.
+After "quarantine after" overruns it's not run anymore until its config is changed, 0 disables the budget.
+The budget is checked between two matches, best-effort: a single catastrophic search can't be interrupted and is reported when it returns.
+With the java regexp engine, the regexps that can backtrack (nested quantifiers, a .* followed by something else) and the ones already over the budget
+once are stopped during the search, at the cost of a slower read of the response. With re, check the patterns flagged with nested quantifiers
+like (a+)+ in Custom tab / Patterns check
+
+- Settings / Max body size:
+bodies bigger than this (in KB) are not grepped, 0 means no limit.
+Each tab can override it, leave its "Max body size" field empty to use the global one
+
+- Settings / Ignore content types:
+do not parse responses of those MIME types (wildcards allowed), comma separated: image/*,font/*,application/zip,...
+the types come from the Content-Type header, Burp's stated and inferred MIME types and the first bytes of the body (PNG, JPEG, WOFF, ZIP, PDF... signatures),
+"binary" matches any body full of NUL or control chars. The body is sniffed without a Content-Type or with application/octet-stream, only the long signatures
+are checked against another type, a declared text/*, JSON or JavaScript is never sniffed. Only the headers and the first 512 bytes are read, the response is not decoded
+
+- Settings / Store directory:
+the datas of every tab are saved in there (one folder per tab) with their key, the url where they were first found and when they were first/last seen,
+they're loaded back when the extension starts. Empty by default: the datas can be secrets, they're kept in memory only and lost when Burp is closed.
+"Choose..." picks the directory, it's used once the settings are applied
+
+- Settings / Re-scan on changes:
+when the config of a tab is applied, its new or modified regexps are run in the background over the responses already seen:
+"cache" keeps the last in-scope responses compressed in memory (up to "body cache" MB), "proxy" reads Burp's proxy history, "off" only greps the next responses.
+The re-scan pauses while the live scan has responses waiting, its progress is displayed in the tab where it can be cancelled
+
+- Settings / Urls per data:
+the urls where every data was found are kept in memory (the first one is also in the store), "Show urls" in the tab lists them for the selected datas.
+Above that number of urls a random sample is kept with the count, 0 keeps them all. The memory used is in the Stats tab
+
+- Settings / Regexp engine:
+"java" runs the regexps with java.util.regex straight on Burp's bytes, way faster than Jython's re, "re" is python's,
+"auto" is java. The few regexps java can't run the same way (conditionals, verbose flag) stay on re whatever the setting
+
+- Settings / Trace events:
+the last steps of the scan are kept in memory whatever the verbose mode: url, step (scope, url, content, validators, cache, patterns, timeout, queue),
+verdict and duration. That many events are kept, 0 disables it. "Dump trace" in the Stats tab saves them, to see what happens under load
+without the console output of the verbose mode
+
 - Settings / Ignore files:
 do not parse those files (regexps allowed), JSON format: ["jquery.min.js",".png",...]
 important: regexps here are case insentitive by design
 
+- Stats:
+for every tab and every regexp: bytes scanned, time spent (total, median, 95th percentile, max), matches, results removed or deduplicated, cache hits,
+"skipped" counts the responses where the regexp wasn't run because none of its literal strings were in the response.
+Also the time of each step before the regexps: scope, extension and file checks, decoding of the response.
+The keywords entries are all run in one pass, their time is in the "keywords" step.
+A regexp found in several tabs is only run once per response, its time is counted in the first tab having it.
+A response with the same ETag / Last-Modified / Content-Length as the last one scanned on its url is replayed from the cache without reading its body
+(unless some regexps read the headers), 304 responses are ignored: both are counted with the bytes not read.
+Refreshed every second while the tab is displayed, "Export as JSON" saves everything.
+"Dump trace" saves the last steps of the scan (see Settings / Trace events) as text, or as JSON with a .json file name
+
 - Custom tab / Config:
 list of regexps to search, JSON format: {"key1":"regexp1","?key2":"regexp2",...}
 if the first character of the key is a '?'or a '*', the key will not be printed in the datas tab
 important: regexps here are NOT case sentitive, use "(?i)" as a prefix of the whole regexp to make it insentitive
 important: you should have at least 1 group configured using parenthesis "()" to be able to catch something,
 group(1) is used as a result so to ignore a group, please use "?:" as a prefix of the group itself
+regexps only run on the body of the responses, to also grep the headers use: {"key1":{"regexp":"regexp1","headers":true},...}
+or run a regexp on a part of the response only: {"key1":{"regexp":"regexp1","target":"script"},...}, the targets are "body", "full" (headers and body),
+"headers", "url", "script" (the <script> blocks), "attributes" (the href and src values) and "json" (the string values of a JSON body, unescaped).
+Each target is extracted once per response, in a single pass, its slices are separated by a newline. Their time is in the "targets" step
+fixed strings (API key prefixes, hostnames, parameter names...) are better as a keywords entry: {"key1":{"keywords":["AKIA","ASIA"],"after":"[A-Z0-9]{16}"},...},
+the keywords of all the tabs are found in a single pass whatever their number. The result is the keyword with "before" chars before it and "after" chars after it,
+"after" can also be a regexp matched right after the keyword (the keyword is ignored if it doesn't match), "ignorecase":true and "headers":true are supported too, "target" only with "body" or "full"
+
+- Custom tab / Content types:
+"Ignore content types" is added to the global list for this tab only,
+when "Only content types" is set the tab only parses those types, the global list is not used (e.g. "image/svg+xml" to grep SVG files)
 
 - Custom tab / Remove from results:
 remove those results from datas tab (regexps allowed), JSON format: ["http://$","application/javacript",...]
 important: regexps here are case insentitive by design
+
+- Custom tab / Patterns check:
+on "Apply changes" every regexp is checked and timed on a small built-in sample of JS/HTML/JSON, its cost is given in ms per MB of responses.
+Flagged: no capture group (nothing is reported), leading or trailing greedy .*, nested quantifiers like (a+)+ (not timed, they can hang), no literal string
+the prefilter can use, slow regexps. A cheaper rewrite is suggested when there's one
+
+- Custom tab / Datas:
+type some text in the filter field then press enter to only display the matching datas (case insensitive),
+"Remove selected" deletes the selected datas, they will be added again if they're found again.
+With a store directory only the last 10000 datas (or the last 10000 matching the filter) are displayed, the others stay on disk,
+"Export" writes all of them: as CSV (value, key, url, first and last seen) or JSON if the file ends with .csv or .json, else one data per line
 """
 
 EXTENSION_ABOUT = """Created by Gwendal Le Coguic
@@ -71,26 +182,109 @@ https://github.com/gwen001/DataExtractor
 """
 
 EXTENSION_SETTINGS_KEY = "DataExtractorSettings"
-DEFAULT_SETTINGS_REMOVE_DUPLICATES = True
-DEFAULT_SETTINGS_VERBOSE_MODE = False
-DEFAULT_SETTINGS_SCOPE_ONLY = True
-DEFAULT_SETTINGS_IGNORE_EXTENSIONS = "css,ico,gif,jpg,jpeg,png,bmp,svg,avi,mpg,mpeg,mp3,m3u8,woff,woff2,ttf,eot,mp3,mp4,wav,mpg,mpeg,avi,mov,wmv,doc,xls,pdf,zip,tar,7z,rar,tgz,gz,exe,rtp"
-DEFAULT_SETTINGS_IGNORE_FILES = ""
-# DEFAULT_SETTINGS_IGNORE_EXTENSIONS = ['css','ico','gif','jpg','jpeg','png','bmp','svg','avi','mpg','mpeg','mp3','m3u8','woff','woff2','ttf','eot','mp3','mp4','wav','mpg','mpeg','avi','mov','wmv','doc','xls','pdf','zip','tar','7z','rar','tgz','gz','exe','rtp']
-
-EXTRACTOR_DEFAULT_CONFIG = ""
-EXTRACTOR_DEFAULT_EXCLUDE = ""
-EXTRACTOR_DEFAULT_ENABLED = True
 
+# Settings and Stats come first, the extractor i is at tab index i + EXTRACTOR_TAB_OFFSET
+EXTRACTOR_TAB_OFFSET = 1
+
+
+
+# Burp's byte[] is converted once and shared by all the extractors,
+# only the part being asked for (usually the body) is converted
+class BurpResponse(Response):
+    def __init__(self, helpers, url, response):
+        Response.__init__(self, url, None, None)
+        self._helpers = helpers
+        self.response = response
+        # analyzed by the worker thread, not by Burp's
+        self.info = None
+
+    def getInfo(self):
+        if self.info is None:
+            self.info = self._helpers.analyzeResponse(self.response)
+        return self.info
+
+    def getBodyOffset(self):
+        return self.getInfo().getBodyOffset()
+
+    def getStatusCode(self):
+        return self.getInfo().getStatusCode()
+
+    def getBodySize(self):
+        # the byte[] isn't converted
+        return len(self.response)-self.getBodyOffset()
+
+    def getHead(self, size):
+        if self.body is not None:
+            return self.body[:size]
+        return String(self.response, self.getBodyOffset(), min(size, len(self.response)-self.getBodyOffset()), "ISO-8859-1")
+
+    def getMimeTypes(self):
+        t_types = Response.getMimeTypes(self)
+        for mime in (burpMimeType(self.getInfo().getStatedMimeType()), burpMimeType(self.getInfo().getInferredMimeType())):
+            if mime is not None and not mime in t_types:
+                t_types.append( mime )
+        return t_types
+
+    def getHeaders(self):
+        if self.headers is None:
+            self.headers = String(self.response, 0, self.getBodyOffset(), "ISO-8859-1")
+        return self.headers
+
+    def getBody(self):
+        if self.body is None:
+            self.body = String(self.response, self.getBodyOffset(), len(self.response)-self.getBodyOffset(), "ISO-8859-1")
+        return self.body
+
+    def getFull(self):
+        return String(self.response, 0, len(self.response), "ISO-8859-1")
+
+    def getBodySequence(self):
+        # a view of the byte[] for the java regexps, no python string
+        return StandardCharsets.ISO_8859_1.decode(ByteBuffer.wrap(self.response, self.getBodyOffset(), len(self.response)-self.getBodyOffset()))
+
+    def getFullSequence(self):
+        return StandardCharsets.ISO_8859_1.decode(ByteBuffer.wrap(self.response))
+
+    def getDigest(self, headers=False):
+        # straight from the byte[], no conversion needed
+        md = MessageDigest.getInstance("MD5")
+        if headers:
+            md.update(self.response, 0, len(self.response))
+        else:
+            md.update(self.response, self.getBodyOffset(), len(self.response)-self.getBodyOffset())
+        return "".join([ "%02x" % (b & 0xff) for b in md.digest() ])
 
 
-globalVerboseMode = DEFAULT_SETTINGS_VERBOSE_MODE
 
-class _print:
-    def __init__(self, txt):
-        global globalVerboseMode
-        if globalVerboseMode:
-            print(txt)
+# source of the re-scans, see dataextractor_core/rescan.py
+class ProxyHistory():
+    def __init__(self, callbacks, helpers, engine):
+        self._callbacks = callbacks
+        self._helpers = helpers
+        self.engine = engine
+        self.history = None
+
+    def getHistory(self):
+        if self.history is None:
+            self.history = self._callbacks.getProxyHistory()
+        return self.history
+
+    def count(self):
+        return len(self.getHistory())
+
+    def iterResponses(self):
+        for ihrr in self.getHistory():
+            response = ihrr.getResponse()
+            if response is None:
+                continue
+            try:
+                requestURL = self._helpers.analyzeRequest(ihrr).getUrl()
+                if not self.engine.checkUrl(requestURL):
+                    continue
+            except UnicodeEncodeError:
+                _print("Error in URL decode.")
+                continue
+            yield BurpResponse(self._helpers, requestURL, response)
 
 
 
@@ -104,19 +298,30 @@ class Run(Runnable):
 
 
 
-class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
+class BurpExtender(IBurpExtender, IScannerCheck, ITab, IExtensionStateListener, IScopeChangeListener, FocusListener):
     def registerExtenderCallbacks(self, callbacks):
         self._callbacks = callbacks
         self._helpers = callbacks.getHelpers()
         self._callbacks.setExtensionName("DataExtractor")
+        self.engine = ScanEngine(self._callbacks.isInScope)
+        self.engine.setScope( self.getScopeConfig() )
+        self.pool = None
+        self.bodyCache = None
+        # eid -> RescanJob
+        self.rescans = {}
 
         # self.resetSettings(None)
         self.initSettings()
 
         self._callbacks.registerScannerCheck(self)
+        self._callbacks.registerExtensionStateListener(self)
+        self._callbacks.registerScopeChangeListener(self)
         self.initUI()
         self._callbacks.addSuiteTab(self)
 
+        self.statsTimer = Timer(1000, self.refreshStats)
+        self.statsTimer.start()
+
         print("DataExtractor loaded.")
         print("Copyright (c) 2021 Gwendal Le Coguic")
 
@@ -129,6 +334,7 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
 
         self.loadSettings()
         self.drawSettingsTab()
+        self.drawStatsTab()
 
         for k,item in self._settings["extractors"].items():
             if "id" in item:
@@ -151,7 +357,19 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
                 enabled = item["enabled"]
             else:
                 enabled = EXTRACTOR_DEFAULT_ENABLED
-            self.addNewTab(eid,name,config,exclude,enabled)
+            if "maxBodySize" in item:
+                maxBodySize = parseMaxBodySize(item["maxBodySize"])
+            else:
+                maxBodySize = EXTRACTOR_DEFAULT_MAX_BODY_SIZE
+            if "contentAllow" in item:
+                contentAllow = item["contentAllow"]
+            else:
+                contentAllow = EXTRACTOR_DEFAULT_CONTENT_ALLOW
+            if "contentDeny" in item:
+                contentDeny = item["contentDeny"]
+            else:
+                contentDeny = EXTRACTOR_DEFAULT_CONTENT_DENY
+            self.addNewTab(eid,name,config,exclude,enabled,maxBodySize,contentAllow,contentDeny)
 
         self.addNewButton()
 
@@ -197,22 +415,159 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
         self.settingsVerboseModeOptionButton.setBounds(10, 420, 250, 30)
         self.settingsPane.add( self.settingsVerboseModeOptionButton )
 
+        self.settingsCacheLabel = JLabel("Results cache:")
+        self.settingsCacheLabel.setBounds(10, 460, 150, 30)
+        self.settingsPane.add( self.settingsCacheLabel )
+
+        self.settingsCacheEntriesText = JTextField( str(self._settings["cacheEntries"]) )
+        self.settingsCacheEntriesText.setBounds(150, 460, 80, 30)
+        self.settingsPane.add( self.settingsCacheEntriesText )
+
+        self.settingsCacheSizeLabel = JLabel("responses, max MB:")
+        self.settingsCacheSizeLabel.setBounds(240, 460, 130, 30)
+        self.settingsPane.add( self.settingsCacheSizeLabel )
+
+        self.settingsCacheSizeText = JTextField( str(self._settings["cacheSize"]) )
+        self.settingsCacheSizeText.setBounds(370, 460, 60, 30)
+        self.settingsPane.add( self.settingsCacheSizeText )
+
+        self.settingsWorkersLabel = JLabel("Scan workers:")
+        self.settingsWorkersLabel.setBounds(10, 495, 150, 30)
+        self.settingsPane.add( self.settingsWorkersLabel )
+
+        self.settingsWorkersText = JTextField( str(self._settings["workers"]) )
+        self.settingsWorkersText.setBounds(150, 495, 80, 30)
+        self.settingsPane.add( self.settingsWorkersText )
+
+        self.settingsQueueSizeLabel = JLabel("threads, queue size:")
+        self.settingsQueueSizeLabel.setBounds(240, 495, 130, 30)
+        self.settingsPane.add( self.settingsQueueSizeLabel )
+
+        self.settingsQueueSizeText = JTextField( str(self._settings["queueSize"]) )
+        self.settingsQueueSizeText.setBounds(370, 495, 60, 30)
+        self.settingsPane.add( self.settingsQueueSizeText )
+
+        self.settingsQueuePolicyLabel = JLabel("when full:")
+        self.settingsQueuePolicyLabel.setBounds(440, 495, 70, 30)
+        self.settingsPane.add( self.settingsQueuePolicyLabel )
+
+        self.settingsQueuePolicyCombo = JComboBox( list(POLICIES) )
+        self.settingsQueuePolicyCombo.setSelectedItem( self._settings["queuePolicy"] )
+        self.settingsQueuePolicyCombo.setBounds(510, 495, 80, 30)
+        self.settingsPane.add( self.settingsQueuePolicyCombo )
+
+        self.settingsPatternTimeoutLabel = JLabel("Pattern timeout (ms):")
+        self.settingsPatternTimeoutLabel.setBounds(10, 530, 150, 30)
+        self.settingsPane.add( self.settingsPatternTimeoutLabel )
+
+        self.settingsPatternTimeoutText = JTextField( str(self._settings["patternTimeout"]) )
+        self.settingsPatternTimeoutText.setBounds(150, 530, 80, 30)
+        self.settingsPane.add( self.settingsPatternTimeoutText )
+
+        self.settingsQuarantineAfterLabel = JLabel("quarantine after:")
+        self.settingsQuarantineAfterLabel.setBounds(240, 530, 130, 30)
+        self.settingsPane.add( self.settingsQuarantineAfterLabel )
+
+        self.settingsQuarantineAfterText = JTextField( str(self._settings["quarantineAfter"]) )
+        self.settingsQuarantineAfterText.setBounds(370, 530, 60, 30)
+        self.settingsPane.add( self.settingsQuarantineAfterText )
+
+        self.settingsMaxBodySizeLabel = JLabel("Max body size (KB):")
+        self.settingsMaxBodySizeLabel.setBounds(10, 565, 150, 30)
+        self.settingsPane.add( self.settingsMaxBodySizeLabel )
+
+        self.settingsMaxBodySizeText = JTextField( str(self._settings["maxBodySize"]) )
+        self.settingsMaxBodySizeText.setBounds(150, 565, 80, 30)
+        self.settingsPane.add( self.settingsMaxBodySizeText )
+
+        self.settingsIgnoreContentTypesLabel = JLabel("Ignore content types:")
+        self.settingsIgnoreContentTypesLabel.setBounds(10, 600, 150, 30)
+        self.settingsPane.add( self.settingsIgnoreContentTypesLabel )
+
+        self.settingsIgnoreContentTypesText = JTextField( self._settings["ignoreContentTypes"] )
+        self.settingsIgnoreContentTypesText.setBounds(150, 600, 400, 30)
+        self.settingsPane.add( self.settingsIgnoreContentTypesText )
+
+        self.settingsStoreDirectoryLabel = JLabel("Store directory:")
+        self.settingsStoreDirectoryLabel.setBounds(10, 635, 150, 30)
+        self.settingsPane.add( self.settingsStoreDirectoryLabel )
+
+        self.settingsStoreDirectoryText = JTextField( self._settings["storeDirectory"] )
+        self.settingsStoreDirectoryText.setBounds(150, 635, 400, 30)
+        self.settingsPane.add( self.settingsStoreDirectoryText )
+
+        self.settingsStoreDirectoryButton = JButton("Choose...", actionPerformed=self.chooseStoreDirectory)
+        self.settingsStoreDirectoryButton.setBounds(560, 635, 100, 30)
+        self.settingsPane.add( self.settingsStoreDirectoryButton )
+
+        self.settingsRescanLabel = JLabel("Re-scan on changes:")
+        self.settingsRescanLabel.setBounds(10, 670, 150, 30)
+        self.settingsPane.add( self.settingsRescanLabel )
+
+        self.settingsRescanCombo = JComboBox( list(RESCAN_SOURCES) )
+        self.settingsRescanCombo.setSelectedItem( self._settings["rescan"] )
+        self.settingsRescanCombo.setBounds(150, 670, 80, 30)
+        self.settingsPane.add( self.settingsRescanCombo )
+
+        self.settingsBodyCacheSizeLabel = JLabel("body cache (MB):")
+        self.settingsBodyCacheSizeLabel.setBounds(240, 670, 120, 30)
+        self.settingsPane.add( self.settingsBodyCacheSizeLabel )
+
+        self.settingsBodyCacheSizeText = JTextField( str(self._settings["bodyCacheSize"]) )
+        self.settingsBodyCacheSizeText.setBounds(360, 670, 60, 30)
+        self.settingsPane.add( self.settingsBodyCacheSizeText )
+
+        self.settingsProvenanceUrlsLabel = JLabel("Urls per data:")
+        self.settingsProvenanceUrlsLabel.setBounds(10, 705, 150, 30)
+        self.settingsPane.add( self.settingsProvenanceUrlsLabel )
+
+        self.settingsProvenanceUrlsText = JTextField( str(self._settings["provenanceUrls"]) )
+        self.settingsProvenanceUrlsText.setToolTipText("a sample above that, 0: all of them")
+        self.settingsProvenanceUrlsText.setBounds(150, 705, 80, 30)
+        self.settingsPane.add( self.settingsProvenanceUrlsText )
+
+        self.settingsRegexBackendLabel = JLabel("Regexp engine:")
+        self.settingsRegexBackendLabel.setBounds(240, 705, 120, 30)
+        self.settingsPane.add( self.settingsRegexBackendLabel )
+
+        self.settingsRegexBackendCombo = JComboBox( list(REGEX_BACKENDS) )
+        self.settingsRegexBackendCombo.setSelectedItem( self._settings["regexBackend"] )
+        self.settingsRegexBackendCombo.setBounds(360, 705, 80, 30)
+        self.settingsPane.add( self.settingsRegexBackendCombo )
+
+        self.settingsTraceSizeLabel = JLabel("Trace events:")
+        self.settingsTraceSizeLabel.setBounds(450, 705, 100, 30)
+        self.settingsPane.add( self.settingsTraceSizeLabel )
+
+        self.settingsTraceSizeText = JTextField( str(self._settings["traceSize"]) )
+        self.settingsTraceSizeText.setToolTipText("0: disabled")
+        self.settingsTraceSizeText.setBounds(550, 705, 60, 30)
+        self.settingsPane.add( self.settingsTraceSizeText )
+
+        self.settingsCacheStatsLabel = JLabel("")
+        self.settingsCacheStatsLabel.setBounds(10, 740, 580, 30)
+        self.settingsPane.add( self.settingsCacheStatsLabel )
+
+        self.settingsQueueStatsLabel = JLabel("")
+        self.settingsQueueStatsLabel.setBounds(10, 765, 580, 30)
+        self.settingsPane.add( self.settingsQueueStatsLabel )
+
         self.settingsSaveButton = JButton("Apply changes", actionPerformed=self.saveSettings)
-        self.settingsSaveButton.setBounds(10, 500, 150, 30)
+        self.settingsSaveButton.setBounds(10, 810, 150, 30)
         self.settingsPane.add( self.settingsSaveButton )
 
         self.settingsResetButton = JButton("Reset extension", actionPerformed=self.resetSettings)
-        self.settingsResetButton.setBounds(200, 500, 150, 30)
+        self.settingsResetButton.setBounds(200, 810, 150, 30)
         self.settingsResetButton.setForeground(Color(255,255,255))
         self.settingsResetButton.setBackground(Color(255,102,52))
         self.settingsPane.add( self.settingsResetButton )
 
         resetWarning1 = JLabel("Warning: you're gonna lose all your datas.")
-        resetWarning1.setBounds(200, 525, 350, 30)
+        resetWarning1.setBounds(200, 835, 350, 30)
         self.settingsPane.add( resetWarning1 )
 
         resetWarning2 = JLabel("Extension reload required.")
-        resetWarning2.setBounds(200, 540, 350, 30)
+        resetWarning2.setBounds(200, 850, 350, 30)
         self.settingsPane.add( resetWarning2 )
 
         self.helpAboutPane = JPanel()
@@ -252,6 +607,100 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
 
         self.extensionPane.addTab("Settings", self.wholeShitPane)
 
+    def drawStatsTab(self):
+        self.statsPane = JPanel()
+
+        self.statsLabel = JLabel("Stats:")
+        self.statsLabel.setFont(Font("Tahoma", Font.BOLD, 14))
+        self.statsLabel.setForeground(Color(255,102,52))
+
+        self.statsRefreshButton = JButton("Refresh", actionPerformed=self.refreshStatsTab)
+
+        self.statsExportButton = JButton("Export as JSON", actionPerformed=self.exportStats)
+
+        self.statsTraceButton = JButton("Dump trace", actionPerformed=self.dumpTrace)
+
+        self.statsResetButton = JButton("Reset the stats", actionPerformed=self.resetStats)
+        self.statsResetButton.setForeground(Color(255,255,255))
+        self.statsResetButton.setBackground(Color(255,102,52))
+
+        self.statsTextArea = JTextArea("")
+        self.statsTextArea.setEditable(False)
+        self.statsTextArea.setFont(Font("Consolas", Font.PLAIN, 12))
+
+        self.statsPanel = JScrollPane()
+        self.statsPanel.setViewportView(self.statsTextArea)
+
+        statsLayout = GroupLayout(self.statsPane)
+        statsLayout.setAutoCreateGaps(True)
+        statsLayout.setAutoCreateContainerGaps(True)
+        self.statsPane.setLayout(statsLayout)
+
+        statsLayout.setHorizontalGroup(
+            statsLayout.createSequentialGroup()
+            .addGroup(statsLayout.createParallelGroup()
+                    .addGroup(statsLayout.createSequentialGroup()
+                        .addComponent(self.statsLabel)
+                        .addGap(50)
+                        .addComponent(self.statsRefreshButton)
+                        .addComponent(self.statsExportButton)
+                        .addComponent(self.statsTraceButton)
+                        .addGap(50)
+                        .addComponent(self.statsResetButton)
+                    )
+                    .addComponent(self.statsPanel)
+            )
+        )
+
+        statsLayout.setVerticalGroup(
+            statsLayout.createSequentialGroup()
+            .addGroup(statsLayout.createParallelGroup(GroupLayout.Alignment.BASELINE)
+                    .addComponent(self.statsLabel)
+                    .addComponent(self.statsRefreshButton)
+                    .addComponent(self.statsExportButton)
+                    .addComponent(self.statsTraceButton)
+                    .addComponent(self.statsResetButton)
+            )
+            .addGroup(statsLayout.createParallelGroup()
+                    .addComponent(self.statsPanel)
+            )
+        )
+
+        self.extensionPane.addTab("Stats", self.statsPane)
+
+    def refreshStatsTab(self, event):
+        self.statsTextArea.setText( formatStats(self.engine.getStats()) )
+
+    def resetStats(self, event):
+        self.engine.stats.reset()
+        self.refreshStatsTab(event)
+
+    def exportStats(self, event):
+        chooseFile = JFileChooser()
+        ret = chooseFile.showDialog(self.extensionPane, "Choose file")
+        if ret != JFileChooser.APPROVE_OPTION:
+            return
+        filename = chooseFile.getSelectedFile().getCanonicalPath()
+        print("Export stats to : " + filename)
+        fp = open(filename, 'w')
+        fp.write( json.dumps(self.engine.getStats(), indent=2, sort_keys=True) )
+        fp.close()
+
+    def dumpTrace(self, event):
+        chooseFile = JFileChooser()
+        ret = chooseFile.showDialog(self.extensionPane, "Choose file")
+        if ret != JFileChooser.APPROVE_OPTION:
+            return
+        filename = chooseFile.getSelectedFile().getCanonicalPath()
+        print("Dump trace to : " + filename)
+        t_events = trace.dump()
+        fp = open(filename, 'w')
+        if filename.endswith(".json"):
+            fp.write( json.dumps(t_events, indent=2, sort_keys=True) )
+        else:
+            fp.write( formatTrace(t_events)+"\n" )
+        fp.close()
+
     def addNewButton(self):
         self.newPane = JPanel()
         self.newPane.setName("...")
@@ -269,16 +718,16 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
     def generateExtractorId(self, size=10, chars=string.ascii_lowercase + string.digits):
         return ''.join(random.choice(chars) for _ in range(size))
 
-    def addNewTab(self, eid=None, name=None, config=None, exclude=None, enabled=True):
+    def addNewTab(self, eid=None, name=None, config=None, exclude=None, enabled=True, maxBodySize=None, contentAllow="", contentDeny=""):
         tabCounter = len(self.extractors) + 1
         if eid is None:
             eid = self.generateExtractorId()
         if name is None:
             name = str(tabCounter)
         print("New tab: id="+eid+", name="+name)
-        self.extractors[tabCounter] = Extractor(self, eid, name, config, exclude, enabled)
-        self.extensionPane.insertTab(name, None, self.extractors[tabCounter].mainPane, None, tabCounter)
-        self.extensionPane.setSelectedIndex(tabCounter)
+        self.extractors[tabCounter] = Extractor(self, eid, name, config, exclude, enabled, maxBodySize, contentAllow, contentDeny)
+        self.extensionPane.insertTab(name, None, self.extractors[tabCounter].mainPane, None, tabCounter+EXTRACTOR_TAB_OFFSET)
+        self.extensionPane.setSelectedIndex(tabCounter+EXTRACTOR_TAB_OFFSET)
 
     def getTabIndexFromId(self, tabid):
         for i in range(1,len(self.extractors)+1):
@@ -288,13 +737,16 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
     def removeTab( self, tabid ):
         tabIndex = self.getTabIndexFromId( tabid )
         print("Remove tab: "+self.extractors[tabIndex].name+" ("+str(tabid)+").")
+        # its datas go away with it
+        self.cancelRescan( tabid )
+        self.engine.removeExtractor( tabid, True )
 
-        self.extensionPane.removeTabAt( tabIndex )
+        self.extensionPane.removeTabAt( tabIndex+EXTRACTOR_TAB_OFFSET )
         if tabIndex == len(self.extractors):
             newFocusedTab = tabIndex - 1
         else:
             newFocusedTab = tabIndex
-        self.extensionPane.setSelectedIndex( newFocusedTab )
+        self.extensionPane.setSelectedIndex( newFocusedTab+EXTRACTOR_TAB_OFFSET )
 
         # _print(len(self.extractors))
         # for i in range(1,len(self.extractors)+1):
@@ -317,13 +769,8 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
         self.saveSettings(None)
 
     def initSettings(self):
-        self._settings = {}
-        self._settings["extractors"] = {}
-        self._settings["verboseMode"] = DEFAULT_SETTINGS_VERBOSE_MODE
-        self._settings["scopeOnly"] = DEFAULT_SETTINGS_SCOPE_ONLY
-        self._settings["removeDuplicates"] = DEFAULT_SETTINGS_REMOVE_DUPLICATES
-        self._settings["ignoreExtensions"] = DEFAULT_SETTINGS_IGNORE_EXTENSIONS
-        self._settings["ignoreFiles"] = DEFAULT_SETTINGS_IGNORE_FILES
+        self.engine.initSettings()
+        self._settings = self.engine.settings
 
     def resetSettings(self, event):
         self._callbacks.saveExtensionSetting(EXTENSION_SETTINGS_KEY,None)
@@ -332,11 +779,33 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
         self.initSettings()
         self.postLoadSettings()
 
+    def chooseStoreDirectory(self, event):
+        chooseFile = JFileChooser()
+        chooseFile.setFileSelectionMode(JFileChooser.DIRECTORIES_ONLY)
+        if chooseFile.showDialog(self.extensionPane, "Choose directory") != JFileChooser.APPROVE_OPTION:
+            return
+        self.settingsStoreDirectoryText.setText( chooseFile.getSelectedFile().getCanonicalPath() )
+
     def saveSettings(self, event):
         self._settings["verboseMode"] = self.settingsVerboseModeOptionButton.isSelected()
         self._settings["scopeOnly"] = self.settingsScopeOptionButton.isSelected()
         self._settings["removeDuplicates"] = self.settingsRemoveDuplicatesButton.isSelected()
         self._settings["ignoreExtensions"] = self.settingsIgnoreExtensionsText.text
+        self._settings["cacheEntries"] = self.getIntSetting(self.settingsCacheEntriesText, DEFAULT_SETTINGS_CACHE_ENTRIES)
+        self._settings["cacheSize"] = self.getIntSetting(self.settingsCacheSizeText, DEFAULT_SETTINGS_CACHE_SIZE)
+        self._settings["workers"] = self.getIntSetting(self.settingsWorkersText, DEFAULT_SETTINGS_WORKERS)
+        self._settings["queueSize"] = self.getIntSetting(self.settingsQueueSizeText, DEFAULT_SETTINGS_QUEUE_SIZE)
+        self._settings["queuePolicy"] = self.settingsQueuePolicyCombo.getSelectedItem()
+        self._settings["patternTimeout"] = self.getIntSetting(self.settingsPatternTimeoutText, DEFAULT_SETTINGS_PATTERN_TIMEOUT)
+        self._settings["quarantineAfter"] = self.getIntSetting(self.settingsQuarantineAfterText, DEFAULT_SETTINGS_QUARANTINE_AFTER)
+        self._settings["maxBodySize"] = self.getIntSetting(self.settingsMaxBodySizeText, DEFAULT_SETTINGS_MAX_BODY_SIZE)
+        self._settings["ignoreContentTypes"] = self.settingsIgnoreContentTypesText.text
+        self._settings["storeDirectory"] = self.settingsStoreDirectoryText.text.strip()
+        self._settings["rescan"] = self.settingsRescanCombo.getSelectedItem()
+        self._settings["bodyCacheSize"] = self.getIntSetting(self.settingsBodyCacheSizeText, DEFAULT_SETTINGS_BODY_CACHE_SIZE)
+        self._settings["provenanceUrls"] = self.getIntSetting(self.settingsProvenanceUrlsText, DEFAULT_SETTINGS_PROVENANCE_URLS)
+        self._settings["regexBackend"] = self.settingsRegexBackendCombo.getSelectedItem()
+        self._settings["traceSize"] = self.getIntSetting(self.settingsTraceSizeText, DEFAULT_SETTINGS_TRACE_SIZE)
 
         self._settings["ignoreFiles"] = self.settingsIgnoreFilesTextArea.text
         if len(self.settingsIgnoreFilesTextArea.text):
@@ -349,7 +818,7 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
         self._settings["extractors"] = {}
 
         for i in range(1,len(self.extractors)+1):
-            self.extensionPane.setTitleAt(i,self.extractors[i].tabNameText.text)
+            self.extensionPane.setTitleAt(i+EXTRACTOR_TAB_OFFSET,self.extractors[i].tabNameText.text)
             self.extractors[i].saveSettings(None, False)
             self._settings["extractors"][i] = {}
             self._settings["extractors"][i]["id"] = self.extractors[i].eid
@@ -357,6 +826,9 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
             self._settings["extractors"][i]["enabled"] = self.extractors[i].enabled
             self._settings["extractors"][i]["config"] = self.extractors[i].configTextArea.text
             self._settings["extractors"][i]["exclude"] = self.extractors[i].excludeTextArea.text
+            self._settings["extractors"][i]["maxBodySize"] = self.extractors[i].maxBodySize
+            self._settings["extractors"][i]["contentAllow"] = self.extractors[i].contentAllow
+            self._settings["extractors"][i]["contentDeny"] = self.extractors[i].contentDeny
 
         to_save = {}
         to_save["verboseMode"] = self._settings["verboseMode"]
@@ -364,6 +836,21 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
         to_save["removeDuplicates"] = self._settings["removeDuplicates"]
         to_save["ignoreExtensions"] = self._settings["ignoreExtensions"]
         to_save["ignoreFiles"] = self._settings["ignoreFiles"]
+        to_save["cacheEntries"] = self._settings["cacheEntries"]
+        to_save["cacheSize"] = self._settings["cacheSize"]
+        to_save["workers"] = self._settings["workers"]
+        to_save["queueSize"] = self._settings["queueSize"]
+        to_save["queuePolicy"] = self._settings["queuePolicy"]
+        to_save["patternTimeout"] = self._settings["patternTimeout"]
+        to_save["quarantineAfter"] = self._settings["quarantineAfter"]
+        to_save["maxBodySize"] = self._settings["maxBodySize"]
+        to_save["ignoreContentTypes"] = self._settings["ignoreContentTypes"]
+        to_save["storeDirectory"] = self._settings["storeDirectory"]
+        to_save["rescan"] = self._settings["rescan"]
+        to_save["bodyCacheSize"] = self._settings["bodyCacheSize"]
+        to_save["provenanceUrls"] = self._settings["provenanceUrls"]
+        to_save["regexBackend"] = self._settings["regexBackend"]
+        to_save["traceSize"] = self._settings["traceSize"]
         to_save["extractors"] = self._settings["extractors"]
 
         self._callbacks.saveExtensionSetting(EXTENSION_SETTINGS_KEY,json.dumps(to_save))
@@ -397,81 +884,166 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
             self._settings["ignoreExtensions"] = settings["ignoreExtensions"]
         if "ignoreFiles" in settings:
             self._settings["ignoreFiles"] = settings["ignoreFiles"]
+        if "cacheEntries" in settings:
+            self._settings["cacheEntries"] = settings["cacheEntries"]
+        if "cacheSize" in settings:
+            self._settings["cacheSize"] = settings["cacheSize"]
+        if "workers" in settings:
+            self._settings["workers"] = settings["workers"]
+        if "queueSize" in settings:
+            self._settings["queueSize"] = settings["queueSize"]
+        if "queuePolicy" in settings:
+            self._settings["queuePolicy"] = settings["queuePolicy"]
+        if "patternTimeout" in settings:
+            self._settings["patternTimeout"] = settings["patternTimeout"]
+        if "quarantineAfter" in settings:
+            self._settings["quarantineAfter"] = settings["quarantineAfter"]
+        if "maxBodySize" in settings:
+            self._settings["maxBodySize"] = settings["maxBodySize"]
+        if "ignoreContentTypes" in settings:
+            self._settings["ignoreContentTypes"] = settings["ignoreContentTypes"]
+        if "storeDirectory" in settings:
+            self._settings["storeDirectory"] = settings["storeDirectory"]
+        if "rescan" in settings:
+            self._settings["rescan"] = settings["rescan"]
+        if "bodyCacheSize" in settings:
+            self._settings["bodyCacheSize"] = settings["bodyCacheSize"]
+        if "provenanceUrls" in settings:
+            self._settings["provenanceUrls"] = settings["provenanceUrls"]
+        if "regexBackend" in settings:
+            self._settings["regexBackend"] = settings["regexBackend"]
+        if "traceSize" in settings:
+            self._settings["traceSize"] = settings["traceSize"]
         if "extractors" in settings:
             self._settings["extractors"] = settings["extractors"]
 
         self.postLoadSettings()
 
+    def getIntSetting(self, field, default):
+        try:
+            return int(field.text)
+        except ValueError as e:
+            print("Invalid number! ("+field.text+")")
+            field.setText(str(default))
+            return default
+
     def postLoadSettings(self):
-        global globalVerboseMode
-        globalVerboseMode = self._settings["verboseMode"]
+        storeDirectory = self.engine.storeDirectory
+        self.engine.postLoadSettings()
+        self.updatePool()
+        self.updateBodyCache()
+        if self.engine.storeDirectory != storeDirectory:
+            for i in range(1,len(self.extractors)+1):
+                self.extractors[i].loadDatas()
+
+    def updatePool(self):
+        t_pool = (int(self._settings["workers"]), max(int(self._settings["queueSize"]),1), self._settings["queuePolicy"])
+        if self.pool is not None and (self.pool.workers, self.pool.queueSize, self.pool.policy) == t_pool:
+            return
+        old = self.pool
+        self.pool = None
+        if t_pool[0] > 0:
+            self.pool = ScanPool(self.scanResponse, t_pool[0], t_pool[1], t_pool[2])
+        if old is not None:
+            # the old workers finish their queue in the background
+            threading.Thread(target=old.shutdown, args=(60,)).start()
+
+    def updateBodyCache(self):
+        if self._settings["rescan"] != "cache":
+            self.bodyCache = None
+        elif self.bodyCache is None:
+            self.bodyCache = BodyCache(int(self._settings["bodyCacheSize"])*1024*1024)
+        else:
+            self.bodyCache.resize(int(self._settings["bodyCacheSize"])*1024*1024)
 
-        self._settings["_ignoreExtensions"] = []
-        for ext in self._settings["ignoreExtensions"].split(","):
-            self._settings["_ignoreExtensions"].append("."+ext)
+    def isBusy(self):
+        # the re-scans wait while the live scan has responses waiting
+        return self.pool is not None and self.pool.depth() > 0
 
-        self._settings["_ignoreFiles"] = []
-        self._settings["__ignoreFiles"] = []
-        if len(self._settings["ignoreFiles"]):
-            try:
-                j = json.loads(self._settings["ignoreFiles"])
-                self._settings["_ignoreFiles"] = j
-                for r in self._settings["_ignoreFiles"]:
-                    self._settings["__ignoreFiles"].append( re.compile(r, re.IGNORECASE) )
-            except ValueError as e:
-                print("Invalid JSON format! (settings:ignoreFiles)")
+    def startRescan(self, extractor, keys):
+        if self._settings["rescan"] == "cache" and self.bodyCache is not None:
+            source = self.bodyCache
+        elif self._settings["rescan"] == "proxy":
+            source = ProxyHistory(self._callbacks, self._helpers, self.engine)
+        else:
+            return
+        keys = set(keys)
+        job = self.rescans.get(extractor.eid)
+        if job is not None and job.isAlive():
+            # started again with the keys it didn't finish
+            job.cancel()
+            keys = keys | job.keys
+        print(extractor.name+": re-scan of "+", ".join(sorted(keys))+" ("+self._settings["rescan"]+").")
+        job = RescanJob(self.engine, extractor.core, keys, source, extractor.scan, None, self.isBusy)
+        job.onProgress = lambda done, total, finished: self.rescanProgress(extractor, job, done, total, finished)
+        self.rescans[extractor.eid] = job
+        job.start()
+
+    def rescanProgress(self, extractor, job, done, total, finished):
+        current = self.rescans.get(extractor.eid)
+        if current is not None and current is not job:
+            # a cancelled job replaced by a new one
+            return
+        if finished:
+            self.rescans.pop(extractor.eid, None)
+        extractor.rescanProgress(done, total, finished)
+
+    def cancelRescan(self, eid):
+        job = self.rescans.pop(eid, None)
+        if job is not None:
+            job.cancel()
+
+    def refreshStats(self, event):
+        # the datas found during the last second are written in one go
+        self.engine.flushStores()
+        stats = self.engine.cache.getStats()
+        cacheStats = "Cache: "+str(stats["entries"])+" responses, "+str(stats["size"]/1024)+" KB, "+str(stats["hits"])+" hits, "+str(stats["misses"])+" misses"
+        if self.bodyCache is not None:
+            stats = self.bodyCache.getStats()
+            cacheStats = cacheStats+" - Body cache: "+str(stats["entries"])+" responses, "+str(stats["size"]/1024)+" KB"
+        self.settingsCacheStatsLabel.setText(cacheStats)
+        if self.pool is None:
+            self.settingsQueueStatsLabel.setText("Queue: scanning on Burp's threads")
+        else:
+            stats = self.pool.getStats()
+            self.settingsQueueStatsLabel.setText("Queue: "+str(stats["queued"])+" waiting, "+str(stats["spilled"])+" on disk, "+str(stats["busy"])+" scanning, "+str(stats["processed"])+" done, "+str(stats["dropped"])+" dropped")
+        if self.extensionPane.getSelectedComponent() == self.statsPane:
+            self.refreshStatsTab(event)
 
     def doPassiveScan(self, ihrr):
         try:
             requestURL = ihrr.getUrl()
-            stringURL = str(requestURL)
-            t_url = urlparse(stringURL)
-            _print("Scanning: "+stringURL)
-            # _print(t_url.path)
-
-            if not self.checkScope(requestURL):
-                return None
-            if not self.checkExtension(t_url.path):
-                return None
-            if not self.checkFile(stringURL):
+            if not self.engine.checkUrl(requestURL):
                 return None
 
-            _print("Grepping: "+stringURL)
+            response = ihrr.getResponse()
+            if response is None:
+                return None
 
-            for i in range(1,len(self.extractors)+1):
-                self.extractors[i].scan(ihrr)
+            resp = BurpResponse(self._helpers, requestURL, response)
+            if self.pool is None:
+                self.scanResponse(resp)
+            else:
+                self.pool.submit(resp)
         except UnicodeEncodeError:
             _print("Error in URL decode.")
 
         return None
 
-    def checkFile(self, url):
-        for regexp in self._settings["__ignoreFiles"]:
-            if re.search(regexp,url):
-                _print("File ignored: "+url)
-                return False
-
-        _print("File not ignored: "+url)
-        return True
-
-    def checkScope(self, url):
-        _print("scope check: "+str(url))
-        if self._settings["scopeOnly"] and not(self._callbacks.isInScope(url)):
-            _print("OOS: "+str(url))
-            return False
-
-        _print("Scope OK: "+str(url))
-        return True
-
-    def checkExtension(self, path):
-        _print("extension check: "+path)
-        for ext in self._settings["_ignoreExtensions"]:
-            if path.endswith(ext):
-                _print("Extension ignored: "+path)
-                return False
+    def scanResponse(self, resp):
+        try:
+            # all the extractors at once, see dataextractor_core/scanplan.py
+            t_results = self.engine.extract(resp)
+            bodyCache = self.bodyCache
+            if bodyCache is not None and len(self.engine.checkContent(resp)):
+                # for the re-scans
+                bodyCache.add(resp)
 
-        _print("Extension OK: "+path)
-        return True
+            for i in range(1,len(self.extractors)+1):
+                if self.extractors[i].eid in t_results:
+                    self.extractors[i].scan(t_results[self.extractors[i].eid], resp.getUrl())
+        except UnicodeEncodeError:
+            _print("Error in URL decode.")
 
     def getTabCaption(self):
         return "DataExtractor"
@@ -482,49 +1054,132 @@ class BurpExtender(IBurpExtender, IScannerCheck, ITab, FocusListener):
     def consolidateDuplicateIssues(self, isb, isa):
         return -1
 
+    def getScopeConfig(self):
+        # JSON of the scope rules, None with the versions of Burp without it
+        try:
+            return self._callbacks.saveConfigAsJson("target.scope")
+        except (AttributeError, JavaException) as e:
+            return None
+
+    def scopeChanged(self):
+        self.engine.setScope( self.getScopeConfig() )
+        _print("Scope changed, scope verdicts cleared.")
+
     def extensionUnloaded(self):
+        self.statsTimer.stop()
+        self._callbacks.removeScopeChangeListener(self)
+        for eid in list(self.rescans):
+            self.cancelRescan(eid)
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.engine.closeStores()
         print("DataExtractor unloaded.")
         return
 
 
 
+# Datas of a tab, the JList only asks for the visible rows.
+# Must only be modified from the EDT.
+class DatasModel(AbstractListModel):
+    def __init__(self):
+        self.lines = []
+        # indexes of the lines matching the filter, None when there's no filter
+        self.visible = None
+        self.filter = ""
+        # the oldest lines are dropped above that, 0 keeps everything (no store to read them back)
+        self.windowSize = 0
+
+    def getSize(self):
+        if self.visible is None:
+            return len(self.lines)
+        return len(self.visible)
+
+    def getElementAt(self, index):
+        if self.visible is None:
+            return self.lines[index]
+        return self.lines[self.visible[index]]
+
+    def match(self, r):
+        return self.filter in r.lower()
+
+    def addLines(self, t_lines):
+        start = self.getSize()
+        first = len(self.lines)
+        self.lines.extend( t_lines )
+        if self.visible is not None:
+            for i in range(first, len(self.lines)):
+                if self.match(self.lines[i]):
+                    self.visible.append( i )
+        if self.getSize() > start:
+            self.fireIntervalAdded(self, start, self.getSize()-1)
+        if self.windowSize > 0 and len(self.lines) > self.windowSize:
+            self.trim()
+
+    def trim(self):
+        drop = len(self.lines) - self.windowSize
+        self.lines = self.lines[drop:]
+        if self.visible is None:
+            self.fireIntervalRemoved(self, 0, drop-1)
+            return
+        hidden = len([ 1 for i in self.visible if i < drop ])
+        self.visible = [ i-drop for i in self.visible[hidden:] ]
+        if hidden > 0:
+            self.fireIntervalRemoved(self, 0, hidden-1)
+
+    def setLines(self, t_lines):
+        self.lines = list(t_lines)
+        self.setFilter(self.filter)
+
+    def removeAt(self, t_indexes):
+        """Remove the rows (visible indexes), return the removed lines."""
+        t_remove = set()
+        for index in t_indexes:
+            if self.visible is None:
+                t_remove.add( index )
+            else:
+                t_remove.add( self.visible[index] )
+        t_removed = [ self.lines[i] for i in sorted(t_remove) ]
+        self.lines = [ r for i,r in enumerate(self.lines) if not i in t_remove ]
+        self.setFilter(self.filter)
+        return t_removed
+
+    def clear(self):
+        self.lines = []
+        self.setFilter(self.filter)
+
+    def setFilter(self, text):
+        self.filter = text.lower()
+        if len(self.filter):
+            self.visible = [ i for i,r in enumerate(self.lines) if self.match(r) ]
+        else:
+            self.visible = None
+        self.fireContentsChanged(self, 0, max(self.getSize()-1, 0))
+
+
+
 class Extractor():
 
-    def __init__(self, extender, eid, name, config=None, exclude=None, enabled=True):
+    def __init__(self, extender, eid, name, config=None, exclude=None, enabled=True, maxBodySize=None, contentAllow="", contentDeny=""):
         self.extender = extender
         self.eid = eid
         self.name = name
         self.enabled = enabled
+        self.maxBodySize = maxBodySize
+        self.contentAllow = contentAllow
+        self.contentDeny = contentDeny
         self.config = config
-        self._config = []
-        self.__config = {}
         self.exclude = exclude
-        self._exclude = []
-        self.__exclude = []
         self.initUI()
 
         if config and len(config):
             self.configTextArea.text = self.config
-            try:
-                j = json.loads(config)
-                self._config = j
-                self.__config = {}
-                for k,r in self._config.items():
-                    # self.__config[k] = re.compile(r,re.IGNORECASE)
-                    self.__config[k] = re.compile(r)
-            except ValueError as e:
-                print("Invalid JSON format! ("+self.name+":config)")
-
         if exclude and len(exclude):
             self.excludeTextArea.text = self.exclude
-            try:
-                j = json.loads(exclude)
-                self._exclude = j
-                self.__exclude = []
-                for r in self._exclude:
-                    self.__exclude.append( re.compile(r,re.IGNORECASE) )
-            except ValueError as e:
-                print("Invalid JSON format! ("+self.name+":exclude)")
+
+        # matching, exclusion and dedup are done by the headless core
+        self.core = self.extender.engine.addExtractor(eid, name, config, exclude, enabled, maxBodySize, contentAllow, contentDeny)
+        self.loadDatas()
 
     def initUI(self):
         self.mainPane = JSplitPane(JSplitPane.HORIZONTAL_SPLIT)
@@ -542,6 +1197,28 @@ class Extractor():
         self.tabEnabledButton = JCheckBox("Enabled")
         self.tabEnabledButton.setSelected(self.enabled)
 
+        self.maxBodySizeLabel = JLabel("Max body size (KB):")
+
+        if self.maxBodySize is None:
+            self.maxBodySizeText = JTextField("")
+        else:
+            self.maxBodySizeText = JTextField(str(self.maxBodySize))
+        self.maxBodySizeText.setToolTipText("empty: global setting, 0: no limit")
+        dim = Dimension(60, 25)
+        self.maxBodySizeText.setSize(dim)
+        self.maxBodySizeText.setMaximumSize(dim)
+        self.maxBodySizeText.setPreferredSize(dim)
+
+        self.contentAllowLabel = JLabel("Only content types:")
+
+        self.contentAllowText = JTextField(self.contentAllow)
+        self.contentAllowText.setToolTipText("comma separated, e.g. application/javascript,text/*, empty: everything not ignored")
+
+        self.contentDenyLabel = JLabel("Ignore content types:")
+
+        self.contentDenyText = JTextField(self.contentDeny)
+        self.contentDenyText.setToolTipText("comma separated, added to the global list")
+
         self.saveSettingsButton = JButton("Apply changes", actionPerformed=self.saveSettings)
 
         self.deleteTabButton = JButton("Remove this tab", actionPerformed=self.removeTab)
@@ -566,6 +1243,17 @@ class Extractor():
         self.excludePanel = JScrollPane()
         self.excludePanel.setViewportView(self.excludeTextArea)
 
+        self.lintLabel = JLabel("Patterns check:")
+        self.lintLabel.setFont(Font("Tahoma", Font.BOLD, 14))
+        self.lintLabel.setForeground(Color(255,102,52))
+
+        self.lintTextArea = JTextArea("Applied on \"Apply changes\".")
+        self.lintTextArea.setFont(Font("Consolas", Font.PLAIN, 12))
+        self.lintTextArea.setEditable(False)
+
+        self.lintPanel = JScrollPane()
+        self.lintPanel.setViewportView(self.lintTextArea)
+
         self.leftPane = JPanel()
         leftLayout = GroupLayout(self.leftPane)
         leftLayout.setAutoCreateGaps(True)
@@ -581,13 +1269,23 @@ class Extractor():
                         .addComponent(self.tabEnabledButton)
                         .addGap(50)
                         .addComponent(self.tabNameText)
+                        .addComponent(self.maxBodySizeLabel)
+                        .addComponent(self.maxBodySizeText)
                         .addComponent(self.saveSettingsButton)
                         .addGap(50)
                         .addComponent(self.deleteTabButton)
                     )
+                    .addGroup(leftLayout.createSequentialGroup()
+                        .addComponent(self.contentAllowLabel)
+                        .addComponent(self.contentAllowText)
+                        .addComponent(self.contentDenyLabel)
+                        .addComponent(self.contentDenyText)
+                    )
                     .addComponent(self.configPanel)
                     .addComponent(self.excludeLabel)
                     .addComponent(self.excludePanel)
+                    .addComponent(self.lintLabel)
+                    .addComponent(self.lintPanel)
             )
         )
 
@@ -598,10 +1296,18 @@ class Extractor():
                     .addComponent(self.configLabel)
                     .addComponent(self.tabEnabledButton)
                     .addComponent(self.tabNameText)
+                    .addComponent(self.maxBodySizeLabel)
+                    .addComponent(self.maxBodySizeText)
                     .addComponent(self.saveSettingsButton)
                     .addComponent(self.deleteTabButton)
                 )
             )
+            .addGroup(leftLayout.createParallelGroup(GroupLayout.Alignment.BASELINE)
+                    .addComponent(self.contentAllowLabel)
+                    .addComponent(self.contentAllowText)
+                    .addComponent(self.contentDenyLabel)
+                    .addComponent(self.contentDenyText)
+            )
             .addGroup(leftLayout.createParallelGroup()
                     .addComponent(self.configPanel)
             )
@@ -611,6 +1317,12 @@ class Extractor():
             .addGroup(leftLayout.createParallelGroup()
                     .addComponent(self.excludePanel)
             )
+            .addGroup(leftLayout.createParallelGroup()
+                    .addComponent(self.lintLabel)
+            )
+            .addGroup(leftLayout.createParallelGroup()
+                    .addComponent(self.lintPanel)
+            )
         )
 
         self.datasLabel = JLabel("Datas:")
@@ -623,13 +1335,42 @@ class Extractor():
         self.clearButton.setForeground(Color(255,255,255))
         self.clearButton.setBackground(Color(255,102,52))
 
-        self.datasTextArea = JTextArea("")
-        self.datasTextArea.setFont(Font("Consolas", Font.PLAIN, 12))
-        self.datasTextArea.setEditable(True)
-        self.datasTextArea.setLineWrap(True)
+        self.datasModel = DatasModel()
+        self.datasList = JList(self.datasModel)
+        self.datasList.setFont(Font("Consolas", Font.PLAIN, 12))
+        # fixed cell size so the JList never measures all the rows
+        self.datasList.setPrototypeCellValue("x"*200)
 
         self.datasPanel = JScrollPane()
-        self.datasPanel.setViewportView(self.datasTextArea)
+        self.datasPanel.setViewportView(self.datasList)
+
+        # lines found by the scanner threads, waiting to be flushed on the EDT
+        self.pendingDatas = []
+        self.pendingLock = threading.Lock()
+        # the window is being read from the store, the lines found meanwhile wait in pendingDatas
+        self.loading = False
+        # bumped by loadDatas(), an older read of the store is dropped
+        self.loadId = 0
+
+        self.filterLabel = JLabel("Filter:")
+
+        self.filterText = JTextField("", actionPerformed=self.filterDatas)
+        dim = Dimension(250, 25)
+        self.filterText.setMaximumSize(dim)
+        self.filterText.setPreferredSize(dim)
+
+        self.countLabel = JLabel("0 datas")
+
+        self.removeSelectedButton = JButton("Remove selected", actionPerformed=self.removeSelectedDatas)
+
+        self.showUrlsButton = JButton("Show urls", actionPerformed=self.showUrls)
+
+        self.rescanProgressBar = JProgressBar()
+        self.rescanProgressBar.setStringPainted(True)
+        self.rescanProgressBar.setVisible(False)
+
+        self.cancelRescanButton = JButton("Cancel re-scan", actionPerformed=self.cancelRescan)
+        self.cancelRescanButton.setVisible(False)
 
         self.rightPane = JPanel()
         rightLayout = GroupLayout(self.rightPane)
@@ -647,6 +1388,17 @@ class Extractor():
                         .addGap(50)
                         .addComponent(self.clearButton)
                     )
+                    .addGroup(rightLayout.createSequentialGroup()
+                        .addComponent(self.filterLabel)
+                        .addComponent(self.filterText)
+                        .addComponent(self.removeSelectedButton)
+                        .addComponent(self.showUrlsButton)
+                        .addGap(50)
+                        .addComponent(self.countLabel)
+                        .addGap(50)
+                        .addComponent(self.rescanProgressBar)
+                        .addComponent(self.cancelRescanButton)
+                    )
                     .addComponent(self.datasPanel)
             )
         )
@@ -660,6 +1412,15 @@ class Extractor():
                     .addComponent(self.clearButton)
                 )
             )
+            .addGroup(rightLayout.createParallelGroup(GroupLayout.Alignment.BASELINE)
+                    .addComponent(self.filterLabel)
+                    .addComponent(self.filterText)
+                    .addComponent(self.removeSelectedButton)
+                    .addComponent(self.showUrlsButton)
+                    .addComponent(self.countLabel)
+                    .addComponent(self.rescanProgressBar)
+                    .addComponent(self.cancelRescanButton)
+            )
             .addGroup(rightLayout.createParallelGroup()
                     .addComponent(self.datasPanel)
             )
@@ -673,29 +1434,21 @@ class Extractor():
         self.name = self.tabNameText.text
         self.enabled = self.tabEnabledButton.isSelected()
         self.config = self.configTextArea.text
-        self._config = []
-        self.__config = {}
-        if len(self.configTextArea.text):
-            try:
-                j = json.loads(self.configTextArea.text)
-                self._config = j
-                for k,r in self._config.items():
-                    # self.__config[k] = re.compile(r,re.IGNORECASE)
-                    self.__config[k] = re.compile(r)
-            except ValueError as e:
-                print("Invalid JSON format! ("+self.name+":config)")
-
         self.exclude = self.excludeTextArea.text
-        self._exclude = []
-        self.__exclude = []
-        if len(self.excludeTextArea.text):
-            try:
-                j = json.loads(self.excludeTextArea.text)
-                self._exclude = j
-                for r in self._exclude:
-                    self.__exclude.append( re.compile(r,re.IGNORECASE) )
-            except ValueError as e:
-                print("Invalid JSON format! ("+self.name+":exclude)")
+        self.maxBodySize = parseMaxBodySize(self.maxBodySizeText.text)
+        self.contentAllow = self.contentAllowText.text
+        self.contentDeny = self.contentDenyText.text
+
+        self.core.name = self.name
+        self.core.enabled = self.enabled
+        self.core.setMaxBodySize(self.maxBodySize)
+        self.core.setContentTypes(self.contentAllow, self.contentDeny)
+        self.core.loadConfig(self.config)
+        self.core.loadExclude(self.exclude)
+        if len(self.core.changedKeys):
+            self.checkPatterns()
+            # the new patterns are run over the responses already seen
+            self.extender.startRescan(self, self.core.changedKeys)
 
         if extenderSave:
             self.extender.saveSettings(event)
@@ -704,81 +1457,167 @@ class Extractor():
         self.extender.removeTab(self.eid)
         return None
 
+    def checkPatterns(self):
+        """Lint and time the patterns in the background, see dataextractor_core/lint.py."""
+        self.lintTextArea.setText("Checking...")
+        t_patterns = self.core.getPatterns()
+        def run():
+            text = formatReports(lintPatterns(t_patterns))
+            EventQueue.invokeLater(Run(lambda: self.lintTextArea.setText(text)))
+        threading.Thread(target=run, name="DataExtractor-lint-"+str(self.eid)).start()
+
+    def cancelRescan(self, event):
+        self.extender.cancelRescan(self.eid)
+
+    def rescanProgress(self, done, total, finished):
+        # called by the re-scan thread
+        EventQueue.invokeLater(Run(lambda: self.showRescanProgress(done, total, finished)))
+
+    def showRescanProgress(self, done, total, finished):
+        self.rescanProgressBar.setVisible(not finished)
+        self.cancelRescanButton.setVisible(not finished)
+        self.rescanProgressBar.setMaximum(max(total, 1))
+        self.rescanProgressBar.setValue(done)
+        self.rescanProgressBar.setString("re-scan "+str(done)+" / "+str(total))
+
+    def loadDatas(self):
+        """Fill the window with the last datas of the store, the ones matching the filter if any.
+        The store is read in the background: it's replayed from the start, way too long for the EDT."""
+        store = self.core.store
+        with self.pendingLock:
+            # the ones already found are in the store
+            self.pendingDatas = []
+            self.loading = store is not None
+            self.loadId = self.loadId + 1
+            loadId = self.loadId
+        if store is None:
+            self.datasModel.windowSize = 0
+            self.datasModel.setLines([])
+            self.refreshCount()
+            return
+        self.datasModel.windowSize = DATAS_WINDOW_SIZE
+        self.datasModel.filter = self.filterText.text.lower()
+        self.countLabel.setText("loading...")
+        text = self.datasModel.filter
+        def run():
+            if loadId != self.loadId:
+                # another one is on its way
+                return
+            t_lines = store.tail(DATAS_WINDOW_SIZE, lambda r: text in r.lower())
+            EventQueue.invokeLater(Run(lambda: self.showDatas(loadId, t_lines)))
+        threading.Thread(target=run, name="DataExtractor-load-"+str(self.eid)).start()
+
+    def showDatas(self, loadId, t_lines):
+        # EDT only, the window read by loadDatas() and the lines found since
+        if loadId != self.loadId:
+            return
+        with self.pendingLock:
+            t_pending = self.pendingDatas
+            self.pendingDatas = []
+            self.loading = False
+        self.datasModel.setLines(t_lines)
+        t_known = set(t_lines)
+        t_new = [ r for r in t_pending if not r in t_known ]
+        if len(t_new):
+            self.datasModel.addLines(t_new)
+        self.refreshCount()
+
     def clearDatas(self, event):
-        self.datasTextArea.setText("")
+        with self.pendingLock:
+            self.pendingDatas = []
+            # a window being read is dropped
+            self.loading = False
+            self.loadId = self.loadId + 1
+        self.datasModel.clear()
+        self.core.datas.clear()
+        self.core.provenance.clear()
+        if self.core.store is not None:
+            self.core.store.clear()
+        self.refreshCount()
+
+    def filterDatas(self, event):
+        if self.core.store is None:
+            self.datasModel.setFilter(self.filterText.text)
+            self.refreshCount()
+        else:
+            # the whole store is filtered, not only the window
+            self.loadDatas()
+
+    def removeSelectedDatas(self, event):
+        t_removed = self.datasModel.removeAt( self.datasList.getSelectedIndices() )
+        self.datasList.clearSelection()
+        # removed datas can be found again
+        for r in t_removed:
+            self.core.datas.discard(r)
+            self.core.provenance.discard(r)
+            if self.core.store is not None:
+                self.core.store.delete(r)
+        self.refreshCount()
+
+    def showUrls(self, event):
+        """Urls where the selected datas were found."""
+        lines = []
+        for r in self.datasList.getSelectedValuesList():
+            t_urls = self.core.provenance.urlsOf(r)
+            count = self.core.provenance.urlCount(r)
+            if count > len(t_urls):
+                lines.append(r+" ("+str(count)+" urls, "+str(len(t_urls))+" shown)")
+            else:
+                lines.append(r+" ("+str(count)+" urls)")
+            for url in t_urls:
+                lines.append("    "+url)
+        if not len(lines):
+            return
+        textArea = JTextArea("\n".join(lines), 20, 80)
+        textArea.setEditable(False)
+        JOptionPane.showMessageDialog(self.extender.extensionPane, JScrollPane(textArea), self.name+": urls", JOptionPane.PLAIN_MESSAGE)
+
+    def refreshCount(self):
+        if self.core.store is not None:
+            self.countLabel.setText(str(self.datasModel.getSize())+" displayed / "+str(len(self.core.datas))+" datas")
+        elif self.datasModel.visible is None:
+            self.countLabel.setText(str(len(self.datasModel.lines))+" datas")
+        else:
+            self.countLabel.setText(str(self.datasModel.getSize())+" / "+str(len(self.datasModel.lines))+" datas")
 
     def exportDatas(self, event):
         chooseFile = JFileChooser()
         ret = chooseFile.showDialog(self.extender.extensionPane, "Choose file")
+        if ret != JFileChooser.APPROVE_OPTION:
+            return
         filename = chooseFile.getSelectedFile().getCanonicalPath()
         print("Export \""+self.name+"\" to : " + filename)
-        open(filename, 'w', 0).write(self.datasTextArea.text)
-
-    def scan(self, ihrr):
-        if not self.enabled:
-            _print(self.name+": disabled.")
-            return False
-
-        t_results = []
-        t_filtered = []
-        t_nodups = []
-        t_output = []
-        t_final = []
-        t_keepkeys = {}
-        encoded_resp = binascii.b2a_base64(ihrr.getResponse())
-        decoded_resp = base64.b64decode(encoded_resp)
-        # _print(len(encoded_resp))
-        # _print(len(decoded_resp))
-
-        for k,regexp in self.__config.items():
-            # _print(regexp)
-            for m in re.finditer(regexp,decoded_resp):
-                # for i in range(0,len(m.groups())+1):
-                #     if not m.group(i) is None:
-                #         _print(str(i)+":"+m.group(i))
-                if len(m.groups()) > 0 and not m.group(1) is None:
-                    t_results.append( m.group(1) )
-                    if not k.startswith("*") and not k.startswith("?"):
-                        t_keepkeys[m.group(1)] = k
-
-        _print(self.name+": "+str(len(t_results))+" results.")
-
-        for r in t_results:
-            exclude_flag = False
-            for regexp in self.__exclude:
-                if re.search(regexp,r):
-                    exclude_flag = True
-            if not exclude_flag:
-                t_filtered.append( r )
-
-        _print(self.name+": "+str(len(t_filtered))+" filtered ("+str(len(t_results)-len(t_filtered))+" removed).")
-
-        if len(t_filtered):
-            for r in t_filtered:
-                output = ""
-                if r in t_keepkeys:
-                    output = t_keepkeys[r] + ": "
-                output = output + r
-                t_output.append( output )
-
-        if len(t_output):
-            if self.extender._settings["removeDuplicates"]:
-                t_currentdatas = self.datasTextArea.text.split("\n")
-
-                for r in t_output:
-                    if not r in t_currentdatas and not r in t_nodups:
-                        t_nodups.append( r )
-
-                _print(self.name+": "+str(len(t_nodups))+" undups ("+str(len(t_output)-len(t_nodups))+" removed).")
-                t_final = t_nodups
-            else:
-                t_final = t_output
-
-        _print(self.name+": "+str(len(t_final))+" final.")
+        if self.core.store is not None:
+            # streamed from the disk, the window only holds the last datas
+            n = self.core.store.export(filename, exportFormat(filename))
+            print(str(n)+" datas exported.")
+            return
+        fp = open(filename, 'w')
+        for r in list(self.datasModel.lines):
+            fp.write( r+"\n" )
+        fp.close()
+
+    def flushDatas(self):
+        # EDT only, all the lines found since the last flush in one go
+        with self.pendingLock:
+            if self.loading:
+                # showDatas() adds them to the window read from the store
+                return
+            t_lines = self.pendingDatas
+            self.pendingDatas = []
+        if len(t_lines):
+            self.datasModel.addLines(t_lines)
+            self.refreshCount()
+
+    def scan(self, t_output, url=None):
+        t_final = self.core.dedup(t_output, self.extender._settings["removeDuplicates"], url)
 
         if len(t_final):
-            for r in t_final:
-                self.datasTextArea.append( r+"\n" )
+            with self.pendingLock:
+                flush = not len(self.pendingDatas)
+                self.pendingDatas.extend( t_final )
+            if flush:
+                EventQueue.invokeLater(Run(self.flushDatas))
 
         return len(t_final)
 
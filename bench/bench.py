@@ -0,0 +1,322 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Throughput benchmark of the passive scan path, no Burp needed.
+#
+# python bench/bench.py                    # run and compare with bench/baselines/default.json
+# python bench/bench.py --save             # run and store the baseline
+# python bench/bench.py -c myregexp -t KEYS --size 50 --repeat 5
+# jython bench/bench.py --compare-backends   # re against java.util.regex
+# jython bench/bench.py --deadline-cost      # java with and without a pattern timeout
+#
+# The corpus is generated from a seed (dataextractor_core/corpus.py) and fed
+# through stubs of Burp's callbacks and helpers (bench/burpstub.py) the way
+# doPassiveScan() does. The baseline stores the throughput and a digest of
+# the results: a slower run fails past the tolerance, different results
+# always fail.
+#
+
+import os
+import sys
+import json
+import time
+import hashlib
+import platform
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from dataextractor_core.engine import ScanEngine
+from dataextractor_core.config import loadExtractorFile
+from dataextractor_core.corpus import CorpusGenerator
+from dataextractor_core.registry import registry, REGEX_BACKENDS
+from dataextractor_core import javaregex
+
+from burpstub import StubCallbacks, StubRequestResponse, StubBurpResponse
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(BENCH_DIR), "myregexp")
+DEFAULT_BASELINE = "default"
+DEFAULT_SIZE = 4
+DEFAULT_SEED = 1337
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.15
+TOP_PATTERNS = 15
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(prog="bench", description="DataExtractor throughput benchmark.")
+    parser.add_argument("-c", "--config", default=DEFAULT_CONFIG, help="extractors to run, default: myregexp")
+    parser.add_argument("-t", "--tab", action="append", default=[], help="only run this extractor (name), can be repeated")
+    parser.add_argument("--size", type=float, default=DEFAULT_SIZE, help="size of the corpus in MB")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed of the corpus")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs, the fastest one is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="name of the baseline in bench/baselines/")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown against the baseline, 0.15 = 15%%")
+    parser.add_argument("--cache", action="store_true", help="keep the results cache, off by default since the corpus has no duplicate")
+    parser.add_argument("--backend", choices=REGEX_BACKENDS, default="auto", help="regexp engine, java needs Jython, default: auto")
+    parser.add_argument("--compare-backends", action="store_true", help="run with every regexp engine available and compare them, no baseline")
+    parser.add_argument("--pattern-timeout", type=int, default=0, help="time budget of a pattern in ms, default: 0 (none, timings must not change the results)")
+    parser.add_argument("--deadline-cost", action="store_true", help="run java.util.regex without and with a pattern timeout and compare them, no baseline")
+    parser.add_argument("-o", "--output", help="also write the report to this JSON file")
+    return parser.parse_args(argv)
+
+
+def peakMemory():
+    """Peak resident size of the process in MB, None when unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return round(peak / 1024.0 / 1024.0, 1)
+    return round(peak / 1024.0, 1)
+
+
+def buildEngine(args, callbacks):
+    settings, t_items = loadExtractorFile(args.config)
+    engine = ScanEngine(callbacks.isInScope)
+    if not args.cache:
+        settings["cacheEntries"] = 0
+    # timings must not change the results
+    settings["patternTimeout"] = args.pattern_timeout
+    settings["storeDirectory"] = ""
+    settings["verboseMode"] = False
+    settings["regexBackend"] = args.backend
+    engine.loadSettings(settings)
+
+    t_tabs = [ name.lower() for name in args.tab ]
+    for i,item in enumerate(t_items):
+        if len(t_tabs) and not item["name"].lower() in t_tabs:
+            continue
+        engine.addExtractor(item["id"] or str(i+1), item["name"], item["config"], item["exclude"], item["enabled"], item["maxBodySize"], item["contentAllow"], item["contentDeny"])
+    return engine
+
+
+def buildTraffic(args):
+    t_traffic = []
+    for resp in CorpusGenerator(args.seed).generate(int(args.size * 1024 * 1024)):
+        t_traffic.append( StubRequestResponse(resp.getUrl(), resp.getHeaders()+resp.getBody()) )
+    return t_traffic
+
+
+def runOnce(engine, callbacks, t_traffic):
+    """Same steps as doPassiveScan() and Extractor.scan(), returns the datas of every tab."""
+    helpers = callbacks.getHelpers()
+    t_datas = {}
+    for extractor in engine.extractors:
+        t_datas[extractor.name] = []
+    rejected = 0
+
+    for ihrr in t_traffic:
+        requestURL = ihrr.getUrl()
+        if not engine.checkUrl(requestURL):
+            rejected = rejected + 1
+            continue
+        response = ihrr.getResponse()
+        if response is None:
+            continue
+        t_results = engine.extract( StubBurpResponse(helpers, requestURL, response) )
+        for extractor in engine.extractors:
+            if extractor.eid in t_results:
+                t_datas[extractor.name].extend( extractor.dedup(t_results[extractor.eid], engine.settings["removeDuplicates"], requestURL) )
+
+    return t_datas, rejected
+
+
+def _bytes(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+
+def resultsDigest(t_datas):
+    md = hashlib.md5()
+    for name in sorted(t_datas):
+        md.update( _bytes(name+"\n") )
+        for r in t_datas[name]:
+            md.update( _bytes(r+"\n") )
+    return md.hexdigest()
+
+
+def topPatterns(t_stats):
+    t_patterns = []
+    for tab in t_stats["tabs"].values():
+        for key, pattern in tab["patterns"].items():
+            t_pattern = {}
+            t_pattern["tab"] = tab["name"]
+            t_pattern["key"] = key
+            t_pattern["runs"] = pattern["time"]["count"]
+            t_pattern["total"] = pattern["time"]["total"]
+            t_pattern["p95"] = pattern["time"]["p95"]
+            t_pattern["max"] = pattern["time"]["max"]
+            t_patterns.append( t_pattern )
+    t_patterns.sort(key=lambda p: -p["total"])
+    return t_patterns[:TOP_PATTERNS]
+
+
+def runBench(args):
+    callbacks = StubCallbacks()
+    t_traffic = buildTraffic(args)
+    size = sum([ len(ihrr.getResponse()) for ihrr in t_traffic ])
+
+    best = None
+    for i in range(max(args.repeat, 1)):
+        # a new engine every time: empty dedup index and cache
+        engine = buildEngine(args, callbacks)
+        start = time.time()
+        t_datas, rejected = runOnce(engine, callbacks, t_traffic)
+        elapsed = time.time() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, engine, t_datas, rejected)
+
+    elapsed, engine, t_datas, rejected = best
+    report = {}
+    report["python"] = platform.python_implementation()+" "+platform.python_version()
+    report["backend"] = registry.backend
+    report["config"] = os.path.basename(args.config)
+    report["tabs"] = [ extractor.name for extractor in engine.extractors ]
+    report["corpus"] = {"seed": args.seed, "size": args.size, "responses": len(t_traffic), "bytes": size}
+    report["time"] = round(elapsed, 3)
+    report["mbPerSecond"] = round(size / 1024.0 / 1024.0 / elapsed, 3)
+    report["responsesPerSecond"] = round(len(t_traffic) / elapsed, 1)
+    report["peakMemory"] = peakMemory()
+    report["rejected"] = rejected
+    report["results"] = dict([ (name, len(t_lines)) for name, t_lines in t_datas.items() ])
+    report["resultsDigest"] = resultsDigest(t_datas)
+    report["patterns"] = topPatterns(engine.getStats())
+    # java regexps read through a DeadlineSequence when there's a budget
+    report["guarded"] = 0
+    if args.pattern_timeout and engine.plan is not None:
+        report["guarded"] = len([ entry for entry in engine.plan.entries if entry.native and entry.risky ])
+    return report
+
+
+def printReport(report):
+    print("Corpus: "+str(report["corpus"]["responses"])+" responses, "+str(report["corpus"]["bytes"])+" bytes, seed "+str(report["corpus"]["seed"])+" ("+report["python"]+", "+report["backend"]+")")
+    print("Time: "+str(report["time"])+"s, "+str(report["mbPerSecond"])+" MB/s, "+str(report["responsesPerSecond"])+" responses/s, peak memory: "+str(report["peakMemory"])+" MB")
+    print("Rejected: "+str(report["rejected"])+" responses")
+    for name in report["tabs"]:
+        print("  "+name+": "+str(report["results"][name])+" datas")
+    print("Slowest patterns:")
+    for pattern in report["patterns"]:
+        print("  %-40s %6d runs %10.1f ms  p95 %8.3f ms  max %8.3f ms" % ((pattern["tab"]+" / "+pattern["key"])[:40], pattern["runs"], pattern["total"], pattern["p95"], pattern["max"]))
+
+
+def compareReport(report, baseline, tolerance):
+    """Return the list of regressions against the baseline."""
+    t_errors = []
+    if report["corpus"] != baseline["corpus"] or report["tabs"] != baseline["tabs"]:
+        t_errors.append("corpus or tabs differ from the baseline, run with the same options or --save a new one")
+        return t_errors
+    if report["resultsDigest"] != baseline["resultsDigest"]:
+        for name in report["tabs"]:
+            if report["results"].get(name) != baseline["results"].get(name):
+                t_errors.append(name+": "+str(report["results"].get(name))+" datas, "+str(baseline["results"].get(name))+" in the baseline")
+        t_errors.append("results differ from the baseline ("+report["resultsDigest"]+" != "+baseline["resultsDigest"]+")")
+    ratio = report["mbPerSecond"] / baseline["mbPerSecond"]
+    print("Throughput: "+str(round(ratio*100, 1))+"% of the baseline ("+str(baseline["mbPerSecond"])+" MB/s, "+baseline["python"]+")")
+    if ratio < 1 - tolerance:
+        t_errors.append("throughput dropped by "+str(round((1-ratio)*100, 1))+"%, tolerance is "+str(round(tolerance*100, 1))+"%")
+    return t_errors
+
+
+def compareBackends(args):
+    """Run the bench with re and java.util.regex, return the list of differences."""
+    t_reports = []
+    for backend in ("re", "java"):
+        if backend == "java" and not javaregex.available():
+            print("java: skipped, java.util.regex is only available under Jython")
+            continue
+        args.backend = backend
+        report = runBench(args)
+        printReport(report)
+        t_reports.append( report )
+
+    t_errors = []
+    for report in t_reports[1:]:
+        ratio = report["mbPerSecond"] / t_reports[0]["mbPerSecond"]
+        print(report["backend"]+": "+str(round(ratio*100, 1))+"% of the throughput of "+t_reports[0]["backend"])
+        if report["resultsDigest"] != t_reports[0]["resultsDigest"]:
+            for name in report["tabs"]:
+                if report["results"].get(name) != t_reports[0]["results"].get(name):
+                    t_errors.append(name+": "+str(report["results"].get(name))+" datas with "+report["backend"]+", "+str(t_reports[0]["results"].get(name))+" with "+t_reports[0]["backend"])
+            t_errors.append("results of "+report["backend"]+" differ from "+t_reports[0]["backend"])
+    return t_errors
+
+
+def deadlineCost(args):
+    """Run java.util.regex without and with a pattern timeout, return the list of differences."""
+    if not javaregex.available():
+        print("java: skipped, java.util.regex is only available under Jython")
+        return []
+    args.backend = "java"
+    t_reports = []
+    # a budget nothing goes over: the results must be the same
+    for timeout in (0, 60000):
+        args.pattern_timeout = timeout
+        report = runBench(args)
+        printReport(report)
+        t_reports.append( report )
+
+    t_errors = []
+    ratio = t_reports[1]["mbPerSecond"] / t_reports[0]["mbPerSecond"]
+    print("pattern timeout: "+str(round(ratio*100, 1))+"% of the throughput without, "+str(t_reports[1]["guarded"])+" regexps read through a DeadlineSequence")
+    if t_reports[1]["resultsDigest"] != t_reports[0]["resultsDigest"]:
+        t_errors.append("results with a pattern timeout differ from the ones without")
+    return t_errors
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parseArgs(argv)
+
+    if args.compare_backends or args.deadline_cost:
+        if args.compare_backends:
+            t_errors = compareBackends(args)
+        else:
+            t_errors = deadlineCost(args)
+        for error in t_errors:
+            print("REGRESSION: "+error)
+        if len(t_errors):
+            return 1
+        print("OK")
+        return 0
+
+    report = runBench(args)
+    printReport(report)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+
+    filename = os.path.join(BENCH_DIR, "baselines", args.baseline+".json")
+    if args.save:
+        with open(filename, 'w') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+        print("Baseline saved: "+filename)
+        return 0
+
+    if not os.path.isfile(filename):
+        print("No baseline found: "+filename)
+        return 0
+
+    t_errors = compareReport(report, json.load(open(filename, 'r')), args.tolerance)
+    for error in t_errors:
+        print("REGRESSION: "+error)
+    if len(t_errors):
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
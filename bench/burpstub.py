@@ -0,0 +1,92 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Minimal stand-ins for Burp's callbacks, helpers and IHttpRequestResponse,
+# enough to drive the passive scan path of the extension without Burp.
+#
+
+from dataextractor_core.response import Response, HEADERS_SEPARATORS
+
+
+class StubResponseInfo():
+
+    def __init__(self, bodyOffset):
+        self.bodyOffset = bodyOffset
+
+    def getBodyOffset(self):
+        return self.bodyOffset
+
+
+class StubHelpers():
+
+    def analyzeResponse(self, response):
+        for sep in HEADERS_SEPARATORS:
+            pos = response.find(sep)
+            if pos >= 0:
+                return StubResponseInfo(pos+len(sep))
+        return StubResponseInfo(len(response))
+
+
+class StubCallbacks():
+
+    def __init__(self, inScope=None):
+        self.helpers = StubHelpers()
+        self.inScope = inScope
+        self.settings = {}
+
+    def getHelpers(self):
+        return self.helpers
+
+    def isInScope(self, url):
+        if self.inScope is None:
+            return True
+        return self.inScope(url)
+
+    def saveExtensionSetting(self, name, value):
+        self.settings[name] = value
+
+    def loadExtensionSetting(self, name):
+        return self.settings.get(name)
+
+
+class StubRequestResponse():
+    """IHttpRequestResponse, the response is the raw text, one char per byte."""
+
+    def __init__(self, url, response):
+        self.url = url
+        self.response = response
+
+    def getUrl(self):
+        return self.url
+
+    def getResponse(self):
+        return self.response
+
+
+class StubBurpResponse(Response):
+    """Same lazy split as the extension's BurpResponse, on a str instead of a byte[]."""
+
+    def __init__(self, helpers, url, response):
+        Response.__init__(self, url, None, None)
+        self._helpers = helpers
+        self.response = response
+        self.bodyOffset = None
+
+    def getBodyOffset(self):
+        if self.bodyOffset is None:
+            self.bodyOffset = self._helpers.analyzeResponse(self.response).getBodyOffset()
+        return self.bodyOffset
+
+    def getBodySize(self):
+        return len(self.response)-self.getBodyOffset()
+
+    def getHeaders(self):
+        if self.headers is None:
+            self.headers = self.response[:self.getBodyOffset()]
+        return self.headers
+
+    def getBody(self):
+        if self.body is None:
+            self.body = self.response[self.getBodyOffset():]
+        return self.body
@@ -0,0 +1,8 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Scanning core of the Burp extension, usable without Burp (see cli.py).
+#
+
+from dataextractor_core.engine import ScanEngine, ExtractorEngine
@@ -0,0 +1,5 @@
+import sys
+
+from dataextractor_core.cli import main
+
+sys.exit(main())
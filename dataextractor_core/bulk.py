@@ -0,0 +1,88 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Offline bulk mode: the saved traffic is split in tasks (see sources.iterTasks)
+# grepped by a pool of processes, one engine each. The results come back in
+# the input order and are deduplicated by the engine of the main process, so
+# the output is the same as a single process run.
+#
+
+from collections import deque
+
+try:
+    import multiprocessing
+except ImportError:
+    # Jython
+    multiprocessing = None
+
+from dataextractor_core.log import trace
+from dataextractor_core.sources import iterTasks, iterTask
+
+
+# bytes of responses sent to a worker at once
+BULK_BATCH_SIZE = 4*1024*1024
+# tasks queued per worker, the inputs are read no further ahead
+BULK_TASKS_PER_WORKER = 4
+
+# engine of the worker process
+_engine = None
+
+
+def cpuCount():
+    if multiprocessing is None:
+        return 1
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def initWorker(buildEngine, args):
+    global _engine
+    _engine = buildEngine(args, False)
+
+
+def scanTask(task):
+    """Return the (url, {eid: lines}) found in the task before deduplication, the stats and the trace."""
+    t_found = []
+    for resp in iterTask(task):
+        if not _engine.checkUrl(resp.getUrl()):
+            continue
+        t_results = _engine.extract(resp)
+        if len(t_results):
+            t_found.append( (resp.getUrl(), t_results) )
+    return t_found, _engine.stats.drain(), trace.drain()
+
+
+def collect(engine, result):
+    t_found, t_counters, t_events = result.get()
+    engine.stats.merge(t_counters)
+    trace.extend(t_events)
+    for url, t_results in t_found:
+        for extractor in engine.extractors:
+            if extractor.eid in t_results:
+                yield (extractor, extractor.dedup(t_results[extractor.eid], engine.settings["removeDuplicates"], url))
+
+
+def scanBulk(engine, paths, buildEngine, args, jobs):
+    """Same as engine.scan() over every Response of the inputs, yields (extractor, lines).
+
+    buildEngine(args, store) must be a module level function, it builds the
+    engine of each worker (store is False, only the main process writes it).
+    """
+    pool = multiprocessing.Pool(jobs, initWorker, (buildEngine, args))
+    pending = deque()
+    try:
+        for task in iterTasks(paths, BULK_BATCH_SIZE):
+            pending.append( pool.apply_async(scanTask, (task,)) )
+            while len(pending) >= jobs * BULK_TASKS_PER_WORKER:
+                for item in collect(engine, pending.popleft()):
+                    yield item
+        while len(pending):
+            for item in collect(engine, pending.popleft()):
+                yield item
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,115 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Bounded LRU caches, safe to share between the scanner threads.
+#
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache():
+    """Least recently used cache bounded by a number of entries and an
+    approximate size, sizeof(value) gives the size of one value."""
+
+    def __init__(self, maxEntries=1000, maxSize=0, sizeof=None):
+        self.maxEntries = maxEntries
+        self.maxSize = maxSize
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resize(self, maxEntries, maxSize=0):
+        with self.lock:
+            self.maxEntries = maxEntries
+            self.maxSize = maxSize
+            self._shrink()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if not key in self.entries:
+                self.misses = self.misses + 1
+                return default
+            self.hits = self.hits + 1
+            value = self.entries.pop(key)
+            self.entries[key] = value
+            return value
+
+    def peek(self, key, default=None):
+        """Like get() but the entry doesn't become the most recent one."""
+        with self.lock:
+            return self.entries.get(key, default)
+
+    def keys(self):
+        """Snapshot of the keys, the least recently used first."""
+        with self.lock:
+            return list(self.entries.keys())
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.size = self.size - self._sizeof(self.entries.pop(key))
+            if self.maxEntries <= 0:
+                return
+            self.entries[key] = value
+            self.size = self.size + self._sizeof(value)
+            self._shrink()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def resetCounters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def getStats(self):
+        stats = {}
+        stats["entries"] = len(self.entries)
+        stats["size"] = self.size
+        stats["hits"] = self.hits
+        stats["misses"] = self.misses
+        return stats
+
+    def _sizeof(self, value):
+        if self.sizeof is None:
+            return 0
+        return self.sizeof(value)
+
+    def _shrink(self):
+        while len(self.entries) and (len(self.entries) > self.maxEntries or (self.maxSize > 0 and self.size > self.maxSize)):
+            key, value = self.entries.popitem(last=False)
+            self.size = self.size - self._sizeof(value)
+
+
+def resultsSizeof(t_results):
+    # rough size of a {eid: [lines]} dict, strings plus list and dict overhead
+    size = 64
+    for eid, t_lines in t_results.items():
+        size = size + 64 + len(eid)
+        for r in t_lines:
+            size = size + 48 + len(r)
+    return size
+
+
+class ResultCache(LRUCache):
+    """Per-tab results keyed by the digest of the response and the fingerprint
+    of the configs, identical bodies (vendor bundles, cache-busting query
+    strings...) are only grepped once."""
+
+    def __init__(self, maxEntries=1000, maxSize=0):
+        LRUCache.__init__(self, maxEntries, maxSize, resultsSizeof)
+        self.fingerprint = None
+
+    def setFingerprint(self, fingerprint):
+        if fingerprint != self.fingerprint:
+            self.clear()
+            self.fingerprint = fingerprint
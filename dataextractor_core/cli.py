@@ -0,0 +1,154 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Command line: run the extractors configs over saved traffic, no Burp needed.
+#
+# python -m dataextractor_core -c myregexp -t KEYS traffic.har ./mirror/ requests.jsonl
+# python -m dataextractor_core -c myregexp -j 0 ./week-of-traffic/*.xml     # all the cores
+#
+
+import os
+import re
+import sys
+import json
+import argparse
+
+from dataextractor_core.log import trace, formatTrace
+from dataextractor_core.engine import ScanEngine
+from dataextractor_core.config import loadExtractorFile
+from dataextractor_core.registry import REGEX_BACKENDS
+from dataextractor_core.sources import iterInputs
+from dataextractor_core import bulk
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(prog="dataextractor", description="Find datas within (almost) ALL files.")
+    parser.add_argument("inputs", nargs="+", help="directories, files, .har, Burp .xml or .jsonl/.ndjson dumps")
+    parser.add_argument("-c", "--config", required=True, help="myregexp-like file, single config JSON or settings export")
+    parser.add_argument("-t", "--tab", action="append", default=[], help="only run this extractor (name), can be repeated")
+    parser.add_argument("-s", "--scope", help="regexp, urls not matching it are out of scope")
+    parser.add_argument("-o", "--output", help="directory, write one file per extractor instead of stdout")
+    parser.add_argument("--ignore-extensions", help="comma separated list, default from the settings")
+    parser.add_argument("--ignore-files", help="JSON list of regexps, default from the settings")
+    parser.add_argument("--ignore-content-types", help="comma separated list of MIME types, wildcards allowed, default from the settings")
+    parser.add_argument("--max-body-size", type=int, help="in KB, bigger bodies are not grepped, 0 means no limit")
+    parser.add_argument("--pattern-timeout", type=int, help="time budget of a pattern in ms, 0 means no limit")
+    parser.add_argument("--backend", choices=REGEX_BACKENDS, help="regexp engine, java needs Jython, default from the settings")
+    parser.add_argument("--store", help="directory, keep the datas there across runs: only the new ones are output")
+    parser.add_argument("--stats", help="write the timings and counters of the scan to this JSON file")
+    parser.add_argument("--trace", help="write the last steps of the scan to this file, JSON when it ends with .json")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes, 0 means one per core, default: 1")
+    parser.add_argument("--keep-duplicates", action="store_true", help="do not remove duplicates")
+    parser.add_argument("-v", "--verbose", action="store_true", help="verbose mode (for debugging purpose)")
+    return parser.parse_args(argv)
+
+
+def buildEngine(args, store=True):
+    """Engine for the options args, store is False in the worker processes of the bulk mode."""
+    settings, t_items = loadExtractorFile(args.config)
+
+    if args.scope:
+        scope = re.compile(args.scope, re.IGNORECASE)
+        engine = ScanEngine(lambda url: scope.search(str(url)) is not None)
+        settings["scopeOnly"] = True
+    else:
+        engine = ScanEngine()
+        settings["scopeOnly"] = False
+
+    if args.ignore_extensions is not None:
+        settings["ignoreExtensions"] = args.ignore_extensions
+    if args.ignore_files is not None:
+        settings["ignoreFiles"] = args.ignore_files
+    if args.ignore_content_types is not None:
+        settings["ignoreContentTypes"] = args.ignore_content_types
+    if args.max_body_size is not None:
+        settings["maxBodySize"] = args.max_body_size
+    if args.pattern_timeout is not None:
+        settings["patternTimeout"] = args.pattern_timeout
+    if args.backend is not None:
+        settings["regexBackend"] = args.backend
+    if args.keep_duplicates:
+        settings["removeDuplicates"] = False
+    settings["storeDirectory"] = (store and args.store) or ""
+    settings["verboseMode"] = args.verbose
+    engine.loadSettings(settings)
+
+    t_tabs = [ name.lower() for name in args.tab ]
+    for i,item in enumerate(t_items):
+        if len(t_tabs) and not item["name"].lower() in t_tabs:
+            continue
+        engine.addExtractor(item["id"] or str(i+1), item["name"], item["config"], item["exclude"], item["enabled"], item["maxBodySize"], item["contentAllow"], item["contentDeny"])
+
+    return engine
+
+
+def outputFilename(directory, name):
+    return os.path.join(directory, re.sub(r'[^a-zA-Z0-9_\-\.]+', '_', name)+".txt")
+
+
+def scanInputs(engine, args):
+    """Yield (extractor, lines) for every response of the inputs."""
+    jobs = args.jobs
+    if jobs <= 0:
+        jobs = bulk.cpuCount()
+    if jobs > 1 and bulk.multiprocessing is None:
+        print("No multiprocessing support, running in a single process.")
+        jobs = 1
+    if jobs > 1:
+        return bulk.scanBulk(engine, args.inputs, buildEngine, args, jobs)
+    return iterScan(engine, args.inputs)
+
+
+def iterScan(engine, paths):
+    for resp in iterInputs(paths):
+        for item in engine.scan(resp):
+            yield item
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parseArgs(argv)
+    engine = buildEngine(args)
+
+    if not len(engine.extractors):
+        print("No extractor found in "+args.config)
+        return 1
+
+    outputs = {}
+    if args.output:
+        if not os.path.isdir(args.output):
+            os.makedirs(args.output)
+        for extractor in engine.extractors:
+            outputs[extractor.eid] = open(outputFilename(args.output, extractor.name), 'w')
+
+    for extractor, t_lines in scanInputs(engine, args):
+        for r in t_lines:
+            if extractor.eid in outputs:
+                outputs[extractor.eid].write(r+"\n")
+            elif len(engine.extractors) > 1:
+                print("["+extractor.name+"] "+r)
+            else:
+                print(r)
+
+    for fp in outputs.values():
+        fp.close()
+    engine.closeStores()
+
+    if args.stats:
+        with open(args.stats, 'w') as fp:
+            json.dump(engine.getStats(), fp, indent=2, sort_keys=True)
+
+    if args.trace:
+        with open(args.trace, 'w') as fp:
+            if args.trace.endswith(".json"):
+                json.dump(trace.dump(), fp, indent=2, sort_keys=True)
+            else:
+                fp.write(formatTrace(trace.dump())+"\n")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
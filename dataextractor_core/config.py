@@ -0,0 +1,368 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Settings defaults and config parsing shared by the Burp extension and the CLI.
+#
+
+import os
+import re
+import json
+
+from dataextractor_core.registry import compileRegexp
+from dataextractor_core.targets import TARGETS, readsHeaders
+
+DEFAULT_SETTINGS_REMOVE_DUPLICATES = True
+DEFAULT_SETTINGS_VERBOSE_MODE = False
+DEFAULT_SETTINGS_SCOPE_ONLY = True
+DEFAULT_SETTINGS_IGNORE_EXTENSIONS = "css,ico,gif,jpg,jpeg,png,bmp,svg,avi,mpg,mpeg,mp3,m3u8,woff,woff2,ttf,eot,mp3,mp4,wav,mpg,mpeg,avi,mov,wmv,doc,xls,pdf,zip,tar,7z,rar,tgz,gz,exe,rtp"
+DEFAULT_SETTINGS_IGNORE_FILES = ""
+DEFAULT_SETTINGS_CACHE_ENTRIES = 1000
+DEFAULT_SETTINGS_CACHE_SIZE = 16
+DEFAULT_SETTINGS_WORKERS = 2
+DEFAULT_SETTINGS_QUEUE_SIZE = 200
+# block would hold Burp's proxy thread while the workers are busy
+DEFAULT_SETTINGS_QUEUE_POLICY = "spill"
+DEFAULT_SETTINGS_PATTERN_TIMEOUT = 1000
+DEFAULT_SETTINGS_QUARANTINE_AFTER = 3
+DEFAULT_SETTINGS_MAX_BODY_SIZE = 10240
+# the datas can be secrets: nothing is written on disk unless a directory is chosen
+DEFAULT_SETTINGS_STORE_DIRECTORY = ""
+DEFAULT_SETTINGS_RESCAN = "off"
+DEFAULT_SETTINGS_BODY_CACHE_SIZE = 64
+DEFAULT_SETTINGS_PROVENANCE_URLS = 20
+DEFAULT_SETTINGS_REGEX_BACKEND = "auto"
+DEFAULT_SETTINGS_TRACE_SIZE = 1000
+# datas of a tab kept in memory for the UI, the others are only in the store
+DATAS_WINDOW_SIZE = 10000
+# verdicts of the extension and file checks kept, by url
+URL_VERDICTS_CACHE_SIZE = 4096
+# scope verdicts kept, by origin and path prefix, see scope.py
+SCOPE_VERDICTS_CACHE_SIZE = 16384
+# validators (ETag, Last-Modified, Content-Length) and digest of the last response scanned, by url
+URL_VALIDATORS_CACHE_SIZE = 16384
+# keep/drop verdicts of the "Remove from results" list kept, by result, per tab
+EXCLUDE_VERDICTS_CACHE_SIZE = 8192
+DEFAULT_SETTINGS_IGNORE_CONTENT_TYPES = "image/*,audio/*,video/*,font/*,application/font-*,application/x-font-*,application/vnd.ms-fontobject,application/zip,application/gzip,application/x-gzip,application/pdf,application/x-protobuf,application/protobuf,application/wasm,binary"
+
+EXTRACTOR_DEFAULT_CONFIG = ""
+EXTRACTOR_DEFAULT_EXCLUDE = ""
+EXTRACTOR_DEFAULT_ENABLED = True
+EXTRACTOR_DEFAULT_MAX_BODY_SIZE = None
+EXTRACTOR_DEFAULT_CONTENT_ALLOW = ""
+EXTRACTOR_DEFAULT_CONTENT_DENY = ""
+
+# section header used in the myregexp file:
+# ----------------
+# NAME
+# ----------------
+MYREGEXP_SECTION = re.compile(r'^-{5,}[ \t]*\r?\n(.+?)\r?\n-{5,}[ \t]*$', re.MULTILINE)
+MYREGEXP_IGNORE = re.compile(r'^ignore:[ \t]*$', re.MULTILINE)
+
+
+# global settings saved by the extension, "extractors" apart
+SETTINGS_KEYS = ("verboseMode","scopeOnly","removeDuplicates","ignoreExtensions","ignoreFiles","cacheEntries","cacheSize","workers","queueSize","queuePolicy","patternTimeout","quarantineAfter","maxBodySize","ignoreContentTypes","storeDirectory","rescan","bodyCacheSize","provenanceUrls","regexBackend","traceSize")
+
+
+def defaultSettings():
+    settings = {}
+    settings["extractors"] = {}
+    settings["verboseMode"] = DEFAULT_SETTINGS_VERBOSE_MODE
+    settings["scopeOnly"] = DEFAULT_SETTINGS_SCOPE_ONLY
+    settings["removeDuplicates"] = DEFAULT_SETTINGS_REMOVE_DUPLICATES
+    settings["ignoreExtensions"] = DEFAULT_SETTINGS_IGNORE_EXTENSIONS
+    settings["ignoreFiles"] = DEFAULT_SETTINGS_IGNORE_FILES
+    # results cache, number of responses and size in MB
+    settings["cacheEntries"] = DEFAULT_SETTINGS_CACHE_ENTRIES
+    settings["cacheSize"] = DEFAULT_SETTINGS_CACHE_SIZE
+    # passive scan threads, 0 means scanning on Burp's thread
+    settings["workers"] = DEFAULT_SETTINGS_WORKERS
+    settings["queueSize"] = DEFAULT_SETTINGS_QUEUE_SIZE
+    settings["queuePolicy"] = DEFAULT_SETTINGS_QUEUE_POLICY
+    # time budget of a pattern in ms, quarantined after that many overruns, 0 disables
+    settings["patternTimeout"] = DEFAULT_SETTINGS_PATTERN_TIMEOUT
+    settings["quarantineAfter"] = DEFAULT_SETTINGS_QUARANTINE_AFTER
+    # bigger bodies are not grepped, in KB, 0 means no limit
+    settings["maxBodySize"] = DEFAULT_SETTINGS_MAX_BODY_SIZE
+    # MIME types not grepped, stated, inferred or sniffed from the first bytes
+    settings["ignoreContentTypes"] = DEFAULT_SETTINGS_IGNORE_CONTENT_TYPES
+    # datas of the tabs are kept on disk in there, empty (the default) keeps them in memory only
+    settings["storeDirectory"] = DEFAULT_SETTINGS_STORE_DIRECTORY
+    # responses run again through the new patterns of a tab: "off", "cache" (body cache, size in MB) or "proxy" (proxy history)
+    settings["rescan"] = DEFAULT_SETTINGS_RESCAN
+    settings["bodyCacheSize"] = DEFAULT_SETTINGS_BODY_CACHE_SIZE
+    # urls kept per data (a sample above that), 0 means all of them
+    settings["provenanceUrls"] = DEFAULT_SETTINGS_PROVENANCE_URLS
+    # "auto" (java.util.regex under Jython), "re" or "java"
+    settings["regexBackend"] = DEFAULT_SETTINGS_REGEX_BACKEND
+    # last steps of the scan kept in memory, see log.py, 0 disables it
+    settings["traceSize"] = DEFAULT_SETTINGS_TRACE_SIZE
+    return settings
+
+
+def parseIgnoreExtensions(text):
+    t_exts = []
+    for ext in text.split(","):
+        t_exts.append("."+ext)
+    return t_exts
+
+
+def compileIgnoreExtensions(t_exts):
+    """Split the ".ext" list into a set of plain extensions, looked up with the
+    extension of the path, and a tuple of the other suffixes (".min.js")."""
+    t_set = set()
+    t_suffixes = []
+    for ext in t_exts:
+        if "." in ext[1:] or "/" in ext:
+            t_suffixes.append( ext )
+        else:
+            t_set.add( ext[1:] )
+    return t_set, tuple(t_suffixes)
+
+
+def combineRegexps(t_regexps, flags=0):
+    """One alternation of all the regexps so a string is searched once, the
+    list as is when they can't be merged (backreferences, inline flags...)."""
+    if len(t_regexps) < 2:
+        return [ compileRegexp(r, flags) for r in t_regexps ]
+    for r in t_regexps:
+        if re.search(r'\\[1-9]|\(\?P=|\(\?[a-zA-Z]+\)', r):
+            return [ compileRegexp(r, flags) for r in t_regexps ]
+    try:
+        return [ compileRegexp("|".join([ "(?:"+r+")" for r in t_regexps ]), flags) ]
+    except re.error as e:
+        return [ compileRegexp(r, flags) for r in t_regexps ]
+
+
+def parseIgnoreFiles(text):
+    t_files = []
+    t_regexps = []
+    if len(text):
+        try:
+            t_files = json.loads(text)
+            t_regexps = combineRegexps(t_files, re.IGNORECASE)
+        except ValueError as e:
+            print("Invalid JSON format! (settings:ignoreFiles)")
+    return t_files, t_regexps
+
+
+class ExtractorPattern():
+    """One entry of an extractor config.
+
+    "key": "regexp" runs on the body only,
+    "key": {"regexp": "...", "headers": true} runs on the headers and the body,
+    "key": {"regexp": "...", "target": "script"} runs on the target only, see targets.py.
+    """
+
+    keywords = None
+
+    def __init__(self, key, regexp, headers=False, target=None):
+        self.key = key
+        self.regexp = regexp
+        if target is None:
+            target = "full" if headers else "body"
+        self.target = target
+        self.headers = readsHeaders(target)
+
+
+class KeywordPattern(ExtractorPattern):
+    """A set of fixed strings instead of a regexp:
+
+    "key": {"keywords": ["AKIA","ASIA"], "after": "[A-Z0-9]{16}"}
+    "key": {"keywords": ["internal.corp"], "ignorecase": true, "before": 30, "after": 10}
+
+    The result is the keyword found, with "before" chars before it and
+    "after" chars after it. "after" can also be a regexp matched right after
+    the keyword, the occurrence is ignored when it doesn't match.
+    """
+
+    def __init__(self, key, keywords, ignorecase=False, before=0, after=0, headers=False):
+        ExtractorPattern.__init__(self, key, None, headers)
+        self.keywords = keywords
+        self.ignorecase = ignorecase
+        self.before = before
+        self.after = after
+        self.afterRegexp = None
+        if not isinstance(after, int):
+            self.afterRegexp = compileRegexp(after)
+        # KeywordSet of this pattern alone, see ExtractorEngine.match()
+        self.keywordSet = None
+
+    def extract(self, text, start, end, lower=0):
+        """Result for the keyword at text[start:end], None when "after" doesn't match."""
+        if self.afterRegexp is not None:
+            m = self.afterRegexp.match(text, end)
+            if m is None:
+                return None
+            end = m.end()
+        else:
+            end = end + self.after
+        return text[max(start-self.before, lower):end]
+
+
+def parseTarget(key, value, name):
+    """Target of the pattern, "headers": true is the same as "target": "full"."""
+    target = value.get("target", "full" if value.get("headers", False) else "body")
+    if not target in TARGETS:
+        print("Invalid target, one of "+", ".join(TARGETS)+" is expected! ("+name+":config:"+key+")")
+        return None
+    return target
+
+
+def parseKeywordPattern(key, value, name):
+    keywords = value["keywords"]
+    if not isinstance(keywords, list) or not len(keywords):
+        print("Invalid keywords, a list of strings is expected! ("+name+":config:"+key+")")
+        return None
+    target = parseTarget(key, value, name)
+    if target is None:
+        return None
+    if not target in ("body", "full"):
+        print("Invalid target, keywords run on the body or the full response! ("+name+":config:"+key+")")
+        return None
+    try:
+        before = max(int(value.get("before", 0)), 0)
+        after = value.get("after", 0)
+        if not isinstance(after, (str, type(u""))):
+            after = max(int(after), 0)
+        return KeywordPattern(key, [ str(keyword) if not isinstance(keyword, type(u"")) else keyword for keyword in keywords ], bool(value.get("ignorecase", False)), before, after, target == "full")
+    except (ValueError, TypeError, re.error) as e:
+        print("Invalid keywords options! ("+name+":config:"+key+")")
+        return None
+
+
+def parsePattern(key, value, name):
+    if isinstance(value, dict):
+        if "keywords" in value:
+            return parseKeywordPattern(key, value, name)
+        if not "regexp" in value:
+            print("Missing regexp! ("+name+":config:"+key+")")
+            return None
+        target = parseTarget(key, value, name)
+        if target is None:
+            return None
+        # return ExtractorPattern(key, re.compile(value["regexp"],re.IGNORECASE), ...)
+        return ExtractorPattern(key, compileRegexp(value["regexp"]), target=target)
+    # return ExtractorPattern(key, re.compile(value,re.IGNORECASE))
+    return ExtractorPattern(key, compileRegexp(value))
+
+
+def parseConfig(text, name):
+    t_config = {}
+    t_compiled = {}
+    if text and len(text):
+        try:
+            t_config = json.loads(text)
+            for k,r in t_config.items():
+                pattern = parsePattern(k, r, name)
+                if pattern is not None:
+                    t_compiled[k] = pattern
+        except ValueError as e:
+            print("Invalid JSON format! ("+name+":config)")
+    return t_config, t_compiled
+
+
+def parseExclude(text, name):
+    t_exclude = []
+    t_compiled = []
+    if text and len(text):
+        try:
+            t_exclude = json.loads(text)
+            t_compiled = combineRegexps(t_exclude, re.IGNORECASE)
+        except ValueError as e:
+            print("Invalid JSON format! ("+name+":exclude)")
+    return t_exclude, t_compiled
+
+
+def parseMaxBodySize(value):
+    """Per-tab max body size in KB, None (empty) means the global setting."""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return max(int(value), 0)
+    except ValueError as e:
+        print("Invalid number! ("+str(value)+")")
+        return None
+
+
+def extractorItem(name, config, exclude="", enabled=EXTRACTOR_DEFAULT_ENABLED, eid=None, maxBodySize=EXTRACTOR_DEFAULT_MAX_BODY_SIZE, contentAllow=EXTRACTOR_DEFAULT_CONTENT_ALLOW, contentDeny=EXTRACTOR_DEFAULT_CONTENT_DENY):
+    item = {}
+    item["id"] = eid
+    item["name"] = name
+    item["config"] = config
+    item["exclude"] = exclude
+    item["enabled"] = enabled
+    item["maxBodySize"] = maxBodySize
+    item["contentAllow"] = contentAllow
+    item["contentDeny"] = contentDeny
+    return item
+
+
+def parseMyRegexp(text):
+    """Read the sectioned format of the myregexp file, one extractor per section."""
+    t_items = []
+    t_sections = list(MYREGEXP_SECTION.finditer(text))
+    decoder = json.JSONDecoder()
+
+    for i,m in enumerate(t_sections):
+        name = m.group(1).strip()
+        if i+1 < len(t_sections):
+            end = t_sections[i+1].start()
+        else:
+            end = len(text)
+        block = text[m.end():end]
+
+        config = ""
+        exclude = ""
+        start = block.find("{")
+        if start >= 0:
+            try:
+                obj, stop = decoder.raw_decode(block, start)
+                config = block[start:stop]
+            except ValueError as e:
+                print("Invalid JSON format! ("+name+":config)")
+        ignore = MYREGEXP_IGNORE.search(block)
+        if ignore:
+            start = block.find("[", ignore.end())
+            if start >= 0:
+                try:
+                    obj, stop = decoder.raw_decode(block, start)
+                    exclude = block[start:stop]
+                except ValueError as e:
+                    print("Invalid JSON format! ("+name+":exclude)")
+
+        t_items.append( extractorItem(name, config, exclude) )
+
+    return t_items
+
+
+def loadExtractorFile(filename):
+    """Load extractors from a saved settings export, a single config JSON or a myregexp-like file.
+
+    Returns a tuple (settings, extractors) where settings only holds the global
+    keys found in the file.
+    """
+    text = open(filename, 'r').read()
+    settings = {}
+
+    try:
+        j = json.loads(text)
+    except ValueError as e:
+        return settings, parseMyRegexp(text)
+
+    if isinstance(j, dict) and "extractors" in j:
+        for k in SETTINGS_KEYS:
+            if k in j:
+                settings[k] = j[k]
+        t_items = []
+        for k in sorted(j["extractors"], key=lambda x: int(x)):
+            item = j["extractors"][k]
+            t_items.append( extractorItem(item.get("name",str(k)), item.get("config",EXTRACTOR_DEFAULT_CONFIG), item.get("exclude",EXTRACTOR_DEFAULT_EXCLUDE), item.get("enabled",EXTRACTOR_DEFAULT_ENABLED), item.get("id"), parseMaxBodySize(item.get("maxBodySize")), item.get("contentAllow",EXTRACTOR_DEFAULT_CONTENT_ALLOW), item.get("contentDeny",EXTRACTOR_DEFAULT_CONTENT_DENY)) )
+        return settings, t_items
+
+    if isinstance(j, dict):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return settings, [ extractorItem(name, text) ]
+
+    print("Unsupported config file: "+filename)
+    return settings, []
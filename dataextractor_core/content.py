@@ -0,0 +1,161 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Content type prefilter: images, fonts, archives... are rejected from the
+# headers and the first bytes of the body, before it's even decoded.
+#
+# The body is sniffed for what the headers don't say: all the signatures
+# without a Content-Type or with a generic one, only the strong ones against
+# another type, never against a declared text, JSON or JS (a script can start
+# with "ID3" or "OTTO").
+#
+
+import re
+import fnmatch
+
+
+# first bytes of the body, one char per byte (unicode: Burp's bytes are decoded as latin-1)
+MAGIC_SIGNATURES = (
+    (u"\x89PNG\r\n\x1a\n", "image/png"),
+    (u"\xff\xd8\xff", "image/jpeg"),
+    (u"GIF87a", "image/gif"),
+    (u"GIF89a", "image/gif"),
+    (u"\x00\x00\x01\x00", "image/x-icon"),
+    (u"wOFF", "font/woff"),
+    (u"wOF2", "font/woff2"),
+    (u"\x00\x01\x00\x00\x00", "font/ttf"),
+    (u"OTTO", "font/otf"),
+    (u"PK\x03\x04", "application/zip"),
+    (u"\x1f\x8b", "application/gzip"),
+    (u"BZh", "application/x-bzip2"),
+    (u"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (u"Rar!\x1a\x07", "application/vnd.rar"),
+    (u"%PDF-", "application/pdf"),
+    (u"\x00asm", "application/wasm"),
+    (u"ID3", "audio/mpeg"),
+    (u"OggS", "audio/ogg"),
+    (u"fLaC", "audio/flac"),
+    (u"\x1a\x45\xdf\xa3", "video/webm"),
+)
+# "RIFF....WEBP", "....ftyp" (mp4, mov...)
+RIFF_TYPES = {u"WEBP": "image/webp", u"WAVE": "audio/wav", u"AVI ": "video/x-msvideo"}
+
+# bytes of the body looked at, and share of NUL/control chars above which it's a binary
+SNIFF_SIZE = 512
+BINARY_NUL_RATIO = 0.01
+BINARY_CONTROL_RATIO = 0.05
+BINARY_TYPE = "binary"
+CONTROL_CHARS = re.compile(u'[\x00-\x08\x0e-\x1a\x1c-\x1f]')
+
+# Content-Types saying nothing about the body, and the ones never sniffed
+GENERIC_MIME_TYPES = ("application/octet-stream", "binary/octet-stream")
+TEXT_MIME_TYPES = ("text/*", "*json", "*javascript", "*ecmascript")
+
+CONTENT_TYPE = re.compile(r'^content-type[ \t]*:[ \t]*([^;\r\n]+)', re.IGNORECASE | re.MULTILINE)
+
+# Burp's stated/inferred MIME types are short names, not MIME types
+BURP_MIME_TYPES = {
+    "html": "text/html",
+    "script": "application/javascript",
+    "json": "application/json",
+    "xml": "text/xml",
+    "css": "text/css",
+    "text": "text/plain",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+    "image": "image/unknown",
+    "video": "video/unknown",
+    "sound": "audio/unknown",
+    "flash": "application/x-shockwave-flash",
+}
+
+
+def strongSignature(signature):
+    """Long enough, or with bytes no text starts with, to overrule a Content-Type."""
+    if len(signature) >= 5:
+        return True
+    return len(signature) >= 4 and CONTROL_CHARS.search(signature) is not None
+
+
+def sniffMimeType(head, strong=False):
+    """MIME type from the magic bytes at the beginning of the body, None when
+    unknown. strong: only the long signatures and the positioned ones."""
+    for signature, mime in MAGIC_SIGNATURES:
+        if strong and not strongSignature(signature):
+            continue
+        if head.startswith(signature):
+            return mime
+    if head.startswith(u"RIFF") and head[8:12] in RIFF_TYPES:
+        return RIFF_TYPES[head[8:12]]
+    if head[4:8] == u"ftyp":
+        return "video/mp4"
+    return None
+
+
+def isBinary(head):
+    if not len(head):
+        return False
+    if head.count(u"\x00") > len(head) * BINARY_NUL_RATIO:
+        return True
+    return len(CONTROL_CHARS.findall(head)) > len(head) * BINARY_CONTROL_RATIO
+
+
+def headerMimeType(headers):
+    m = CONTENT_TYPE.search(headers or "")
+    if m is None:
+        return None
+    return m.group(1).strip().lower()
+
+
+def burpMimeType(name):
+    if not name:
+        return None
+    name = name.lower()
+    return BURP_MIME_TYPES.get(name, name)
+
+
+def parseMimeTypes(text):
+    """Comma separated list of MIME types, wildcards allowed: "image/*,font/*,binary"."""
+    t_types = []
+    for mime in (text or "").split(","):
+        mime = mime.strip().lower()
+        if len(mime):
+            t_types.append( mime )
+    return t_types
+
+
+def matchMimeTypes(t_types, t_patterns):
+    for mime in t_types:
+        for pattern in t_patterns:
+            if fnmatch.fnmatchcase(mime, pattern):
+                return True
+    return False
+
+
+def contentTypes(resp):
+    """Every type known for the Response: stated, inferred, sniffed and "binary"."""
+    t_types = resp.getMimeTypes()
+    declared = headerMimeType(resp.getHeaders())
+    if declared is not None and matchMimeTypes([declared], TEXT_MIME_TYPES):
+        return t_types
+    head = resp.getHead(SNIFF_SIZE)
+    sniffed = sniffMimeType(head, declared is not None and not declared in GENERIC_MIME_TYPES)
+    if sniffed is not None:
+        t_types.append( sniffed )
+        t_types.append( BINARY_TYPE )
+    elif isBinary(head):
+        t_types.append( BINARY_TYPE )
+    return t_types
+
+
+def allowContent(t_types, t_ignore, t_allow, t_deny):
+    """Verdict of a tab: its allow list wins over everything, then the global and the tab deny lists."""
+    if len(t_allow):
+        return matchMimeTypes(t_types, t_allow)
+    if matchMimeTypes(t_types, t_ignore) or matchMimeTypes(t_types, t_deny):
+        return False
+    return True
@@ -0,0 +1,161 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Synthetic traffic for the benchmarks: minified JS bundles, big HTML pages,
+# JSON APIs and binaries, sprinkled with the kind of datas the myregexp
+# extractors look for. Same seed, same corpus.
+#
+
+import random
+import string
+
+from dataextractor_core.response import Response
+
+
+CORPUS_KINDS = ("js", "html", "json", "binary")
+# share of the corpus size for each kind
+CORPUS_MIX = {"js": 0.45, "html": 0.25, "json": 0.2, "binary": 0.1}
+
+CORPUS_DOMAINS = ("10degres.net", "github.com", "example.com", "cdn.test")
+CORPUS_WORDS = ("user", "users", "account", "admin", "login", "token", "session", "api", "v1", "v2", "config",
+                "search", "items", "cart", "checkout", "upload", "assets", "static", "internal", "debug")
+BINARY_EXTENSIONS = (".png", ".woff2", ".zip", ".mp4")
+BINARY_SIGNATURES = (u"\x89PNG\r\n\x1a\n", "wOF2", "PK\x03\x04", "\x00\x00\x00\x18ftypmp42", "")
+
+
+class CorpusGenerator():
+    """Deterministic generator of Response objects."""
+
+    def __init__(self, seed=1337):
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def word(self):
+        return self.random.choice(CORPUS_WORDS)
+
+    def ident(self, size=None):
+        if size is None:
+            size = self.random.randint(1, 3)
+        return ''.join(self.random.choice(string.ascii_letters) for _ in range(size))
+
+    def token(self, chars, size):
+        return ''.join(self.random.choice(chars) for _ in range(size))
+
+    def host(self):
+        return self.token(string.ascii_lowercase, self.random.randint(3, 8)) + "." + self.random.choice(CORPUS_DOMAINS)
+
+    def path(self):
+        return "/" + "/".join(self.word() for _ in range(self.random.randint(1, 4)))
+
+    def url(self):
+        return "https://" + self.host() + self.path()
+
+    def secret(self):
+        kind = self.random.randint(0, 3)
+        if kind == 0:
+            return "AKIA" + self.token(string.ascii_uppercase + string.digits, 16)
+        if kind == 1:
+            return "AIza" + self.token(string.ascii_letters + string.digits + "_-", 35)
+        if kind == 2:
+            return "eyJ" + self.token(string.ascii_letters + string.digits, 30) + ".eyJ" + self.token(string.ascii_letters + string.digits, 40) + "." + self.token(string.ascii_letters + string.digits + "_-", 43)
+        return "xoxb-" + self.token(string.digits, 12) + "-" + self.token(string.ascii_letters + string.digits, 24)
+
+    def jsStatement(self):
+        kind = self.random.randint(0, 11)
+        a = self.ident()
+        b = self.ident()
+        if kind == 0:
+            return 'var ' + a + '="' + self.url() + '";'
+        if kind == 1:
+            return a + '.ajax("' + self.path() + '",{method:"POST"});'
+        if kind == 2:
+            return '{url:"' + self.path() + '",urlRoot:"' + self.url() + '"}'
+        if kind == 3:
+            return 'var ' + a + '="' + self.secret() + '";'
+        if kind == 4:
+            return b + '.get(\'' + self.path() + '.php?id=' + str(self.random.randint(1, 999)) + '\');'
+        if kind == 5:
+            return 'endpoint:"' + self.path() + '"'
+        # plain minified code, most of the bundle
+        return ('function ' + a + '(' + b + ',t){return ' + b + '&&' + b + '.' + self.word() + '?t[' + str(self.random.randint(0, 99)) + ']:'
+                + a + '.' + self.word() + '(' + b + ',' + str(self.random.randint(0, 9999)) + ')}')
+
+    def js(self, size):
+        t_parts = ['!function(e){']
+        total = 0
+        while total < size:
+            part = self.jsStatement()
+            t_parts.append(part)
+            total = total + len(part)
+        t_parts.append('}(window);')
+        # minified: a single huge line
+        return Response(self.url() + ".js", self.headers("application/javascript"), ''.join(t_parts))
+
+    def htmlElement(self):
+        kind = self.random.randint(0, 7)
+        if kind == 0:
+            return '<a href="' + self.url() + '" class="' + self.word() + '">' + self.word() + '</a>\n'
+        if kind == 1:
+            return "<img src='" + self.path() + ".png' alt=''>\n"
+        if kind == 2:
+            return '<script src="https://' + self.host() + '/' + self.word() + '.js"></script>\n'
+        if kind == 3:
+            return '<form action="' + self.path() + '.aspx" method="post"><input name="' + self.word() + '"></form>\n'
+        return '<div class="' + self.word() + ' ' + self.word() + '"><p>' + ' '.join(self.word() for _ in range(12)) + '</p></div>\n'
+
+    def html(self, size):
+        t_parts = ['<!DOCTYPE html>\n<html><head><title>' + self.word() + '</title></head><body>\n']
+        total = 0
+        while total < size:
+            part = self.htmlElement()
+            t_parts.append(part)
+            total = total + len(part)
+        t_parts.append('</body></html>\n')
+        return Response(self.url() + ".html", self.headers("text/html; charset=utf-8"), ''.join(t_parts))
+
+    def jsonItem(self):
+        return ('{"id":' + str(self.random.randint(1, 99999)) + ',"name":"' + self.word() + '","href":"' + self.path()
+                + '","avatar":"' + self.url() + '.png","email":"' + self.word() + '@' + self.random.choice(CORPUS_DOMAINS) + '"}')
+
+    def json(self, size):
+        t_parts = []
+        total = 0
+        while total < size:
+            part = self.jsonItem()
+            t_parts.append(part)
+            total = total + len(part)
+        if self.random.randint(0, 3) == 0:
+            t_parts.append('{"apiKey":"' + self.secret() + '"}')
+        return Response("https://" + self.host() + "/api" + self.path(), self.headers("application/json"), '{"items":[' + ','.join(t_parts) + ']}')
+
+    def binary(self, size):
+        body = self.random.choice(BINARY_SIGNATURES) + bytearray([ self.random.randint(0, 255) for _ in range(size) ]).decode('latin-1')
+        ext = self.random.choice(BINARY_EXTENSIONS)
+        if self.random.randint(0, 2) == 0:
+            # served without a telling extension, only the content says it's a binary
+            return Response("https://" + self.host() + "/download?id=" + str(self.random.randint(1, 999)), self.headers("application/octet-stream"), body)
+        return Response(self.url() + ext, self.headers("application/octet-stream"), body)
+
+    def headers(self, contentType):
+        return "HTTP/1.1 200 OK\r\nContent-Type: " + contentType + "\r\nServer: nginx\r\nCache-Control: max-age=3600\r\n\r\n"
+
+    def generate(self, totalSize):
+        """Return a list of Response, about totalSize bytes of bodies."""
+        t_responses = []
+        for kind in CORPUS_KINDS:
+            budget = int(totalSize * CORPUS_MIX[kind])
+            while budget > 0:
+                if kind == "js":
+                    size = self.random.randint(20, 400) * 1024
+                elif kind == "html":
+                    size = self.random.randint(10, 200) * 1024
+                elif kind == "json":
+                    size = self.random.randint(1, 60) * 1024
+                else:
+                    size = self.random.randint(5, 100) * 1024
+                size = min(size, budget)
+                t_responses.append( getattr(self, kind)(size) )
+                budget = budget - size
+        self.random.shuffle(t_responses)
+        return t_responses
@@ -0,0 +1,85 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Per-tab index of the datas already collected, used to remove duplicates.
+#
+
+import hashlib
+import threading
+
+
+# above this number of datas, new ones are only kept as a 64 bits hash
+DEFAULT_COMPACT_AFTER = 200000
+
+
+def compactHash(r):
+    if not isinstance(r, bytes):
+        r = r.encode('utf-8')
+    return int(hashlib.md5(r).hexdigest()[:16], 16)
+
+
+class ResultIndex():
+    """Set of the datas of a tab.
+
+    The first compactAfter datas are stored as is, the next ones as a 64 bits
+    hash (a collision would only hide a result, the odds are negligible even
+    with millions of datas).
+    """
+
+    def __init__(self, compactAfter=DEFAULT_COMPACT_AFTER):
+        self.compactAfter = compactAfter
+        self.exact = set()
+        self.hashed = set()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.exact) + len(self.hashed)
+
+    def __contains__(self, r):
+        if r in self.exact:
+            return True
+        return len(self.hashed) > 0 and compactHash(r) in self.hashed
+
+    def _add(self, r):
+        if r in self:
+            return False
+        if self.compactAfter is None or len(self.exact) < self.compactAfter:
+            self.exact.add( r )
+        else:
+            self.hashed.add( compactHash(r) )
+        return True
+
+    def add(self, r):
+        """Add r, return False if it was already there."""
+        with self.lock:
+            return self._add(r)
+
+    def addNew(self, t_lines):
+        """Add the lines and return the ones that were not there yet, in order."""
+        t_new = []
+        with self.lock:
+            for r in t_lines:
+                if self._add(r):
+                    t_new.append( r )
+        return t_new
+
+    def discard(self, r):
+        with self.lock:
+            self.exact.discard( r )
+            if len(self.hashed):
+                self.hashed.discard( compactHash(r) )
+
+    def clear(self):
+        with self.lock:
+            self.exact = set()
+            self.hashed = set()
+
+    def rebuild(self, t_lines):
+        """Reset the index to the given datas, e.g. after they have been edited by hand."""
+        with self.lock:
+            self.exact = set()
+            self.hashed = set()
+            for r in t_lines:
+                if len(r):
+                    self._add(r)
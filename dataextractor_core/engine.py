@@ -0,0 +1,578 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Headless scanning core: no Burp nor Swing in here, the extension and the CLI both wrap it.
+#
+
+import os
+import re
+import json
+import time
+import hashlib
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from dataextractor_core.log import _print, _trace, trace, setVerboseMode
+from dataextractor_core.config import *
+from dataextractor_core.scanplan import ScanPlan
+from dataextractor_core.registry import registry
+from dataextractor_core.cache import ResultCache, LRUCache
+from dataextractor_core.dedup import ResultIndex
+from dataextractor_core.provenance import ProvenanceIndex
+from dataextractor_core.scope import ScopeCache, scopeDepth
+from dataextractor_core.stats import ScanStats
+from dataextractor_core.store import ResultStore
+from dataextractor_core.keywords import KeywordSet
+from dataextractor_core.content import parseMimeTypes, contentTypes, allowContent
+from dataextractor_core.targets import TargetTexts
+
+
+class ExtractorEngine():
+    """Matching, exclusion and deduplication for a single extractor tab."""
+
+    def __init__(self, eid, name, config=None, exclude=None, enabled=True, maxBodySize=None, contentAllow="", contentDeny=""):
+        self.eid = eid
+        self.name = name
+        self.enabled = enabled
+        # in KB, None means the global setting
+        self.maxBodySize = maxBodySize
+        # MIME types lists, the allow list wins over the global ignore list
+        self.contentAllow = ""
+        self._contentAllow = []
+        self.contentDeny = ""
+        self._contentDeny = []
+        self.setContentTypes(contentAllow, contentDeny)
+        # key -> number of time budget overruns, the pattern is skipped once quarantined
+        self.timeouts = {}
+        self.quarantined = set()
+        self.config = ""
+        self._config = {}
+        self.__config = {}
+        # keys of the patterns new or modified by the last loadConfig()
+        self.changedKeys = set()
+        self.exclude = ""
+        self._exclude = []
+        self.__exclude = []
+        # bumped on every config change so the scan plan knows it's outdated
+        self.version = 0
+        # datas already collected, to remove duplicates
+        self.datas = ResultIndex()
+        # urls where the datas were found
+        self.provenance = ProvenanceIndex()
+        # result -> kept or removed by the exclude list
+        self.verdicts = LRUCache(EXCLUDE_VERDICTS_CACHE_SIZE)
+        # ScanStats of the ScanEngine
+        self.stats = None
+        # ResultStore on disk, None when disabled
+        self.store = None
+        self.loadConfig(config)
+        self.loadExclude(exclude)
+
+    def loadConfig(self, config):
+        # applying the settings again gets a new chance too
+        self.timeouts = {}
+        self.quarantined = set()
+        if (config or "") == self.config:
+            # nothing to compile, the scan plan is still good
+            self.changedKeys = set()
+            return
+        t_previous = self._config
+        self.config = config or ""
+        self._config, self.__config = parseConfig(self.config, self.name)
+        self.changedKeys = set([ k for k in self.__config if not k in t_previous or t_previous[k] != self._config[k] ])
+        self.version = self.version + 1
+
+    def recompile(self):
+        """Compile the config and the exclude list again, e.g. with another regexp engine."""
+        if len(self.config):
+            self._config, self.__config = parseConfig(self.config, self.name)
+        if len(self.exclude):
+            self._exclude, self.__exclude = parseExclude(self.exclude, self.name)
+        self.verdicts.clear()
+        self.changedKeys = set()
+        self.version = self.version + 1
+
+    def setMaxBodySize(self, maxBodySize):
+        if maxBodySize != self.maxBodySize:
+            self.maxBodySize = maxBodySize
+            self.version = self.version + 1
+
+    def setContentTypes(self, contentAllow, contentDeny):
+        self.contentAllow = contentAllow or ""
+        self._contentAllow = parseMimeTypes(self.contentAllow)
+        self.contentDeny = contentDeny or ""
+        self._contentDeny = parseMimeTypes(self.contentDeny)
+
+    def addTimeout(self, key, quarantineAfter):
+        """Count an overrun of the pattern key, return True when it gets quarantined."""
+        self.timeouts[key] = self.timeouts.get(key, 0) + 1
+        if quarantineAfter > 0 and self.timeouts[key] >= quarantineAfter and not key in self.quarantined:
+            self.quarantined.add( key )
+            return True
+        return False
+
+    def openStore(self, directory):
+        """Keep the datas in directory, the ones already there are loaded in the dedup index."""
+        self.closeStore()
+        self.store = ResultStore(directory)
+        # only the first url of each data is in the store
+        self.provenance.clear()
+        t_values = []
+        for item in self.store.iterItems():
+            t_values.append( item["value"] )
+            if item["url"] is not None:
+                self.provenance.add(item["value"], item["url"])
+        self.datas.rebuild( t_values )
+        _print("%s: %d datas loaded from %s", self.name, len(self.datas), directory)
+
+    def closeStore(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def lineKey(self, line):
+        """Key of the pattern that found the line, None for the * and ? keys."""
+        i = line.find(": ")
+        if i > 0 and line[:i] in self.__config:
+            return line[:i]
+        return None
+
+    def getPatterns(self):
+        return list(self.__config.values())
+
+    def loadExclude(self, exclude):
+        if (exclude or "") == self.exclude:
+            return
+        self.exclude = exclude or ""
+        self._exclude, self.__exclude = parseExclude(self.exclude, self.name)
+        self.verdicts.clear()
+        self.version = self.version + 1
+
+    def scan(self, resp, removeDuplicates=False):
+        """Return the lines to add to the datas for the Response resp."""
+        if not self.enabled:
+            _print("%s: disabled.", self.name)
+            return []
+        return self.dedup(self.filter(self.match(resp)), removeDuplicates)
+
+    def match(self, resp):
+        """Run this extractor alone, the scan plan does the same for all extractors at once."""
+        t_hits = []
+        texts = TargetTexts(resp)
+        for k,pattern in self.__config.items():
+            # _print(pattern.regexp)
+            text = texts.get(pattern.target)
+            if pattern.keywords is not None:
+                if pattern.keywordSet is None:
+                    pattern.keywordSet = KeywordSet(pattern.keywords, pattern.ignorecase)
+                for keyword, start, end in pattern.keywordSet.finditer(text):
+                    r = pattern.extract(text, start, end)
+                    if r is not None:
+                        t_hits.append( (k, r) )
+                continue
+            for m in pattern.regexp.finditer(text):
+                # for i in range(0,len(m.groups())+1):
+                #     if not m.group(i) is None:
+                #         _print(str(i)+":"+m.group(i))
+                if len(m.groups()) > 0 and not m.group(1) is None:
+                    t_hits.append( (k, m.group(1)) )
+        return t_hits
+
+    def filter(self, t_hits):
+        """Remove the excluded results from the (key, result) hits and format them as lines."""
+        t_results = []
+        t_filtered = []
+        t_output = []
+        t_keepkeys = {}
+
+        for k,r in t_hits:
+            t_results.append( r )
+            if not k.startswith("*") and not k.startswith("?"):
+                t_keepkeys[r] = k
+
+        _print("%s: %d results.", self.name, len(t_results))
+
+        if len(self.__exclude):
+            for r in t_results:
+                keep = self.verdicts.get(r)
+                if keep is None:
+                    keep = not self.isExcluded(r)
+                    self.verdicts.put(r, keep)
+                if keep:
+                    t_filtered.append( r )
+        else:
+            t_filtered = t_results
+
+        _print("%s: %d filtered (%d removed).", self.name, len(t_filtered), len(t_results)-len(t_filtered))
+
+        if len(t_filtered):
+            for r in t_filtered:
+                output = ""
+                if r in t_keepkeys:
+                    output = t_keepkeys[r] + ": "
+                output = output + r
+                t_output.append( output )
+
+        return t_output
+
+    def isExcluded(self, r):
+        # a single regexp most of the time, see combineRegexps()
+        for regexp in self.__exclude:
+            if regexp.search(r):
+                return True
+        return False
+
+    def dedup(self, t_output, removeDuplicates=False, url=None):
+        """Return the lines to add to the datas, they're added to the index of the datas
+        and to the store, url being where they were found."""
+        t_nodups = []
+        t_final = []
+
+        if len(t_output):
+            t_nodups = self.datas.addNew(t_output)
+            if url is not None:
+                self.provenance.addAll(t_output, str(url))
+            if self.store is not None:
+                self.saveDatas(t_output, t_nodups, url)
+            if removeDuplicates:
+                if self.stats is not None:
+                    self.stats.addDeduped(self.eid, len(t_output)-len(t_nodups))
+                _print("%s: %d undups (%d removed).", self.name, len(t_nodups), len(t_output)-len(t_nodups))
+                t_final = t_nodups
+            else:
+                t_final = t_output
+
+        _print("%s: %d final.", self.name, len(t_final))
+
+        return t_final
+
+    def saveDatas(self, t_output, t_nodups, url):
+        if url is not None:
+            url = str(url)
+        t_new = set(t_nodups)
+        now = time.time()
+        for r in t_output:
+            if r in t_new:
+                t_new.discard(r)
+                self.store.add(r, self.lineKey(r), url, now)
+            else:
+                self.store.seen(r, now)
+
+
+class ScanEngine():
+    """Global settings, url filtering and the list of extractors."""
+
+    def __init__(self, inScope=None):
+        # inScope: callable(url) -> bool, Burp's callbacks.isInScope in the extension
+        self.inScope = inScope
+        self.extractors = []
+        self.plan = None
+        self.planKey = None
+        self.cache = ResultCache()
+        # url -> extension and file checks verdict
+        self.urlVerdicts = LRUCache(URL_VERDICTS_CACHE_SIZE)
+        # origin and path prefix -> verdict of inScope, see setScope()
+        self.scopeVerdicts = ScopeCache(SCOPE_VERDICTS_CACHE_SIZE)
+        # url -> (validators, digest) of the last response scanned
+        self.urlValidators = LRUCache(URL_VALIDATORS_CACHE_SIZE)
+        self.stats = ScanStats()
+        # directory of the stores currently opened
+        self.storeDirectory = None
+        self.initSettings()
+
+    def initSettings(self):
+        self.settings = defaultSettings()
+        self.postLoadSettings()
+
+    def loadSettings(self, settings):
+        for k in SETTINGS_KEYS + ("extractors",):
+            if k in settings:
+                self.settings[k] = settings[k]
+        self.postLoadSettings()
+
+    def postLoadSettings(self):
+        setVerboseMode( self.settings["verboseMode"] )
+        if registry.setBackend( self.settings["regexBackend"] ):
+            # the regexps below and the ones of the tabs are compiled by the new engine
+            _print("Regexp engine: %s", registry.backend)
+            for extractor in self.extractors:
+                extractor.recompile()
+        self.settings["_ignoreExtensions"] = parseIgnoreExtensions( self.settings["ignoreExtensions"] )
+        self.settings["__ignoreExtensions"] = compileIgnoreExtensions( self.settings["_ignoreExtensions"] )
+        self.settings["_ignoreFiles"], self.settings["__ignoreFiles"] = parseIgnoreFiles( self.settings["ignoreFiles"] )
+        self.settings["_ignoreContentTypes"] = parseMimeTypes( self.settings["ignoreContentTypes"] )
+        trace.resize( int(self.settings["traceSize"]) )
+        self.urlVerdicts.clear()
+        self.cache.resize( int(self.settings["cacheEntries"]), int(self.settings["cacheSize"])*1024*1024 )
+        for extractor in self.extractors:
+            extractor.provenance.setMaxUrls( int(self.settings["provenanceUrls"]) )
+        if self.settings["storeDirectory"] != self.storeDirectory:
+            self.storeDirectory = self.settings["storeDirectory"]
+            for extractor in self.extractors:
+                self.openStore(extractor)
+
+    def openStore(self, extractor):
+        if not len(self.storeDirectory or ""):
+            extractor.closeStore()
+            return
+        try:
+            extractor.openStore( os.path.join(self.storeDirectory, extractor.eid) )
+        except (IOError, OSError) as e:
+            print("Cannot open the store! ("+str(e)+")")
+            extractor.closeStore()
+
+    def flushStores(self):
+        for extractor in self.extractors:
+            if extractor.store is not None:
+                extractor.store.flush()
+
+    def closeStores(self):
+        for extractor in self.extractors:
+            extractor.closeStore()
+
+    def addExtractor(self, eid, name, config=None, exclude=None, enabled=True, maxBodySize=None, contentAllow="", contentDeny=""):
+        extractor = ExtractorEngine(eid, name, config, exclude, enabled, maxBodySize, contentAllow, contentDeny)
+        extractor.stats = self.stats
+        extractor.provenance.setMaxUrls( int(self.settings["provenanceUrls"]) )
+        self.openStore(extractor)
+        self.extractors.append( extractor )
+        return extractor
+
+    def removeExtractor(self, eid, purge=False):
+        """Remove the extractor, its store is deleted too with purge."""
+        for extractor in self.extractors:
+            if extractor.eid == eid and extractor.store is not None:
+                if purge:
+                    extractor.store.destroy()
+                extractor.closeStore()
+        self.extractors = [ extractor for extractor in self.extractors if extractor.eid != eid ]
+
+    def getMaxBodySize(self, extractor):
+        """Max body size of the extractor in bytes, 0 means no limit."""
+        if extractor.maxBodySize is None:
+            return int(self.settings["maxBodySize"]) * 1024
+        return int(extractor.maxBodySize) * 1024
+
+    def getPlan(self):
+        key = tuple([ (extractor.eid, extractor.enabled, extractor.version, self.getMaxBodySize(extractor)) for extractor in self.extractors ])
+        key = key + (self.settings["patternTimeout"], self.settings["quarantineAfter"])
+        if self.plan is None or key != self.planKey:
+            t_limits = dict([ (extractor.eid, self.getMaxBodySize(extractor)) for extractor in self.extractors ])
+            self.plan = ScanPlan(self.extractors, t_limits, int(self.settings["patternTimeout"])/1000.0, int(self.settings["quarantineAfter"]), self.stats)
+            self.planKey = key
+            self.cache.setFingerprint( self.getFingerprint() )
+        return self.plan
+
+    def getStats(self):
+        """Stats as a JSON-ready dict, with the names of the tabs."""
+        t_stats = self.stats.toDict( dict([ (extractor.eid, extractor.name) for extractor in self.extractors ]) )
+        t_stats["provenance"] = {}
+        for extractor in self.extractors:
+            t_stats["provenance"][extractor.eid] = extractor.provenance.getStats()
+            t_stats["provenance"][extractor.eid]["name"] = extractor.name
+        t_stats["scope"].update( self.scopeVerdicts.getStats() )
+        return t_stats
+
+    def getFingerprint(self):
+        """Digest of what the enabled extractors would find, changes with any config or exclude list."""
+        t_active = [ (extractor.eid, extractor.config, extractor.exclude, self.getMaxBodySize(extractor)) for extractor in self.extractors if extractor.enabled ]
+        return hashlib.md5( json.dumps(t_active).encode('utf-8') ).hexdigest()
+
+    def match(self, resp):
+        """Return a dict eid -> list of (key, result) for every enabled extractor, resp is a Response."""
+        return self.getPlan().run(resp)
+
+    def extract(self, resp):
+        """Return a dict eid -> lines found in the Response resp, before deduplication.
+
+        Identical bodies are only grepped once, the results are replayed from the cache.
+        A response with the validators (ETag, Last-Modified, Content-Length) of
+        the last one scanned on the same url is replayed without reading its
+        body, a 304 has nothing to grep.
+        """
+        plan = self.getPlan()
+
+        if resp.getStatusCode() == 304:
+            self.stats.addNotModified()
+            _trace(resp.getUrl(), "validators", "304")
+            return {}
+
+        start = time.time()
+        t_eids = self.checkContent(resp)
+        self.stats.addStage("checkContent", time.time()-start)
+        if not len(t_eids):
+            _trace(resp.getUrl(), "content", "ignored", time.time()-start)
+            return {}
+
+        validators = None
+        if not plan.headers:
+            # the headers can't be skipped when some patterns read them
+            validators = resp.getValidators()
+        if validators is not None:
+            entry = self.urlValidators.get(str(resp.getUrl()))
+            if entry is not None and entry[0] == validators:
+                t_results = self.cache.get( (self.cache.fingerprint, tuple(sorted(t_eids)), entry[1]) )
+                if t_results is not None:
+                    _print("Unchanged: %s", resp.getUrl())
+                    _trace(resp.getUrl(), "validators", "unchanged")
+                    self.stats.addUnchanged(resp.getBodySize())
+                    for eid in t_results:
+                        self.stats.addCacheHit(eid)
+                    return t_results
+
+        digest = resp.getDigest(plan.headers)
+        if plan.url:
+            # same content, other results for the patterns on the url
+            digest = (digest, str(resp.getUrl()))
+        key = (self.cache.fingerprint, tuple(sorted(t_eids)), digest)
+        t_results = self.cache.get(key)
+        if t_results is not None:
+            _print("Cache hit: %s", resp.getUrl())
+            _trace(resp.getUrl(), "cache", "hit")
+            for eid in t_results:
+                self.stats.addCacheHit(eid)
+            if validators is not None:
+                self.urlValidators.put(str(resp.getUrl()), (validators, digest))
+            return t_results
+
+        t_aborted = []
+        t_times = {}
+        start = time.time()
+        t_hits = plan.run(resp, t_aborted, t_times, t_eids)
+        _trace(resp.getUrl(), "patterns", sum([ len(hits) for hits in t_hits.values() ]), time.time()-start)
+        size = resp.getBodySize()
+        t_results = {}
+        for extractor in self.extractors:
+            if extractor.eid in t_hits:
+                start = time.time()
+                t_results[extractor.eid] = extractor.filter( t_hits[extractor.eid] )
+                elapsed = time.time() - start
+                self.stats.addStage("filter", elapsed)
+                self.stats.addTab(extractor.eid, size, t_times[extractor.eid]+elapsed, len(t_hits[extractor.eid]), len(t_hits[extractor.eid])-len(t_results[extractor.eid]))
+        # the results of an aborted pattern are incomplete, don't replay them
+        if not len(t_aborted):
+            self.cache.put(key, t_results)
+            if validators is not None:
+                self.urlValidators.put(str(resp.getUrl()), (validators, digest))
+        return t_results
+
+    def checkUrl(self, url):
+        """Run the scope, extension and file checks, url can be a java.net.URL."""
+        stringURL = str(url)
+        _print("Scanning: %s", stringURL)
+
+        start = time.time()
+        inScope = self.checkScope(url)
+        # the rejects are timed too
+        self.stats.addStage("checkScope", time.time()-start)
+        if not inScope:
+            _trace(stringURL, "scope", "out", time.time()-start)
+            return False
+
+        # the extension and file checks only depend on the url and the settings
+        verdict = self.urlVerdicts.get(stringURL)
+        if verdict is None:
+            verdict = self.checkExtensionAndFile(stringURL, urlparse(stringURL).path)
+            self.urlVerdicts.put(stringURL, verdict)
+        if not verdict:
+            _trace(stringURL, "url", "ignored")
+            return False
+
+        _print("Grepping: %s", stringURL)
+        return True
+
+    def checkContent(self, resp):
+        """Return the set of the enabled extractors accepting the content type of the Response resp.
+
+        Only the headers and the first bytes of the body are read.
+        """
+        t_extractors = [ extractor for extractor in self.extractors if extractor.enabled ]
+        t_ignore = self.settings["_ignoreContentTypes"]
+        if not len(t_ignore) and not len([ 1 for extractor in t_extractors if len(extractor._contentAllow) or len(extractor._contentDeny) ]):
+            return set([ extractor.eid for extractor in t_extractors ])
+
+        t_types = contentTypes(resp)
+        t_eids = set()
+        for extractor in t_extractors:
+            if allowContent(t_types, t_ignore, extractor._contentAllow, extractor._contentDeny):
+                t_eids.add( extractor.eid )
+            else:
+                _print("%s: content ignored %s: %s", extractor.name, t_types, resp.getUrl())
+        return t_eids
+
+    def checkExtensionAndFile(self, stringURL, path):
+        start = time.time()
+        verdict = self.checkExtension(path)
+        self.stats.addStage("checkExtension", time.time()-start)
+        if not verdict:
+            return False
+        start = time.time()
+        verdict = self.checkFile(stringURL)
+        self.stats.addStage("checkFile", time.time()-start)
+        return verdict
+
+    def checkFile(self, url):
+        # a single regexp most of the time, see combineRegexps()
+        for regexp in self.settings["__ignoreFiles"]:
+            if regexp.search(url):
+                _print("File ignored: %s", url)
+                return False
+
+        _print("File not ignored: %s", url)
+        return True
+
+    def setScope(self, config=None):
+        """The scope changed, config is its JSON (Burp's target.scope) to key
+        the verdicts by origin or path prefix, None keys them by url."""
+        self.scopeVerdicts.setDepth( scopeDepth(config) )
+
+    def checkScope(self, url):
+        _print("scope check: %s", url)
+        if self.settings["scopeOnly"] and self.inScope is not None and not(self.isInScope(url)):
+            _print("OOS: %s", url)
+            return False
+
+        _print("Scope OK: %s", url)
+        return True
+
+    def isInScope(self, url):
+        verdict = self.scopeVerdicts.get(url)
+        self.stats.addScopeCheck(verdict is not None)
+        if verdict is None:
+            verdict = bool(self.inScope(url))
+            self.scopeVerdicts.put(url, verdict)
+        return verdict
+
+    def checkExtension(self, path):
+        _print("extension check: %s", path)
+        t_set, t_suffixes = self.settings["__ignoreExtensions"]
+        name = path[path.rfind("/")+1:]
+        dot = name.rfind(".")
+        if (dot >= 0 and name[dot+1:] in t_set) or (len(t_suffixes) and path.endswith(t_suffixes)):
+            _print("Extension ignored: %s", path)
+            return False
+
+        _print("Extension OK: %s", path)
+        return True
+
+    def scan(self, resp):
+        """Scan one Response with every extractor.
+
+        Returns a list of (extractor, lines) tuples, empty when the url has
+        been filtered out.
+        """
+        if not self.checkUrl(resp.getUrl()):
+            return []
+
+        t_results = self.extract(resp)
+        t_found = []
+        for extractor in self.extractors:
+            if not extractor.eid in t_results:
+                continue
+            t_lines = extractor.dedup(t_results[extractor.eid], self.settings["removeDuplicates"], resp.getUrl())
+            t_found.append( (extractor, t_lines) )
+        return t_found
@@ -0,0 +1,357 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# java.util.regex backend, under Jython: re is written in python there and is
+# way slower than the JVM's Pattern. The regexps of the configs are written
+# for re, translate() rewrites what java reads differently:
+#
+#   (?P<name>...) and (?P=name)        plain group and \N backreference
+#   (?i) anywhere, python applies it   removed, added to the compile flags
+#   to the whole regexp
+#   \Z, \v, \b in a class, octal       \z, \x0B, \x08, \x{...}
+#   [ and && in a class, lone { }      escaped, they're literals for python
+#   {,n}                               {0,n}
+#   . ^ $ and \n                       UNIX_LINES, \n is the only line end
+#
+# What can't be translated (conditionals, verbose or locale flags) raises a
+# ValueError and the registry keeps re for that regexp.
+#
+# JavaRegexp has the part of the re API the extension uses, it matches on
+# any CharSequence: BurpResponse hands out a CharBuffer over Burp's byte[]
+# (see charSequence()) so the response is never converted to a python string.
+#
+# With a deadline the text is read through a DeadlineSequence: java calls its
+# charAt() all along the search, that's where the time budget stops a regexp
+# that backtracks, not after it returned. It costs a python call per char
+# read: the scan plan only does it for the regexps that can backtrack and
+# the ones already over budget once (bench.py --deadline-cost).
+#
+
+import re
+import sys
+import time
+
+try:
+    from java.util.regex import Pattern, PatternSyntaxException
+    from java.nio import CharBuffer
+    from java.lang import CharSequence
+except ImportError:
+    # CPython, only translate() is of use
+    Pattern = None
+    CharSequence = object
+
+PY2 = sys.version_info[0] == 2
+
+# flags of java.util.regex.Pattern
+JAVA_UNIX_LINES = 0x01
+JAVA_CASE_INSENSITIVE = 0x02
+JAVA_MULTILINE = 0x08
+JAVA_DOTALL = 0x20
+JAVA_UNICODE_CASE = 0x40
+JAVA_UNICODE_CHARACTER_CLASS = 0x100
+
+# inline flag -> java flags, None when java doesn't do the same thing
+JAVA_INLINE_FLAGS = {"i": JAVA_CASE_INSENSITIVE, "m": JAVA_MULTILINE, "s": JAVA_DOTALL, "u": JAVA_UNICODE_CASE | JAVA_UNICODE_CHARACTER_CLASS, "a": 0, "x": None, "L": None}
+JAVA_SCOPED_FLAGS = {"i": "i", "m": "m", "s": "s", "u": "uU", "a": "", "x": None, "L": None}
+
+# escapes known by re, python 2 reads any other letter as itself
+if PY2:
+    PYTHON_ESCAPES = "abBdDfnrsStvwWxAZ"
+else:
+    PYTHON_ESCAPES = "abBdDfnrsStvwWxAZuUN"
+
+QUANTIFIER = re.compile(r'\{(\d*)(,?)(\d*)\}')
+GROUP_NAME = re.compile(r'\(\?P<(\w+)>')
+GROUP_REFERENCE = re.compile(r'\(\?P=(\w+)\)')
+INLINE_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+SCOPED_FLAGS = re.compile(r'\(\?([aiLmsux]*)(?:-([imsx]+))?:')
+OCTAL = re.compile(r'0[0-7]{0,2}|[0-7]{3}')
+BACKREFERENCE = re.compile(r'[1-9][0-9]?')
+# chars read between two checks of the deadline
+DEADLINE_CHECK_EVERY = 4096
+
+
+class RegexpTimeout(Exception):
+    """The time budget of a regexp is over, raised from within the search."""
+    pass
+
+
+def available():
+    return Pattern is not None
+
+
+def charSequence(text):
+    """text as a java CharSequence, converted once for all the regexps."""
+    if Pattern is None or not isinstance(text, (str, type(u""))):
+        return text
+    return CharBuffer.wrap(text)
+
+
+class DeadlineSequence(CharSequence):
+    """CharSequence raising RegexpTimeout from charAt() once the deadline is over."""
+
+    def __init__(self, text, deadline):
+        self.text = charSequence(text)
+        self.deadline = deadline
+        self.reads = 0
+
+    def charAt(self, i):
+        self.reads = self.reads + 1
+        if self.reads >= DEADLINE_CHECK_EVERY:
+            self.reads = 0
+            if time.time() > self.deadline:
+                raise RegexpTimeout()
+        return self.text.charAt(i)
+
+    def length(self):
+        return self.text.length()
+
+    def subSequence(self, start, end):
+        return self.text.subSequence(start, end)
+
+    def toString(self):
+        return self.text.toString()
+
+
+def javaFlags(flags):
+    """Java flags of the re flags."""
+    jflags = JAVA_UNIX_LINES
+    if flags & re.VERBOSE:
+        raise ValueError("verbose regexp")
+    if flags & re.LOCALE:
+        raise ValueError("locale dependent regexp")
+    if flags & re.IGNORECASE:
+        jflags = jflags | JAVA_CASE_INSENSITIVE
+    if flags & re.MULTILINE:
+        jflags = jflags | JAVA_MULTILINE
+    if flags & re.DOTALL:
+        jflags = jflags | JAVA_DOTALL
+    if PY2 and flags & re.UNICODE:
+        # python 3 str regexps are always unicode, the flag isn't given by the configs
+        jflags = jflags | JAVA_UNICODE_CASE | JAVA_UNICODE_CHARACTER_CLASS
+    return jflags
+
+
+def translate(source, flags=0):
+    """Return the java source and flags of the python regexp, ValueError for
+    what java.util.regex can't do the same way."""
+    jflags = javaFlags(flags)
+    out = []
+    # group name -> number, the names are dropped
+    t_names = {}
+    groups = 0
+    inClass = False
+    classStart = 0
+    i = 0
+    n = len(source)
+    while i < n:
+        c = source[i]
+
+        if c == "\\":
+            if i+1 >= n:
+                raise ValueError("trailing backslash")
+            d = source[i+1]
+            m = OCTAL.match(source, i+1)
+            if m is not None and (d == "0" or len(m.group(0)) == 3):
+                out.append( "\\x{%x}" % int(m.group(0), 8) )
+                i = m.end()
+                continue
+            if d.isdigit():
+                if inClass:
+                    raise ValueError("backreference in a class")
+                m = BACKREFERENCE.match(source, i+1)
+                # wrapped, \1 followed by a digit would be \1x for java
+                out.append( "(?:\\"+m.group(0)+")" )
+                i = m.end()
+                continue
+            if d == "Z":
+                out.append( "\\z" )
+            elif d == "v":
+                out.append( "\\x0B" )
+            elif d == "b" and inClass:
+                out.append( "\\x08" )
+            elif d == "U" and "U" in PYTHON_ESCAPES:
+                out.append( "\\x{"+source[i+2:i+10]+"}" )
+                i = i + 10
+                continue
+            elif d.isalpha() and not d in PYTHON_ESCAPES:
+                out.append( d )
+            else:
+                out.append( c+d )
+            i = i + 2
+            continue
+
+        if inClass:
+            if c == "]" and i > classStart:
+                inClass = False
+                out.append( c )
+            elif c in "[]":
+                out.append( "\\"+c )
+            elif c == "&" and source.startswith("&&", i):
+                out.append( "&\\&" )
+                i = i + 1
+            else:
+                out.append( c )
+            i = i + 1
+            continue
+
+        if c == "[":
+            inClass = True
+            out.append( c )
+            i = i + 1
+            if source.startswith("^", i):
+                out.append( "^" )
+                i = i + 1
+            classStart = i
+            continue
+
+        if c == "(" and source.startswith("(?", i):
+            m = GROUP_NAME.match(source, i)
+            if m is not None:
+                groups = groups + 1
+                t_names[m.group(1)] = groups
+                out.append( "(" )
+                i = m.end()
+                continue
+            m = GROUP_REFERENCE.match(source, i)
+            if m is not None:
+                if not m.group(1) in t_names:
+                    raise ValueError("unknown group name")
+                out.append( "(?:\\"+str(t_names[m.group(1)])+")" )
+                i = m.end()
+                continue
+            if source.startswith("(?#", i):
+                j = source.find(")", i)
+                if j < 0:
+                    raise ValueError("unterminated comment")
+                i = j + 1
+                continue
+            m = INLINE_FLAGS.match(source, i)
+            if m is not None:
+                for flag in m.group(1):
+                    if JAVA_INLINE_FLAGS[flag] is None:
+                        raise ValueError("unsupported flag "+flag)
+                    jflags = jflags | JAVA_INLINE_FLAGS[flag]
+                i = m.end()
+                continue
+            m = SCOPED_FLAGS.match(source, i)
+            if m is not None:
+                on = ""
+                for flag in m.group(1):
+                    if JAVA_SCOPED_FLAGS[flag] is None:
+                        raise ValueError("unsupported flag "+flag)
+                    on = on + JAVA_SCOPED_FLAGS[flag]
+                off = m.group(2) or ""
+                if "x" in off:
+                    raise ValueError("unsupported flag x")
+                if len(off):
+                    off = "-" + off
+                out.append( "(?"+on+off+":" )
+                i = m.end()
+                continue
+            if source.startswith("(?(", i):
+                raise ValueError("conditional group")
+            # (?: (?= (?! (?<= (?<! (?>
+            out.append( "(?" )
+            i = i + 2
+            continue
+
+        if c == "(":
+            groups = groups + 1
+        elif c == "{":
+            m = QUANTIFIER.match(source, i)
+            if m is not None and (len(m.group(1)) or len(m.group(2))):
+                out.append( "{"+(m.group(1) or "0")+m.group(2)+m.group(3)+"}" )
+                i = m.end()
+                continue
+            out.append( "\\{" )
+            i = i + 1
+            continue
+        elif c == "}":
+            out.append( "\\}" )
+            i = i + 1
+            continue
+
+        out.append( c )
+        i = i + 1
+
+    if inClass:
+        raise ValueError("unterminated class")
+    return "".join(out), jflags
+
+
+class JavaMatch():
+    """re match object over a java MatchResult."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def group(self, n=0):
+        return self.result.group(n)
+
+    def groups(self):
+        return tuple([ self.result.group(i) for i in range(1, self.result.groupCount()+1) ])
+
+    def start(self, n=0):
+        return self.result.start(n)
+
+    def end(self, n=0):
+        return self.result.end(n)
+
+    def span(self, n=0):
+        return (self.result.start(n), self.result.end(n))
+
+
+class JavaRegexp():
+    """Compiled regexp with the re API used by the extension, matched by java.util.regex."""
+
+    native = True
+
+    def __init__(self, source, flags=0):
+        # same errors as re for an invalid regexp, and the same flags: the
+        # inline ones like (?i) are in there, the prefilter reads them
+        self.pattern = source
+        self.flags = re.compile(source, flags).flags
+        javaSource, javaFlags = translate(source, flags)
+        try:
+            self.jpattern = Pattern.compile(javaSource, javaFlags)
+        except PatternSyntaxException as e:
+            raise ValueError(e.getDescription())
+        self.groups = self.jpattern.matcher("").groupCount()
+
+    def matcher(self, text, pos=0):
+        matcher = self.jpattern.matcher(text)
+        if pos:
+            pos = min(pos, matcher.regionEnd())
+            # like re, what's before pos is seen by the lookbehinds and ^
+            matcher.useTransparentBounds(True)
+            matcher.useAnchoringBounds(False)
+            matcher.region(pos, matcher.regionEnd())
+        return matcher
+
+    def finditer(self, text, pos=0):
+        matcher = self.matcher(text, pos)
+        while matcher.find():
+            yield JavaMatch(matcher.toMatchResult())
+
+    def iterGroup(self, text, n=1, deadline=None):
+        """Group n of every match, None when it didn't participate, cheaper than finditer().
+        RegexpTimeout is raised during the search once time.time() is over deadline."""
+        if deadline is not None:
+            text = DeadlineSequence(text, deadline)
+        matcher = self.jpattern.matcher(text)
+        while matcher.find():
+            yield matcher.group(n)
+
+    def search(self, text, pos=0):
+        matcher = self.matcher(text, pos)
+        if matcher.find():
+            return JavaMatch(matcher.toMatchResult())
+        return None
+
+    def match(self, text, pos=0):
+        matcher = self.matcher(text, pos)
+        if matcher.lookingAt():
+            return JavaMatch(matcher.toMatchResult())
+        return None
@@ -0,0 +1,83 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Keyword sets: thousands of fixed strings (API key prefixes, hostnames,
+# parameter names...) found in a single pass over the response.
+#
+# The keywords are merged in a trie, the trie is written as one regexp
+# (AKIA|AIza|ASIA -> A(?:KIA|Iza|SIA)) and wrapped in a lookahead so every
+# position is tried once and overlapping keywords are all found. re runs it
+# in C, a hand-written Aho-Corasick loop is slower in pure python.
+#
+
+import re
+
+
+class KeywordSet():
+    """Every occurrence of a set of keywords in a text, case sensitive or not."""
+
+    def __init__(self, keywords, ignorecase=False):
+        self.ignorecase = ignorecase
+        t_keywords = set()
+        for keyword in keywords:
+            if ignorecase:
+                keyword = keyword.lower()
+            if len(keyword):
+                t_keywords.add( keyword )
+        self.keywords = frozenset(t_keywords)
+        # at a given position the trie returns the longest keyword,
+        # the other keywords starting there are its prefixes
+        self.prefixes = {}
+        for keyword in self.keywords:
+            self.prefixes[keyword] = sorted([ other for other in self.keywords if keyword.startswith(other) ], key=len)
+        self.regexp = None
+        if len(self.keywords):
+            flags = 0
+            if ignorecase:
+                flags = re.IGNORECASE
+            first = "".join([ re.escape(c) for c in sorted(set([ keyword[0] for keyword in self.keywords ])) ])
+            # the character class lets re skip the positions where no keyword starts
+            self.regexp = re.compile("(?=["+first+"])(?=("+self.trieRegexp()+"))", flags)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def trieRegexp(self):
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for c in keyword:
+                node = node.setdefault(c, {})
+            node[""] = True
+        return self._nodeRegexp(trie)
+
+    def _nodeRegexp(self, node):
+        t_alternatives = []
+        for c in sorted([ c for c in node if len(c) ]):
+            t_alternatives.append( re.escape(c) + self._nodeRegexp(node[c]) )
+        if not len(t_alternatives):
+            return ""
+        if len(t_alternatives) == 1:
+            regexp = t_alternatives[0]
+        else:
+            regexp = "(?:" + "|".join(t_alternatives) + ")"
+        if "" in node:
+            # greedy: the longer keyword wins, the shorter one is a prefix
+            regexp = "(?:" + regexp + ")?"
+        return regexp
+
+    def finditer(self, text, pos=0):
+        """Yield (keyword, start, end) for every occurrence, keyword is lowercase when ignorecase."""
+        if self.regexp is None:
+            return
+        for m in self.regexp.finditer(text, pos):
+            start = m.start()
+            longest = m.group(1)
+            if self.ignorecase:
+                longest = longest.lower()
+            if not longest in self.prefixes:
+                # odd case folding
+                continue
+            for keyword in self.prefixes[longest]:
+                yield (keyword, start, start+len(keyword))
@@ -0,0 +1,295 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Check of the patterns of a config when it's applied: the constructs known
+# to be slow or useless are flagged, with a cheaper rewrite when it's safe,
+# and every pattern is timed on a small built-in corpus to give an idea of
+# its cost per MB of responses.
+#
+# risky() tells the scan plan which java regexps to run under the deadline
+# of their time budget, see ScanPlan.runRegexp().
+#
+
+import re
+import time
+
+from dataextractor_core.scanplan import sre_parse, _opname, requiredLiterals
+from dataextractor_core.registry import registry
+from dataextractor_core.corpus import CorpusGenerator
+from dataextractor_core.keywords import KeywordSet
+
+
+# bytes of the sample corpus, and its seed
+LINT_SAMPLE_SIZE = 256*1024
+LINT_SAMPLE_SEED = 4242
+# the sample is timed in chunks: re can't be interrupted during a search and
+# a leading .* is quadratic on a minified JS file
+LINT_CHUNK_SIZE = 4096
+# time budget of the benchmark of one pattern, in seconds
+LINT_BUDGET = 0.2
+# above that, a pattern is flagged as slow
+LINT_SLOW_MS_PER_MB = 100
+
+MAXREPEAT = getattr(sre_parse, "MAXREPEAT", 65535)
+# inline flags at the start of a regexp, they can't be moved into a group
+LEADING_FLAGS = re.compile(r'^(?:\(\?[aiLmsux]+\))+')
+REPEATS = ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+
+_sample = None
+
+
+def sampleChunks():
+    """Minified JS, HTML and JSON in chunks of LINT_CHUNK_SIZE, generated once."""
+    global _sample
+    if _sample is None:
+        generator = CorpusGenerator(LINT_SAMPLE_SEED)
+        text = "\n".join([ generator.js(LINT_SAMPLE_SIZE*2//5).getBody(), generator.html(LINT_SAMPLE_SIZE*3//10).getBody(), generator.json(LINT_SAMPLE_SIZE*3//10).getBody() ])
+        _sample = [ text[i:i+LINT_CHUNK_SIZE] for i in range(0, len(text), LINT_CHUNK_SIZE) ]
+    return _sample
+
+
+class PatternReport():
+    """Warnings, suggested rewrite and estimated cost of one pattern of a config."""
+
+    def __init__(self, key):
+        self.key = key
+        self.warnings = []
+        self.suggestion = None
+        # ms per MB of the sample, None when not measured
+        self.cost = None
+        # the budget was over before the end of the sample, cost is measured on a part of it
+        self.aborted = False
+        # nested quantifiers, too risky to time
+        self.nested = False
+
+    def format(self):
+        if self.cost is None:
+            cost = "not timed"
+        elif self.aborted:
+            cost = "~%.1f ms/MB (partial)" % self.cost
+        else:
+            cost = "%.1f ms/MB" % self.cost
+        lines = [ self.key+": "+cost ]
+        for warning in self.warnings:
+            lines.append( "    - "+warning )
+        if self.suggestion is not None:
+            lines.append( "    suggestion: "+self.suggestion )
+        return lines
+
+
+def _dotStar(item):
+    """"greedy" or "lazy" when the parsed item is .* (or .+), None otherwise."""
+    op, av = item
+    name = _opname(op)
+    if not name in ('MAX_REPEAT','MIN_REPEAT') or av[1] != MAXREPEAT or av[0] > 1:
+        return None
+    t_items = list(av[2])
+    if len(t_items) != 1 or _opname(t_items[0][0]) != 'ANY':
+        return None
+    if name == 'MIN_REPEAT':
+        return "lazy"
+    return "greedy"
+
+
+def _children(item):
+    """Parsed sequences inside the item."""
+    op, av = item
+    name = _opname(op)
+    if name in REPEATS:
+        return [ av[2] ]
+    if name == 'SUBPATTERN':
+        return [ av[-1] ]
+    if name == 'ATOMIC_GROUP':
+        return [ av ]
+    if name == 'BRANCH':
+        return list(av[1])
+    return []
+
+
+def _hasUnboundedRepeat(items):
+    for item in items:
+        if _opname(item[0]) in REPEATS and item[1][1] == MAXREPEAT:
+            return True
+        for child in _children(item):
+            if _hasUnboundedRepeat(child):
+                return True
+    return False
+
+
+def _hasSeparator(items):
+    """True when the sequence always matches a char outside of its repeats,
+    e.g. the dot of (\\w+\\.)+ that keeps the iterations apart."""
+    for item in items:
+        name = _opname(item[0])
+        if name in ('LITERAL','NOT_LITERAL','IN','ANY'):
+            return True
+        if name == 'SUBPATTERN' and _hasSeparator(item[1][-1]):
+            return True
+        if name in REPEATS and item[1][0] >= 1 and item[1][1] == 1 and _hasSeparator(item[1][2]):
+            return True
+    return False
+
+
+def _nestedRepeats(items):
+    """True when a repeat holds an unbounded repeat with nothing to tell their iterations apart: (a+)+, (\\w+\\s?)*"""
+    for item in items:
+        if _opname(item[0]) in REPEATS and item[1][1] > 1:
+            body = item[1][2]
+            if _hasUnboundedRepeat(body) and not _hasSeparator(body):
+                return True
+        for child in _children(item):
+            if _nestedRepeats(child):
+                return True
+    return False
+
+
+def suggest(report, regexp, source, note=None):
+    """Suggest source instead of the regexp, only when it compiles."""
+    if report.suggestion is not None:
+        return
+    try:
+        re.compile(source, regexp.flags)
+    except re.error as e:
+        return
+    report.suggestion = source
+    if note is not None:
+        report.suggestion = source+"   ("+note+")"
+
+
+def analyze(report, regexp):
+    """Static checks of the compiled regexp, the findings go in report."""
+    if not regexp.groups:
+        report.warnings.append( "no capture group: the matches are never reported, the data must be in group 1" )
+        flags = LEADING_FLAGS.match(regexp.pattern)
+        flags = flags.group(0) if flags is not None else ""
+        suggest(report, regexp, flags+"("+regexp.pattern[len(flags):]+")")
+    try:
+        parsed = list(sre_parse.parse(regexp.pattern, regexp.flags))
+    except Exception as e:
+        return
+    if not len(parsed):
+        return
+    source = regexp.pattern
+
+    first = parsed[0]
+    if _opname(first[0]) == 'SUBPATTERN' and len(first[1][-1]):
+        first = list(first[1][-1])[0]
+    if _dotStar(first) == "greedy":
+        report.warnings.append( "leading greedy .*: tried from every position of the response and runs to the end of each line" )
+        if _dotStar(parsed[0]) == "greedy" and source.startswith(".*"):
+            suggest(report, regexp, source[2:], "also finds the other matches of a line, not only the last one")
+
+    last = parsed[-1]
+    if _opname(last[0]) == 'SUBPATTERN' and len(last[1][-1]):
+        last = list(last[1][-1])[-1]
+    kind = _dotStar(last)
+    if kind == "greedy":
+        report.warnings.append( "trailing greedy .*: each match runs to the end of the line" )
+        if _dotStar(parsed[-1]) == "greedy" and source.endswith(".*") and not source.endswith("\\.*"):
+            suggest(report, regexp, source[:-2], "also finds the other matches of a line, not only the first one")
+    elif kind == "lazy" and _dotStar(parsed[-1]) == "lazy" and source.endswith(".*?") and not source.endswith("\\.*?"):
+        report.warnings.append( "trailing lazy .*? always matches nothing" )
+        suggest(report, regexp, source[:-3], "same results")
+
+    if _nestedRepeats(parsed):
+        report.nested = True
+        if getattr(regexp, "native", False):
+            report.warnings.append( "nested quantifiers: can backtrack exponentially on a near match, not timed" )
+        else:
+            report.warnings.append( "nested quantifiers: can backtrack exponentially on a near match, not timed, the time budget can't stop re during a search" )
+
+    if registry.derive(regexp, "literals", requiredLiterals) is None:
+        report.warnings.append( "no literal string of 3+ chars: run on every response, the prefilter can't skip it" )
+
+
+def _dotStars(items):
+    """Number of .* and .+ in the parsed sequence, the nested ones too."""
+    n = 0
+    for item in items:
+        if _dotStar(item) is not None:
+            n = n + 1
+        for child in _children(item):
+            n = n + _dotStars(child)
+    return n
+
+
+def risky(regexp):
+    """True when the regexp can backtrack for long: nested quantifiers, or a
+    .* followed by something else (tried again from every char it ran over),
+    e.g. url\\s*[:=].*['](.*?)['] on a long line without quotes."""
+    try:
+        parsed = list(sre_parse.parse(regexp.pattern, regexp.flags))
+    except Exception as e:
+        return False
+    if not len(parsed):
+        return False
+    if _nestedRepeats(parsed):
+        return True
+    n = _dotStars(parsed)
+    if _dotStar(parsed[-1]) is not None:
+        # a trailing one stops at the end of the line
+        n = n - 1
+    return n > 0
+
+
+def timeChunks(run, t_chunks=None, budget=LINT_BUDGET):
+    """Return the ms per MB of run(chunk) over the chunks (the sample by
+    default) and whether the budget was over before the end."""
+    if t_chunks is None:
+        t_chunks = sampleChunks()
+    start = time.time()
+    deadline = start + budget
+    size = 0
+    for chunk in t_chunks:
+        run(chunk)
+        size = size + len(chunk)
+        if time.time() > deadline:
+            break
+    return (time.time()-start) * 1000 / (max(size, 1) / 1048576.0), size < sum([ len(chunk) for chunk in t_chunks ])
+
+
+def timeRegexp(regexp, t_chunks=None, budget=LINT_BUDGET):
+    def run(chunk):
+        for m in regexp.finditer(chunk):
+            pass
+    return timeChunks(run, t_chunks, budget)
+
+
+def timeKeywords(pattern, t_chunks=None, budget=LINT_BUDGET):
+    keywordSet = pattern.keywordSet
+    if keywordSet is None:
+        keywordSet = KeywordSet(pattern.keywords, pattern.ignorecase)
+    def run(chunk):
+        for keyword, kstart, kend in keywordSet.finditer(chunk):
+            pattern.extract(chunk, kstart, kend)
+    return timeChunks(run, t_chunks, budget)
+
+
+def lintPattern(pattern):
+    """PatternReport of a pattern of the config, see config.ExtractorPattern."""
+    report = PatternReport(pattern.key)
+    if pattern.keywords is not None:
+        report.cost, report.aborted = timeKeywords(pattern)
+        return report
+    analyze(report, pattern.regexp)
+    if not report.nested:
+        # once per regexp, not on every apply
+        report.cost, report.aborted = registry.derive(pattern.regexp, "cost", timeRegexp)
+    if report.cost is not None and (report.aborted or report.cost > LINT_SLOW_MS_PER_MB):
+        report.warnings.append( "slow: over "+str(LINT_SLOW_MS_PER_MB)+" ms per MB of responses" )
+    return report
+
+
+def lintPatterns(t_patterns):
+    """PatternReports of the patterns, the most expensive first."""
+    t_reports = [ lintPattern(pattern) for pattern in t_patterns ]
+    t_reports.sort(key=lambda report: (-(report.cost or 0), report.key))
+    return t_reports
+
+
+def formatReports(t_reports):
+    lines = []
+    for report in t_reports:
+        lines.extend( report.format() )
+    return "\n".join(lines)
@@ -0,0 +1,122 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Verbose output shared by the Burp extension and the CLI, and the trace: the
+# last steps of the scan (url, stage, verdict, duration) kept in memory, to see
+# what happens under load without the console output of the verbose mode.
+#
+# _print("Scanning: %s", url) only formats the message in verbose mode, the
+# arguments are passed as is: no str() or concatenation on every response.
+#
+
+import time
+import threading
+from collections import deque
+
+# events kept by the trace, 0 disables it
+DEFAULT_TRACE_SIZE = 1000
+
+globalVerboseMode = False
+
+
+def setVerboseMode(enabled):
+    global globalVerboseMode
+    globalVerboseMode = enabled
+
+
+def isVerbose():
+    return globalVerboseMode
+
+
+def _print(txt, *args):
+    """Print txt % args in verbose mode, nothing is formatted otherwise."""
+    if globalVerboseMode:
+        if len(args):
+            txt = txt % args
+        print(txt)
+
+
+class TraceBuffer():
+    """Last events of the scan, the oldest ones are dropped.
+
+    An event is (time, url, stage, verdict, duration in seconds), url and
+    verdict are only converted to strings when the trace is dumped.
+    """
+
+    def __init__(self, size=DEFAULT_TRACE_SIZE):
+        self.lock = threading.Lock()
+        self.events = None
+        self.resize(size)
+
+    def __len__(self):
+        if self.events is None:
+            return 0
+        return len(self.events)
+
+    def resize(self, size):
+        with self.lock:
+            if size <= 0:
+                self.events = None
+            elif self.events is None or self.events.maxlen != size:
+                self.events = deque(self.events or [], size)
+
+    def add(self, url, stage, verdict=None, duration=0.0):
+        events = self.events
+        if events is not None:
+            # deque.append() is atomic, no lock on the hot path
+            events.append( (time.time(), url, stage, verdict, duration) )
+
+    def clear(self):
+        with self.lock:
+            if self.events is not None:
+                self.events.clear()
+
+    def drain(self):
+        """Return the events and forget them, see extend()."""
+        with self.lock:
+            if self.events is None:
+                return []
+            t_events = list(self.events)
+            self.events.clear()
+        return [ (t, str(url), stage, verdict if verdict is None else str(verdict), duration) for t, url, stage, verdict, duration in t_events ]
+
+    def extend(self, t_events):
+        """Add the events drained from another trace, e.g. in a worker process."""
+        with self.lock:
+            if self.events is not None:
+                self.events.extend( t_events )
+
+    def dump(self):
+        """The events as JSON-ready dicts, the oldest first."""
+        with self.lock:
+            if self.events is None:
+                return []
+            t_events = list(self.events)
+        t_dump = []
+        for t, url, stage, verdict, duration in t_events:
+            event = {}
+            event["time"] = round(t, 3)
+            event["url"] = str(url)
+            event["stage"] = stage
+            if verdict is not None:
+                event["verdict"] = str(verdict)
+            event["ms"] = round(duration*1000, 3)
+            t_dump.append( event )
+        return t_dump
+
+
+def formatTrace(t_events):
+    """Lines of the events of TraceBuffer.dump()."""
+    lines = []
+    for event in t_events:
+        lines.append( "%s.%03d %-12s %-14s %9.3f ms  %s" % (time.strftime("%H:%M:%S", time.localtime(event["time"])), int(event["time"]*1000)%1000, event["stage"], event.get("verdict", ""), event["ms"], event["url"]) )
+    return "\n".join(lines)
+
+
+# trace of the scan, shared by the engine, the scan plan and the workers
+trace = TraceBuffer()
+
+
+def _trace(url, stage, verdict=None, duration=0.0):
+    trace.add(url, stage, verdict, duration)
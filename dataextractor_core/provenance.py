@@ -0,0 +1,163 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Provenance of the datas of a tab: the urls where each data was found, and
+# the datas found on each url, for millions of hits.
+#
+# Datas and urls are stored once and referred to by integer ids, the postings
+# both ways are arrays of 32 bits ids: a (data, url) pair costs 8 bytes, with
+# no python object per pair (Jython's objects are big).
+#
+
+import random
+import threading
+from array import array
+
+
+# urls kept per data, 0 means all of them
+DEFAULT_PROVENANCE_URLS = 20
+
+# rough size in bytes of a string, a dict entry and an array, see getStats()
+STRING_OVERHEAD = 48
+ENTRY_OVERHEAD = 32
+ARRAY_OVERHEAD = 64
+ID_SIZE = 4
+
+
+class ProvenanceIndex():
+    """Urls of every data and datas of every url.
+
+    A data found on more than maxUrls urls keeps a uniform sample of them
+    (reservoir sampling) and the number of urls it was found on.
+    """
+
+    def __init__(self, maxUrls=DEFAULT_PROVENANCE_URLS):
+        self.maxUrls = maxUrls
+        self.lock = threading.Lock()
+        # the sample only needs to be uniform, not unpredictable
+        self.random = random.Random(0)
+        self._clear()
+
+    def __len__(self):
+        return len(self.valueIds)
+
+    def _clear(self):
+        # id -> value or url, None once the data is discarded
+        self.values = []
+        self.urls = []
+        # value or url -> id, they're interned by these dicts
+        self.valueIds = {}
+        self.urlIds = {}
+        # data id -> array of url ids, url id -> array of data ids
+        self.byValue = []
+        self.byUrl = []
+        # data id -> number of urls, above maxUrls only a sample is in byValue
+        self.counts = array('i')
+        self.pairs = 0
+        self.chars = 0
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def setMaxUrls(self, maxUrls):
+        """Only the next urls are sampled with the new limit."""
+        self.maxUrls = maxUrls
+
+    def add(self, value, url):
+        self.addAll([value], url)
+
+    def addAll(self, t_values, url):
+        """Record that the datas t_values were found on url."""
+        with self.lock:
+            uid = self.urlIds.get(url)
+            if uid is None:
+                uid = len(self.urls)
+                self.urls.append( url )
+                self.urlIds[url] = uid
+                self.byUrl.append( array('i') )
+                self.chars = self.chars + len(url)
+            for value in t_values:
+                self._add(self._valueId(value), uid)
+
+    def _valueId(self, value):
+        vid = self.valueIds.get(value)
+        if vid is None:
+            vid = len(self.values)
+            self.values.append( value )
+            self.valueIds[value] = vid
+            self.byValue.append( array('i') )
+            self.counts.append( 0 )
+            self.chars = self.chars + len(value)
+        return vid
+
+    def _add(self, vid, uid):
+        postings = self.byValue[vid]
+        others = self.byUrl[uid]
+        # same pair, whichever side is the shortest
+        if len(postings) <= len(others):
+            if uid in postings:
+                return
+        elif vid in others:
+            return
+        self.counts[vid] = self.counts[vid] + 1
+        if not self.maxUrls or len(postings) < self.maxUrls:
+            postings.append( uid )
+            others.append( vid )
+            self.pairs = self.pairs + 1
+            return
+        # the url replaces one of the sample with probability maxUrls/count
+        i = self.random.randrange(self.counts[vid])
+        if i < self.maxUrls:
+            self.byUrl[postings[i]].remove( vid )
+            postings[i] = uid
+            others.append( vid )
+
+    def discard(self, value):
+        with self.lock:
+            vid = self.valueIds.pop(value, None)
+            if vid is None:
+                return
+            for uid in self.byValue[vid]:
+                self.byUrl[uid].remove( vid )
+            self.pairs = self.pairs - len(self.byValue[vid])
+            self.chars = self.chars - len(value)
+            self.byValue[vid] = array('i')
+            self.counts[vid] = 0
+            self.values[vid] = None
+
+    def urlsOf(self, value):
+        """Urls where value was found, a sample of them above maxUrls."""
+        with self.lock:
+            vid = self.valueIds.get(value)
+            if vid is None:
+                return []
+            return [ self.urls[uid] for uid in self.byValue[vid] ]
+
+    def urlCount(self, value):
+        """Number of urls where value was found, a url dropped from the sample and found again counts twice."""
+        with self.lock:
+            vid = self.valueIds.get(value)
+            if vid is None:
+                return 0
+            return self.counts[vid]
+
+    def valuesOf(self, url):
+        """Datas found on url, the ones whose sample still holds it above maxUrls."""
+        with self.lock:
+            uid = self.urlIds.get(url)
+            if uid is None:
+                return []
+            return [ self.values[vid] for vid in self.byUrl[uid] ]
+
+    def getStats(self):
+        """Counters and an estimate of the memory used, in bytes."""
+        with self.lock:
+            stats = {}
+            stats["datas"] = len(self.valueIds)
+            stats["urls"] = len(self.urlIds)
+            stats["pairs"] = self.pairs
+            entries = len(self.values) + len(self.urls)
+            stats["size"] = self.chars + entries * (STRING_OVERHEAD + ENTRY_OVERHEAD + ARRAY_OVERHEAD) + len(self.values) * ID_SIZE + self.pairs * 2 * ID_SIZE
+            return stats
@@ -0,0 +1,87 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Registry of the compiled regexps, keyed by source and flags: the same
+# regexp in several tabs, or a config applied again, is only compiled (and
+# its literals analyzed, see scanplan.py) once. The scan plan relies on it
+# to run identical regexps once per response.
+#
+# The regexps are compiled by re or, under Jython, by java.util.regex (see
+# javaregex.py), a regexp java can't run the same way stays on re.
+#
+
+import re
+
+from dataextractor_core.log import _print
+from dataextractor_core.cache import LRUCache
+from dataextractor_core import javaregex
+
+
+# regexps kept, way more than any set of tabs needs
+PATTERN_REGISTRY_SIZE = 4096
+# auto is java when it's there
+REGEX_BACKENDS = ("auto","re","java")
+
+_MISSING = object()
+
+
+class PatternRegistry():
+
+    def __init__(self, size=PATTERN_REGISTRY_SIZE):
+        self.patterns = LRUCache(size)
+        # (source, flags) -> whatever was derived from the regexp, e.g. its literals
+        self.derived = LRUCache(size)
+        self.backend = "re"
+
+    def setBackend(self, name):
+        """Compile the next regexps with the backend name, see REGEX_BACKENDS.
+        Return True when it changed, the regexps already compiled must be compiled again."""
+        if name == "auto" or (name == "java" and not javaregex.available()):
+            if name == "java":
+                print("Invalid regexp engine ! (java.util.regex is only available under Jython, using re)")
+            name = "java" if javaregex.available() else "re"
+        if name == self.backend:
+            return False
+        self.backend = name
+        self.patterns.clear()
+        self.derived.clear()
+        return True
+
+    def build(self, source, flags=0):
+        """Compile the regexp with the current backend, not cached."""
+        if self.backend == "java":
+            try:
+                return javaregex.JavaRegexp(source, flags)
+            except re.error:
+                raise
+            except ValueError as e:
+                _print("Regexp kept on re, %s: %s", e, source)
+        return re.compile(source, flags)
+
+    def compile(self, source, flags=0):
+        key = (source, flags)
+        regexp = self.patterns.get(key)
+        if regexp is None:
+            regexp = self.build(source, flags)
+            self.patterns.put(key, regexp)
+        return regexp
+
+    def derive(self, regexp, name, function):
+        """Return function(regexp), computed once per regexp and name."""
+        key = (regexp.pattern, regexp.flags, name)
+        value = self.derived.get(key, _MISSING)
+        if value is _MISSING:
+            value = function(regexp)
+            self.derived.put(key, value)
+        return value
+
+    def getStats(self):
+        return self.patterns.getStats()
+
+
+registry = PatternRegistry()
+
+
+def compileRegexp(source, flags=0):
+    return registry.compile(source, flags)
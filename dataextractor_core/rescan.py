@@ -0,0 +1,152 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Re-scan of the responses already seen when a tab's config changes: only the
+# new or modified patterns are run, in a background thread that steps aside
+# while the live scan is busy.
+#
+# A source of responses has count() and iterResponses(), the BodyCache below
+# keeps the last in-scope responses compressed in memory, the extension also
+# reads Burp's proxy history.
+#
+
+import time
+import zlib
+import threading
+
+from dataextractor_core.log import _print
+from dataextractor_core.cache import LRUCache
+from dataextractor_core.response import Response
+from dataextractor_core.scanplan import ScanPlan
+
+
+RESCAN_SOURCES = ("off", "cache", "proxy")
+# responses kept at most by the body cache, whatever their size
+BODY_CACHE_MAX_ENTRIES = 100000
+# zlib level, speed matters more than the ratio
+BODY_CACHE_COMPRESSION = 1
+# pause of the re-scan while the live scan has work waiting, in seconds
+RESCAN_BUSY_SLEEP = 0.05
+# progress is reported every that many responses
+RESCAN_PROGRESS_STEP = 50
+
+
+class BodyCache():
+    """Last responses seen, one per url, compressed and bounded by their compressed size."""
+
+    def __init__(self, maxSize):
+        self.entries = LRUCache(BODY_CACHE_MAX_ENTRIES, maxSize, lambda entry: len(entry[2]) + len(entry[0]))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resize(self, maxSize):
+        self.entries.resize(BODY_CACHE_MAX_ENTRIES, maxSize)
+
+    def clear(self):
+        self.entries.clear()
+
+    def add(self, resp):
+        url = str(resp.getUrl())
+        validators = resp.getValidators()
+        if validators is not None:
+            entry = self.entries.get(url)
+            if entry is not None and entry[4] == validators:
+                # same body, not read again
+                return
+        headers = resp.getHeaders()
+        full = headers + resp.getBody()
+        try:
+            # one char per byte most of the time
+            data, encoding = full.encode('latin-1'), 'latin-1'
+        except UnicodeEncodeError:
+            data, encoding = full.encode('utf-8'), 'utf-8'
+        self.entries.put(url, (url, len(headers), zlib.compress(data, BODY_CACHE_COMPRESSION), encoding, validators))
+
+    def count(self):
+        return len(self.entries)
+
+    def iterResponses(self):
+        # the responses cached during the re-scan are not part of it
+        for url in self.entries.keys():
+            entry = self.entries.peek(url)
+            if entry is None:
+                continue
+            url, headersSize, data, encoding, validators = entry
+            full = zlib.decompress(data).decode(encoding)
+            yield Response(url, full[:headersSize], full[headersSize:])
+
+    def getStats(self):
+        return self.entries.getStats()
+
+
+class RescanJob():
+    """Run the patterns keys of extractor over the responses of source.
+
+    onResults(lines, url) gets the lines found before deduplication,
+    onProgress(done, total, finished) is called every RESCAN_PROGRESS_STEP
+    responses and at the end, busy() returns True while the live scan has
+    responses waiting.
+    """
+
+    def __init__(self, engine, extractor, keys, source, onResults, onProgress=None, busy=None):
+        self.engine = engine
+        self.extractor = extractor
+        self.keys = set(keys)
+        self.source = source
+        self.onResults = onResults
+        self.onProgress = onProgress
+        self.busy = busy
+        self.cancelled = False
+        self.thread = None
+        self.done = 0
+        self.total = 0
+        self.found = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="DataExtractor-rescan-"+str(self.extractor.eid))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def isAlive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def progress(self, finished=False):
+        if self.onProgress is not None:
+            self.onProgress(self.done, self.total, finished)
+
+    def run(self):
+        start = time.time()
+        try:
+            t_limits = { self.extractor.eid: self.engine.getMaxBodySize(self.extractor) }
+            # no stats: the Stats tab is about the live traffic
+            plan = ScanPlan([self.extractor], t_limits, int(self.engine.settings["patternTimeout"])/1000.0, int(self.engine.settings["quarantineAfter"]), None, { self.extractor.eid: self.keys })
+            self.total = self.source.count()
+            self.progress()
+            for resp in self.source.iterResponses():
+                if self.cancelled:
+                    break
+                while self.busy is not None and self.busy() and not self.cancelled:
+                    time.sleep(RESCAN_BUSY_SLEEP)
+                self.scan(plan, resp)
+                self.done = self.done + 1
+                if not self.done % RESCAN_PROGRESS_STEP:
+                    self.progress()
+        finally:
+            _print("%s: re-scan of %d/%d responses, %d results in %.1fs", self.extractor.name, self.done, self.total, self.found, time.time()-start)
+            self.progress(True)
+
+    def scan(self, plan, resp):
+        if not self.extractor.eid in self.engine.checkContent(resp):
+            return
+        t_hits = plan.run(resp)
+        if not len(t_hits.get(self.extractor.eid, [])):
+            return
+        t_lines = self.extractor.filter( t_hits[self.extractor.eid] )
+        if len(t_lines):
+            self.found = self.found + len(t_lines)
+            self.onResults(t_lines, resp.getUrl())
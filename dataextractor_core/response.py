@@ -0,0 +1,109 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# The response handed to the extractors. It's created once per response and
+# shared by all of them, the extension subclasses it to read Burp's byte[].
+#
+
+import re
+import hashlib
+
+from dataextractor_core.content import headerMimeType
+from dataextractor_core.javaregex import charSequence
+
+HEADERS_SEPARATORS = ("\r\n\r\n", "\n\n")
+STATUS_LINE = re.compile(r'^HTTP/[0-9.]+[ \t]+([0-9]{3})')
+VALIDATOR_HEADERS = re.compile(r'^(etag|last-modified|content-length)[ \t]*:[ \t]*([^\r\n]*)', re.IGNORECASE | re.MULTILINE)
+
+
+def textDigest(text):
+    if not isinstance(text, bytes):
+        try:
+            # one char per byte: same digest as the raw bytes
+            text = text.encode('latin-1')
+        except UnicodeEncodeError:
+            text = text.encode('utf-8')
+    return hashlib.md5(text).hexdigest()
+
+
+def parseValidators(headers):
+    """(ETag, Last-Modified, Content-Length) of the headers, None without an ETag or a Last-Modified."""
+    t_values = {}
+    for m in VALIDATOR_HEADERS.finditer(headers or ""):
+        t_values[m.group(1).lower()] = m.group(2).strip()
+    if not "etag" in t_values and not "last-modified" in t_values:
+        return None
+    return (t_values.get("etag"), t_values.get("last-modified"), t_values.get("content-length"))
+
+
+class Response():
+    """Headers and body of one response as text, one char per byte."""
+
+    def __init__(self, url, headers="", body=""):
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    @classmethod
+    def fromRaw(cls, url, raw):
+        """Split a raw HTTP response, anything not starting with a status line is a body."""
+        if raw.startswith("HTTP/"):
+            for sep in HEADERS_SEPARATORS:
+                pos = raw.find(sep)
+                if pos >= 0:
+                    return cls(url, raw[:pos+len(sep)], raw[pos+len(sep):])
+            return cls(url, raw, "")
+        return cls(url, "", raw)
+
+    def getUrl(self):
+        return self.url
+
+    def getHeaders(self):
+        return self.headers
+
+    def getBody(self):
+        return self.body
+
+    def getStatusCode(self):
+        """Status code of the response, None without a status line."""
+        m = STATUS_LINE.match(self.getHeaders() or "")
+        if m is None:
+            return None
+        return int(m.group(1))
+
+    def getValidators(self):
+        """See parseValidators(), the same validators on the same url mean the same body."""
+        return parseValidators(self.getHeaders())
+
+    def getBodySize(self):
+        return len(self.getBody())
+
+    def getHead(self, size):
+        """First size chars of the body, enough to sniff its type."""
+        return self.getBody()[:size]
+
+    def getMimeTypes(self):
+        """MIME types stated or inferred for the response, lowercase."""
+        t_types = []
+        mime = headerMimeType(self.getHeaders())
+        if mime is not None:
+            t_types.append( mime )
+        return t_types
+
+    def getFull(self):
+        """Headers and body, only for the patterns asking for the headers."""
+        return self.getHeaders() + self.getBody()
+
+    def getBodySequence(self):
+        """Body as a CharSequence, for the java regexps."""
+        return charSequence(self.getBody())
+
+    def getFullSequence(self):
+        return charSequence(self.getFull())
+
+    def getDigest(self, headers=False):
+        """Digest of the body, or of the whole response, used as a cache key."""
+        if headers:
+            return textDigest(self.getFull())
+        return textDigest(self.getBody())
@@ -0,0 +1,573 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Scan plan: all the patterns of all the enabled extractors, compiled together.
+#
+# Each pattern is parsed to find the literal strings any of its matches must
+# contain, e.g. "AKIA" or "A3T" or ... for the aws key regexp. All those
+# literals are merged into a single alternation that walks the response once,
+# then only the patterns whose literals showed up are actually run. Patterns
+# without a usable literal (e.g. ['"](.*?)['"]) are always run.
+#
+# A merged alternation of the patterns themselves would be cheaper again but
+# it changes the results: finditer() never returns overlapping matches so two
+# patterns matching the same bytes would hide each other.
+#
+# Identical regexps (same source and flags, see registry.py) are the same
+# compiled object: they're run once per response and their results go to
+# every tab having them, each one with its own key and exclude list.
+#
+# The keywords entries don't have that problem: all their keywords, from all
+# the extractors, are merged in one KeywordSet (two with the case insensitive
+# ones) that finds every occurrence in a single pass.
+#
+# The java regexps (see javaregex.py) run on a CharSequence of the response,
+# the python string is only built for the re regexps and the keywords.
+#
+# A pattern runs on its target only (see targets.py): the body, the headers,
+# the <script> blocks... each target is computed once per response.
+#
+
+import re
+import time
+import threading
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+from dataextractor_core.log import _print, _trace
+from dataextractor_core.keywords import KeywordSet
+from dataextractor_core.registry import registry
+from dataextractor_core.javaregex import RegexpTimeout
+from dataextractor_core.targets import TargetTexts, BODY_TARGETS, SLICE_TARGETS
+
+
+# shorter literals are too frequent to filter anything
+MIN_LITERAL_LENGTH = 3
+# drop the prefilter rather than building a huge alternation for a pattern
+MAX_LITERALS_PER_PATTERN = 64
+PREFILTER_CACHE_SIZE = 256
+
+
+def _opname(op):
+    # opcodes are strings in python2 ("literal") and named ints in python3 (LITERAL)
+    return str(op).upper()
+
+
+def _bestFactor(t_factors):
+    best = None
+    for factor in t_factors:
+        if not len(factor) or len(factor) > MAX_LITERALS_PER_PATTERN:
+            continue
+        score = (min([len(s) for s in factor]), -len(factor))
+        if best is None or score > best[0]:
+            best = (score, factor)
+    if best is None:
+        return None
+    return best[1]
+
+
+def _product(t_left, t_right):
+    if len(t_left) * len(t_right) > MAX_LITERALS_PER_PATTERN:
+        return None
+    return [ l+r for l in t_left for r in t_right ]
+
+
+def _literalSet(items):
+    """Return every string the parsed sequence can match when it's only made
+    of literals, small classes and alternations of those, None otherwise."""
+    t_strings = [""]
+
+    for op, av in items:
+        name = _opname(op)
+        t_part = None
+
+        if name == 'LITERAL':
+            t_part = [ unichr(av) ]
+        elif name == 'IN':
+            if len([ 1 for iop, iav in av if _opname(iop) != 'LITERAL' ]) == 0:
+                t_part = [ unichr(iav) for iop, iav in av ]
+        elif name == 'SUBPATTERN':
+            if not (len(av) == 4 and (av[1] or av[2])):
+                t_part = _literalSet(av[-1])
+        elif name == 'BRANCH':
+            t_part = []
+            for alternative in av[1]:
+                t_alternative = _literalSet(alternative)
+                if t_alternative is None:
+                    t_part = None
+                    break
+                t_part.extend( t_alternative )
+
+        if t_part is None:
+            return None
+        t_strings = _product(t_strings, t_part)
+        if t_strings is None:
+            return None
+
+    return t_strings
+
+
+def _factors(items):
+    """List the factors of a parsed pattern, a factor is a set of strings and
+    any match of the pattern contains at least one of them."""
+    t_factors = []
+    t_run = [""]
+
+    for op, av in items:
+        name = _opname(op)
+
+        t_part = None
+        if name in ('LITERAL','IN','SUBPATTERN','BRANCH'):
+            t_part = _literalSet([ (op, av) ])
+
+        if t_part is not None:
+            # e.g. xox[pboa]- gives xoxp-, xoxb-, xoxo-, xoxa-
+            t_product = _product(t_run, t_part)
+            if t_product is None:
+                t_factors.append( frozenset(t_run) )
+                t_product = t_part
+            t_run = t_product
+            continue
+
+        if t_run != [""]:
+            t_factors.append( frozenset(t_run) )
+            t_run = [""]
+
+        if name == 'SUBPATTERN':
+            # python3 has scoped flags (?i:...), don't try to be clever with them
+            if len(av) == 4 and (av[1] or av[2]):
+                continue
+            t_factors.extend( _factors(av[-1]) )
+        elif name == 'ATOMIC_GROUP':
+            t_factors.extend( _factors(av) )
+        elif name in ('MAX_REPEAT','MIN_REPEAT','POSSESSIVE_REPEAT'):
+            if av[0] >= 1:
+                t_factors.extend( _factors(av[2]) )
+        elif name == 'BRANCH':
+            t_alternatives = set()
+            for alternative in av[1]:
+                best = _bestFactor( _factors(alternative) )
+                if best is None:
+                    t_alternatives = None
+                    break
+                t_alternatives.update( best )
+            if t_alternatives:
+                t_factors.append( frozenset(t_alternatives) )
+
+    if t_run != [""]:
+        t_factors.append( frozenset(t_run) )
+
+    return t_factors
+
+
+def requiredLiterals(regexp):
+    """Return the set of literals one of which is part of any match of the
+    compiled regexp, or None when no such set is worth it."""
+    try:
+        parsed = sre_parse.parse(regexp.pattern, regexp.flags)
+    except Exception as e:
+        return None
+
+    best = _bestFactor( _factors(parsed) )
+    if best is None or min([len(s) for s in best]) < MIN_LITERAL_LENGTH:
+        return None
+    if regexp.flags & re.IGNORECASE:
+        best = frozenset([ s.lower() for s in best ])
+    return best
+
+
+class Prefilter():
+    """Find which of a set of literals occur in a text, in one pass."""
+
+    def __init__(self, literals, ignorecase):
+        self.literals = frozenset(literals)
+        self.ignorecase = ignorecase
+        self.cache = {}
+        # at a given position the alternation returns the longest literal,
+        # every other literal starting there is one of its prefixes
+        self.prefixes = {}
+        for lit in self.literals:
+            self.prefixes[lit] = [ other for other in self.literals if lit.startswith(other) ]
+        self.regexp = self.compile(self.literals)
+
+    def compile(self, literals):
+        # shared by the scan workers without a lock: another thread can empty
+        # the cache at any time, the regexp is returned from a local
+        key = frozenset(literals)
+        regexp = self.cache.get(key)
+        if regexp is None:
+            t_sorted = sorted(key, key=lambda s: (-len(s), s))
+            flags = 0
+            if self.ignorecase:
+                flags = re.IGNORECASE
+            regexp = registry.build("|".join([ re.escape(s) for s in t_sorted ]), flags)
+            if len(self.cache) >= PREFILTER_CACHE_SIZE:
+                self.cache = {}
+            self.cache[key] = regexp
+        return regexp
+
+    def search(self, text):
+        found = set()
+        regexp = self.regexp
+        pos = 0
+
+        while True:
+            m = regexp.search(text, pos)
+            if m is None:
+                break
+
+            lit = m.group(0)
+            if self.ignorecase:
+                lit = lit.lower()
+            if not lit in self.prefixes:
+                # odd case folding, better run everything
+                return set(self.literals)
+
+            new = False
+            for other in self.prefixes[lit]:
+                if not other in found:
+                    found.add( other )
+                    new = True
+            if len(found) == len(self.literals):
+                break
+            if not new:
+                # frequent literal, stop looking for the ones already found
+                regexp = self.compile( self.literals - found )
+            pos = m.start() + 1
+
+        return found
+
+
+class PlanEntry():
+
+    def __init__(self, extractor, pattern, maxBodySize=0):
+        self.extractor = extractor
+        self.eid = extractor.eid
+        self.maxBodySize = maxBodySize
+        self.key = pattern.key
+        self.pattern = pattern
+        self.regexp = pattern.regexp
+        self.target = pattern.target
+        self.headers = pattern.headers
+        if pattern.keywords is not None:
+            self.literals = None
+            self.ignorecase = pattern.ignorecase
+        else:
+            self.literals = registry.derive(self.regexp, "literals", requiredLiterals)
+            self.ignorecase = bool(self.regexp.flags & re.IGNORECASE)
+        # entries sharing this are run once per response
+        self.shared = (self.regexp, self.target)
+        # java regexp, run on a CharSequence
+        self.native = getattr(self.regexp, "native", False)
+        # java regexp read through a DeadlineSequence, see runRegexp()
+        self.risky = False
+        if self.native:
+            # lint imports this module
+            from dataextractor_core.lint import risky
+            self.risky = registry.derive(self.regexp, "risky", risky)
+
+
+class ScanPlan():
+    """All the patterns of the given extractors, run with a shared literal prefilter.
+
+    t_limits gives the max body size in bytes of every extractor (0: no
+    limit), timeout is the time budget of one pattern on one response in
+    seconds and quarantineAfter the number of overruns before a pattern is
+    skipped for good (0 disables both). t_keys limits the patterns of an
+    extractor to the given keys, e.g. for a re-scan of the new ones only.
+    """
+
+    def __init__(self, extractors, t_limits=None, timeout=0, quarantineAfter=0, stats=None, t_keys=None):
+        self.entries = []
+        self.eids = []
+        self.timeout = timeout
+        self.quarantineAfter = quarantineAfter
+        # ScanStats, or None to skip the timings
+        self.stats = stats
+        self.lock = threading.Lock()
+        if t_limits is None:
+            t_limits = {}
+        # the keywords entries, run apart
+        self.keywordEntries = []
+        for extractor in extractors:
+            if not extractor.enabled:
+                continue
+            self.eids.append( extractor.eid )
+            for pattern in extractor.getPatterns():
+                if t_keys is not None and extractor.eid in t_keys and not pattern.key in t_keys[extractor.eid]:
+                    continue
+                entry = PlanEntry(extractor, pattern, t_limits.get(extractor.eid, 0))
+                if pattern.keywords is not None:
+                    self.keywordEntries.append( entry )
+                else:
+                    self.entries.append( entry )
+
+        # keyword -> entries looking for it, for the case sensitive and insensitive sets
+        self.keywordSets = []
+        for ignorecase in (False, True):
+            t_owners = {}
+            for entry in self.keywordEntries:
+                if entry.ignorecase != ignorecase:
+                    continue
+                for keyword in entry.pattern.keywords:
+                    if ignorecase:
+                        keyword = keyword.lower()
+                    if len(keyword):
+                        t_owners.setdefault(keyword, []).append( entry )
+            if len(t_owners):
+                self.keywordSets.append( (KeywordSet(t_owners.keys(), ignorecase), t_owners) )
+        self.keywordHeaders = len([ e for e in self.keywordEntries if e.headers ]) > 0
+
+        t_sensitive = set()
+        t_insensitive = set()
+        for entry in self.entries:
+            if entry.literals is None:
+                continue
+            if entry.ignorecase:
+                t_insensitive.update( entry.literals )
+            else:
+                t_sensitive.update( entry.literals )
+
+        self.headers = len([ e for e in self.entries + self.keywordEntries if e.headers ]) > 0
+        self.prefilters = []
+        if len(t_sensitive):
+            self.prefilters.append( Prefilter(t_sensitive, False) )
+        if len(t_insensitive):
+            self.prefilters.append( Prefilter(t_insensitive, True) )
+
+        # (target, native) of the texts needed, see getTexts()
+        self.texts = set([ (entry.target, entry.native) for entry in self.entries ])
+        for prefilter in self.prefilters:
+            self.texts.add( ("body", getattr(prefilter.regexp, "native", False)) )
+        if len(self.keywordEntries):
+            self.texts.add( ("full" if self.keywordHeaders else "body", False) )
+            self.texts.add( ("body", False) )
+        # targets the prefilter looks for literals in
+        self.prefilterTargets = set([ entry.target for entry in self.entries if entry.literals is not None ])
+        # the results depend on the url, not only on the content
+        self.url = len([ e for e in self.entries if e.target == "url" ]) > 0
+
+        _print("Scan plan: %d patterns, %d without prefilter, %d keywords entries.", len(self.entries), len([e for e in self.entries if e.literals is None]), len(self.keywordEntries))
+
+    def run(self, resp, t_aborted=None, t_times=None, t_eids=None):
+        """Return a dict eid -> list of (key, result) for the Response resp.
+
+        The (eid, key) of the patterns stopped by their time budget are
+        appended to t_aborted, their results are incomplete. t_times gets the
+        time spent in the patterns of every eid, in seconds. t_eids limits
+        the scan to those extractors.
+        """
+        stats = self.stats
+        start = time.time()
+        texts = TargetTexts(resp)
+        t_texts = self.getTexts(texts, ("body","full"))
+        body = t_texts.get(("body",False))
+        full = t_texts.get(("full",False))
+        bodySize = texts.size("body")
+        fullSize = bodySize
+        if self.headers:
+            fullSize = texts.size("full")
+        if stats is not None:
+            stats.addStage("decode", time.time()-start)
+            start = time.time()
+        if len(self.texts) > len(t_texts):
+            # script blocks, attributes, json values...
+            t_texts.update( self.getTexts(texts, None) )
+            if stats is not None:
+                stats.addStage("targets", time.time()-start)
+                start = time.time()
+
+        # literals found in the target of each pattern
+        t_found = {}
+        for prefilter in self.prefilters:
+            found = prefilter.search(t_texts[("body",getattr(prefilter.regexp, "native", False))])
+            for target in self.prefilterTargets:
+                if target in SLICE_TARGETS:
+                    # what's in a slice is in the body
+                    t_found[(prefilter.ignorecase,target)] = found
+                elif target == "full":
+                    t_found[(prefilter.ignorecase,target)] = found | prefilter.search(resp.getHeaders())
+                else:
+                    t_found[(prefilter.ignorecase,target)] = prefilter.search(texts.get(target))
+        if stats is not None and len(self.prefilters):
+            stats.addStage("prefilter", time.time()-start)
+
+        t_hits = {}
+        for eid in self.eids:
+            if t_eids is not None and not eid in t_eids:
+                continue
+            t_hits[eid] = []
+            if t_times is not None:
+                t_times[eid] = 0.0
+
+        # shared -> (results, elapsed, aborted) of the regexps already run
+        t_runs = {}
+        for entry in self.entries:
+            if not entry.eid in t_hits:
+                continue
+            if entry.key in entry.extractor.quarantined:
+                continue
+            if entry.literals is not None:
+                if t_found[(entry.ignorecase,entry.target)].isdisjoint(entry.literals):
+                    if stats is not None:
+                        stats.skipPattern(entry.eid, entry.key)
+                    continue
+            if not entry.regexp.groups:
+                continue
+            text = t_texts[(entry.target,entry.native)]
+            # the limit is on the response, whatever the part of it grepped
+            size = fullSize if entry.headers else bodySize
+            if entry.maxBodySize and size > entry.maxBodySize and entry.target in BODY_TARGETS:
+                _print("%s: %s skipped, %d bytes is over the max body size: %s", entry.extractor.name, entry.key, size, resp.getUrl())
+                continue
+            if not entry.target in ("body","full"):
+                size = texts.size(entry.target)
+            hits = t_hits[entry.eid]
+            if not entry.shared in t_runs:
+                results, elapsed, aborted = self.runRegexp(entry, text)
+                t_runs[entry.shared] = (results, elapsed, aborted)
+            else:
+                # same regexp in another tab, already run
+                results, elapsed, aborted = t_runs[entry.shared]
+                elapsed = 0.0
+            for r in results:
+                hits.append( (entry.key, r) )
+            total = t_runs[entry.shared][1]
+            if aborted or (self.timeout and total > self.timeout):
+                self.timedOut(entry, resp, total, aborted)
+                if aborted and t_aborted is not None:
+                    t_aborted.append( (entry.eid, entry.key) )
+            if t_times is not None:
+                t_times[entry.eid] = t_times[entry.eid] + elapsed
+            if stats is not None:
+                stats.addPattern(entry.eid, entry.key, size, elapsed, len(results))
+
+        if len(self.keywordSets):
+            self.runKeywords(resp, body, full, t_hits, t_times)
+
+        return t_hits
+
+    def getTexts(self, texts, t_targets=None):
+        """Dict (target, native) -> text of the target, as a python string or
+        a CharSequence for the java regexps, the ones the plan needs among
+        t_targets (all of them when None). texts is the TargetTexts of the response."""
+        t_texts = {}
+        for target, native in self.texts:
+            if t_targets is None or target in t_targets:
+                t_texts[(target,native)] = texts.get(target, native)
+        return t_texts
+
+    def runRegexp(self, entry, text):
+        """Return the results of the regexp of entry on text, the time spent and
+        whether it's been stopped by the time budget."""
+        results = []
+        start = time.time()
+        if not self.timeout:
+            if entry.native:
+                # group 1 only, no match object
+                matches = entry.regexp.iterGroup(text, 1)
+            else:
+                matches = ( m.group(1) for m in entry.regexp.finditer(text) )
+            for r in matches:
+                if not r is None:
+                    results.append( r )
+            return results, time.time()-start, False
+
+        # the budget is checked between two matches and an overrun is noticed
+        # when the search returns, best-effort only. The java regexps that can
+        # backtrack (see lint.risky()) or went over the budget before are
+        # stopped during the search by a DeadlineSequence, it costs a python
+        # call per char read so the others run on the text as is.
+        deadline = start + self.timeout
+        if entry.native and (entry.risky or entry.key in entry.extractor.timeouts):
+            matches = entry.regexp.iterGroup(text, 1, deadline)
+        elif entry.native:
+            matches = entry.regexp.iterGroup(text, 1)
+        else:
+            matches = ( m.group(1) for m in entry.regexp.finditer(text) )
+        aborted = False
+        try:
+            for r in matches:
+                if not r is None:
+                    results.append( r )
+                if time.time() > deadline:
+                    aborted = True
+                    break
+        except RegexpTimeout as e:
+            aborted = True
+        return results, time.time()-start, aborted
+
+    def runKeywords(self, resp, body, full, t_hits, t_times=None):
+        """Add the results of the keywords entries to t_hits, all of them in one pass per KeywordSet."""
+        stats = self.stats
+        if self.keywordHeaders:
+            text = full
+            # the body only entries skip what's found in the headers
+            offset = len(resp.getHeaders())
+        else:
+            text = body
+            offset = 0
+
+        t_skip = set()
+        t_matches = {}
+        for entry in self.keywordEntries:
+            if not entry.eid in t_hits or entry.key in entry.extractor.quarantined:
+                t_skip.add( entry )
+                continue
+            size = len(text) if entry.headers else len(text)-offset
+            if entry.maxBodySize and size > entry.maxBodySize:
+                _print("%s: %s skipped, %d bytes is over the max body size: %s", entry.extractor.name, entry.key, size, resp.getUrl())
+                t_skip.add( entry )
+                continue
+            t_matches[entry] = 0
+
+        if not len(t_matches):
+            return
+
+        start = time.time()
+        for keywordSet, t_owners in self.keywordSets:
+            for keyword, kstart, kend in keywordSet.finditer(text):
+                for entry in t_owners[keyword]:
+                    if entry in t_skip:
+                        continue
+                    if entry.headers:
+                        r = entry.pattern.extract(text, kstart, kend)
+                    elif kstart < offset:
+                        continue
+                    else:
+                        r = entry.pattern.extract(text, kstart, kend, offset)
+                    if r is not None:
+                        t_hits[entry.eid].append( (entry.key, r) )
+                        t_matches[entry] = t_matches[entry] + 1
+
+        elapsed = time.time() - start
+        if t_times is not None:
+            # shared by the extractors having keywords
+            t_eids = set([ entry.eid for entry in t_matches ])
+            for eid in t_eids:
+                t_times[eid] = t_times[eid] + elapsed / len(t_eids)
+        if stats is not None:
+            # a single pass for all the entries, its time is in the "keywords" stage
+            stats.addStage("keywords", elapsed)
+            for entry, matches in t_matches.items():
+                stats.addPattern(entry.eid, entry.key, len(text), 0.0, matches)
+
+    def timedOut(self, entry, resp, elapsed, aborted):
+        _trace(resp.getUrl(), "timeout", entry.key, elapsed)
+        if aborted:
+            print(entry.extractor.name+": "+entry.key+" aborted after "+str(int(elapsed*1000))+"ms: "+str(resp.getUrl()))
+        else:
+            print(entry.extractor.name+": "+entry.key+" took "+str(int(elapsed*1000))+"ms: "+str(resp.getUrl()))
+        with self.lock:
+            quarantined = entry.extractor.addTimeout(entry.key, self.quarantineAfter)
+        if quarantined:
+            print(entry.extractor.name+": "+entry.key+" quarantined after "+str(self.quarantineAfter)+" timeouts, fix the regexp and apply the changes to enable it again.")
@@ -0,0 +1,124 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Cache of the scope verdicts: Burp's isInScope() is a call into Java for
+# every response, made again and again for the same hosts.
+#
+# The verdicts are keyed by scheme, host, port and the start of the path,
+# as much of it as Burp's scope rules can look at (see scopeDepth()): one
+# verdict per origin when the rules have no file part, per path prefix with
+# the simple scope, per url otherwise. The extension empties the cache when
+# Burp's scope changes.
+#
+
+import json
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from dataextractor_core.cache import LRUCache
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# file regexps of the advanced scope matching any path
+ANY_FILE = ("", ".*", "^.*", ".*$", "^.*$")
+
+
+def _prefixDepth(prefix):
+    """Path segments a simple scope prefix looks at, None when it goes past the path."""
+    if "?" in prefix or "#" in prefix:
+        return None
+    path = urlparse(prefix).path
+    if path.endswith("/"):
+        # /api/ is decided by the first segment
+        return path.count("/") - 1
+    # /api/v by the first two, v1 or v2...
+    return path.count("/")
+
+
+def scopeDepth(config):
+    """Number of path segments the scope rules can look at, 0 for the
+    origin only, None for the whole url. config is the JSON of Burp's
+    target.scope, None when unknown."""
+    try:
+        scope = json.loads(config)["target"]["scope"]
+    except (TypeError, ValueError, KeyError) as e:
+        return None
+    t_rules = [ rule for rule in scope.get("include", []) + scope.get("exclude", []) if rule.get("enabled", True) ]
+    if scope.get("advanced_mode", False):
+        for rule in t_rules:
+            if not (rule.get("file") or "").strip() in ANY_FILE:
+                return None
+        return 0
+    depth = 0
+    for rule in t_rules:
+        if not "prefix" in rule:
+            return None
+        d = _prefixDepth(rule["prefix"])
+        if d is None:
+            return None
+        depth = max(depth, d)
+    return depth
+
+
+class ScopeCache():
+    """Scope verdicts keyed by scheme, host, port and path prefix, see scopeDepth()."""
+
+    def __init__(self, size, depth=None):
+        self.verdicts = LRUCache(size)
+        self.depth = depth
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def setDepth(self, depth):
+        """The scope changed, depth is its new scopeDepth()."""
+        self.depth = depth
+        self.verdicts.clear()
+
+    def clear(self):
+        self.verdicts.clear()
+
+    def key(self, url):
+        """Key of the url, urls with the same key have the same verdict."""
+        stringURL = str(url)
+        if self.depth is None:
+            return stringURL
+        t_url = urlparse(stringURL)
+        scheme = t_url.scheme.lower()
+        try:
+            port = t_url.port or DEFAULT_PORTS.get(scheme)
+        except ValueError as e:
+            return stringURL
+        host = (t_url.hostname or "").lower()
+        if not self.depth:
+            return (scheme, host, port)
+        # the first depth segments, up to the slash after them
+        path = t_url.path or "/"
+        end = -1
+        for i in range(self.depth+1):
+            end = path.find("/", end+1)
+            if end < 0:
+                return (scheme, host, port, path)
+        return (scheme, host, port, path[:end+1])
+
+    def get(self, url):
+        """Cached verdict of the url, None when unknown."""
+        return self.verdicts.get(self.key(url))
+
+    def put(self, url, verdict):
+        self.verdicts.put(self.key(url), verdict)
+
+    def getStats(self):
+        stats = {}
+        stats["entries"] = len(self.verdicts)
+        if self.depth is None:
+            stats["key"] = "url"
+        elif not self.depth:
+            stats["key"] = "origin"
+        else:
+            stats["key"] = "origin + "+str(self.depth)+" path segments"
+        return stats
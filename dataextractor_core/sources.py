@@ -0,0 +1,295 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Readers for saved traffic: directories of files, HAR exports, Burp XML exports
+# and requests.jsonl dumps. Every reader yields Response objects, one char per
+# byte as Burp would see them. The dumps are streamed, one entry at a time,
+# and the big files are memory-mapped instead of read.
+#
+
+import os
+import json
+import mmap
+import codecs
+import base64
+
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+
+from dataextractor_core.response import Response
+
+
+# files above that size are memory-mapped, in bytes
+MMAP_THRESHOLD = 16*1024*1024
+# bytes read at once by the streaming readers, doubled while an entry doesn't fit
+READ_SIZE = 1024*1024
+BURP_XML_MARKER = b"<items"
+
+
+def decodeBytes(data):
+    # one byte = one char, same as what the extension gets from Burp (unicode on python 2 too)
+    if isinstance(data, bytes):
+        return data.decode('latin-1')
+    return data
+
+
+def buildResponse(url, status, headers, body):
+    t_lines = []
+    t_lines.append( "HTTP/1.1 "+str(status or 200) )
+    for name,value in headers:
+        t_lines.append( name+": "+value )
+    return Response(url, "\r\n".join(t_lines) + "\r\n\r\n", body)
+
+
+def iterDirectory(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            for item in iterFile(os.path.join(root, filename)):
+                yield item
+
+
+def openInput(filename):
+    """File object or read-only mmap of filename, both have read() and readline()."""
+    fp = open(filename, 'rb')
+    if os.path.getsize(filename) < MMAP_THRESHOLD:
+        return fp
+    try:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        # the mapping stays valid
+        fp.close()
+
+
+def readFile(filename):
+    fp = openInput(filename)
+    try:
+        if isinstance(fp, mmap.mmap):
+            # decoded straight from the mapped pages, no copy of the raw bytes
+            return codecs.latin_1_decode(fp)[0]
+        return decodeBytes(fp.read())
+    finally:
+        fp.close()
+
+
+def iterFile(filename):
+    yield Response("file://"+os.path.abspath(filename), "", readFile(filename))
+
+
+def iterJsonArray(fp, key):
+    """Stream the items of the first array named key in the JSON document fp,
+    only one item is decoded at a time."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')('replace')
+    buf = ""
+    pos = 0
+    size = READ_SIZE
+    eof = False
+    inArray = False
+    needle = '"'+key+'"'
+
+    while True:
+        if not inArray:
+            i = buf.find(needle, pos)
+            if i >= 0:
+                j = i + len(needle)
+                while j < len(buf) and buf[j] in " \t\r\n":
+                    j = j + 1
+                if j < len(buf) and buf[j] == ":":
+                    j = j + 1
+                    while j < len(buf) and buf[j] in " \t\r\n":
+                        j = j + 1
+                    if j < len(buf) and buf[j] == "[":
+                        inArray = True
+                        buf = buf[j+1:]
+                        pos = 0
+                        continue
+                if j < len(buf):
+                    # a value, not the key
+                    pos = i + 1
+                    continue
+            elif not eof:
+                # the key may be cut in two
+                pos = max(len(buf) - len(needle), 0)
+        else:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos = pos + 1
+            if pos < len(buf):
+                if buf[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError as e:
+                    if eof:
+                        raise
+                    # the item is not complete, read as much as what's buffered
+                    size = max(size, len(buf) - pos)
+                else:
+                    yield item
+                    buf = buf[end:]
+                    pos = 0
+                    size = READ_SIZE
+                    continue
+
+        if eof:
+            return
+        data = fp.read(size)
+        eof = not len(data)
+        buf = buf[pos:] + utf8.decode(data, eof)
+        pos = 0
+
+
+def iterHar(filename):
+    fp = openInput(filename)
+    try:
+        for entry in iterJsonArray(fp, "entries"):
+            yield harResponse(entry)
+    finally:
+        fp.close()
+
+
+def harResponse(entry):
+    url = entry["request"]["url"]
+    response = entry.get("response", {})
+    content = response.get("content", {})
+    body = content.get("text", "") or ""
+    if content.get("encoding") == "base64":
+        body = decodeBytes(base64.b64decode(body))
+    t_headers = [ (h["name"],h["value"]) for h in response.get("headers", []) ]
+    return buildResponse(url, response.get("status"), t_headers, body)
+
+
+def isBurpXml(filename):
+    with open(filename, 'rb') as fp:
+        return BURP_XML_MARKER in fp.read(4096)
+
+
+def iterBurpXml(filename):
+    """Items saved with Burp's "Save items", the responses are base64 encoded or not."""
+    fp = openInput(filename)
+    try:
+        root = None
+        for event, elem in iterparse(fp, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag != "item":
+                continue
+            url = elem.findtext("url") or ""
+            response = elem.find("response")
+            if response is not None and response.text:
+                if response.get("base64") == "true":
+                    raw = decodeBytes(base64.b64decode(response.text))
+                else:
+                    raw = response.text
+                yield Response.fromRaw(url, raw)
+            # only keep the current item in memory
+            elem.clear()
+            root.clear()
+    finally:
+        fp.close()
+
+
+def iterJsonl(filename):
+    """One JSON object per line, with an url and either a raw response or headers and body.
+
+    {"url": "...", "response": "HTTP/1.1 200 OK\\r\\n..."}
+    {"url": "...", "status": 200, "headers": {"Content-Type": "..."}, "body": "..."}
+    a "_base64" suffix on response/body means the value is base64 encoded.
+    """
+    fp = openInput(filename)
+    try:
+        for item in iterJsonlItems(fp, filename):
+            yield jsonlResponse(item)
+    finally:
+        fp.close()
+
+
+def iterJsonlItems(fp, filename):
+    for line in iter(fp.readline, b""):
+        line = line.strip()
+        if not len(line):
+            continue
+        try:
+            item = json.loads(line.decode('utf-8'))
+        except ValueError as e:
+            print("Invalid JSON line in "+filename)
+            continue
+        yield item
+
+
+def jsonlResponse(item):
+    url = item.get("url", "")
+    if "response_base64" in item:
+        return Response.fromRaw(url, decodeBytes(base64.b64decode(item["response_base64"])))
+    if "response" in item:
+        return Response.fromRaw(url, item["response"] or "")
+    if "body_base64" in item:
+        body = decodeBytes(base64.b64decode(item["body_base64"]))
+    else:
+        body = item.get("body", "") or ""
+    t_headers = item.get("headers", [])
+    if isinstance(t_headers, dict):
+        t_headers = list(t_headers.items())
+    return buildResponse(url, item.get("status"), t_headers, body)
+
+
+def getReader(path):
+    lpath = path.lower()
+    if os.path.isdir(path):
+        return iterDirectory
+    if lpath.endswith(".har"):
+        return iterHar
+    if lpath.endswith(".jsonl") or lpath.endswith(".ndjson"):
+        return iterJsonl
+    if lpath.endswith(".xml") and isBurpXml(path):
+        return iterBurpXml
+    return iterFile
+
+
+def iterInputs(paths):
+    for path in paths:
+        for item in getReader(path)(path):
+            yield item
+
+
+def iterTasks(paths, batchSize):
+    """Split the inputs in tasks for the worker processes, in the same order as iterInputs().
+
+    A single file is a ("file", path) task, the worker reads it itself. The
+    dumps are read here and sent by batches of about batchSize bytes:
+    ("responses", [Response, ...]).
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    yield ("file", os.path.join(root, filename))
+            continue
+        reader = getReader(path)
+        if reader == iterFile:
+            yield ("file", path)
+            continue
+        t_batch = []
+        size = 0
+        for resp in reader(path):
+            t_batch.append( resp )
+            size = size + len(resp.getHeaders()) + len(resp.getBody())
+            if size >= batchSize:
+                yield ("responses", t_batch)
+                t_batch = []
+                size = 0
+        if len(t_batch):
+            yield ("responses", t_batch)
+
+
+def iterTask(task):
+    kind, data = task
+    if kind == "file":
+        return iterFile(data)
+    return iter(data)
@@ -0,0 +1,341 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Counters and timing histograms of the scans: per stage, per tab and per
+# pattern key, to see which regexps are eating the CPU under real traffic.
+#
+
+import math
+import threading
+
+
+# buckets are powers of 2^(1/4) of a microsecond, ~19% precision up to ~1h
+HISTOGRAM_BASE = 1e-6
+HISTOGRAM_STEPS = 4
+HISTOGRAM_BUCKETS = 128
+
+STAGES = ("checkScope", "checkExtension", "checkFile", "checkContent", "decode", "prefilter", "keywords", "filter")
+
+
+class Histogram():
+    """Durations in seconds, bucketed on a log scale so percentiles cost no memory."""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= HISTOGRAM_BASE:
+            i = 0
+        else:
+            i = min(int(math.log(seconds/HISTOGRAM_BASE, 2) * HISTOGRAM_STEPS) + 1, HISTOGRAM_BUCKETS-1)
+        self.buckets[i] = self.buckets[i] + 1
+        self.count = self.count + 1
+        self.total = self.total + seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        self.buckets = [ a+b for a,b in zip(self.buckets, other.buckets) ]
+        self.count = self.count + other.count
+        self.total = self.total + other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p percentile, never above the max."""
+        if not self.count:
+            return 0.0
+        rank = max(int(math.ceil(self.count * p / 100.0)), 1)
+        seen = 0
+        for i,n in enumerate(self.buckets):
+            seen = seen + n
+            if seen >= rank:
+                return min(HISTOGRAM_BASE * 2 ** (float(i) / HISTOGRAM_STEPS), self.max)
+        return self.max
+
+    def toDict(self):
+        # in ms, easier to read
+        t_hist = {}
+        t_hist["count"] = self.count
+        t_hist["total"] = round(self.total * 1000, 3)
+        t_hist["p50"] = round(self.percentile(50) * 1000, 3)
+        t_hist["p95"] = round(self.percentile(95) * 1000, 3)
+        t_hist["max"] = round(self.max * 1000, 3)
+        return t_hist
+
+
+class TabStats():
+
+    def __init__(self):
+        self.responses = 0
+        self.bytes = 0
+        self.time = Histogram()
+        self.matches = 0
+        self.excluded = 0
+        self.deduped = 0
+        self.cacheHits = 0
+
+    def merge(self, other):
+        self.responses = self.responses + other.responses
+        self.bytes = self.bytes + other.bytes
+        self.time.merge(other.time)
+        self.matches = self.matches + other.matches
+        self.excluded = self.excluded + other.excluded
+        self.deduped = self.deduped + other.deduped
+        self.cacheHits = self.cacheHits + other.cacheHits
+
+    def toDict(self):
+        t_tab = {}
+        t_tab["responses"] = self.responses
+        t_tab["bytes"] = self.bytes
+        t_tab["time"] = self.time.toDict()
+        t_tab["matches"] = self.matches
+        t_tab["excluded"] = self.excluded
+        t_tab["deduped"] = self.deduped
+        t_tab["cacheHits"] = self.cacheHits
+        return t_tab
+
+
+class PatternStats():
+
+    def __init__(self):
+        self.bytes = 0
+        self.time = Histogram()
+        self.matches = 0
+        self.skipped = 0
+
+    def merge(self, other):
+        self.bytes = self.bytes + other.bytes
+        self.time.merge(other.time)
+        self.matches = self.matches + other.matches
+        self.skipped = self.skipped + other.skipped
+
+    def toDict(self):
+        t_pattern = {}
+        t_pattern["bytes"] = self.bytes
+        t_pattern["time"] = self.time.toDict()
+        t_pattern["matches"] = self.matches
+        t_pattern["skipped"] = self.skipped
+        return t_pattern
+
+
+class ValidatorStats():
+    """Responses skipped on their headers: 304s, and unchanged ones replayed
+    from the cache without reading their body."""
+
+    def __init__(self):
+        self.notModified = 0
+        self.unchanged = 0
+        self.bytes = 0
+
+    def merge(self, other):
+        self.notModified = self.notModified + other.notModified
+        self.unchanged = self.unchanged + other.unchanged
+        self.bytes = self.bytes + other.bytes
+
+    def toDict(self):
+        t_validators = {}
+        t_validators["notModified"] = self.notModified
+        t_validators["unchanged"] = self.unchanged
+        t_validators["bytes"] = self.bytes
+        return t_validators
+
+
+class ScopeStats():
+    """Scope checks answered by the cache of verdicts, and the ones asked to the scope."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def merge(self, other):
+        self.hits = self.hits + other.hits
+        self.misses = self.misses + other.misses
+
+    def toDict(self):
+        t_scope = {}
+        t_scope["hits"] = self.hits
+        t_scope["misses"] = self.misses
+        return t_scope
+
+
+class ScanStats():
+    """All the counters of a ScanEngine, safe to update from the scanner threads.
+
+    "skipped" counts the responses where the prefilter spared a pattern.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self._reset()
+
+    def _reset(self):
+        self.stages = {}
+        for stage in STAGES:
+            self.stages[stage] = Histogram()
+        self.tabs = {}
+        self.patterns = {}
+        self.validators = ValidatorStats()
+        self.scope = ScopeStats()
+
+    def drain(self):
+        """Return the counters and start again from zero, see merge()."""
+        with self.lock:
+            t_counters = (self.stages, self.tabs, self.patterns, self.validators, self.scope)
+            self._reset()
+        return t_counters
+
+    def merge(self, t_counters):
+        """Add the counters drained from another ScanStats, e.g. in a worker process."""
+        stages, tabs, patterns, validators, scope = t_counters
+        with self.lock:
+            self.validators.merge(validators)
+            self.scope.merge(scope)
+            for stage, hist in stages.items():
+                if not stage in self.stages:
+                    self.stages[stage] = Histogram()
+                self.stages[stage].merge(hist)
+            for eid, tab in tabs.items():
+                self._tab(eid).merge(tab)
+            for (eid, key), pattern in patterns.items():
+                self._pattern(eid, key).merge(pattern)
+
+    def _tab(self, eid):
+        if not eid in self.tabs:
+            self.tabs[eid] = TabStats()
+        return self.tabs[eid]
+
+    def _pattern(self, eid, key):
+        if not (eid, key) in self.patterns:
+            self.patterns[(eid, key)] = PatternStats()
+        return self.patterns[(eid, key)]
+
+    def addStage(self, stage, seconds):
+        with self.lock:
+            if not stage in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].add(seconds)
+
+    def addPattern(self, eid, key, size, seconds, matches):
+        with self.lock:
+            pattern = self._pattern(eid, key)
+            pattern.bytes = pattern.bytes + size
+            pattern.time.add(seconds)
+            pattern.matches = pattern.matches + matches
+
+    def skipPattern(self, eid, key):
+        with self.lock:
+            pattern = self._pattern(eid, key)
+            pattern.skipped = pattern.skipped + 1
+
+    def addTab(self, eid, size, seconds, matches, excluded):
+        with self.lock:
+            tab = self._tab(eid)
+            tab.responses = tab.responses + 1
+            tab.bytes = tab.bytes + size
+            tab.time.add(seconds)
+            tab.matches = tab.matches + matches
+            tab.excluded = tab.excluded + excluded
+
+    def addCacheHit(self, eid):
+        with self.lock:
+            tab = self._tab(eid)
+            tab.responses = tab.responses + 1
+            tab.cacheHits = tab.cacheHits + 1
+
+    def addScopeCheck(self, cached):
+        with self.lock:
+            if cached:
+                self.scope.hits = self.scope.hits + 1
+            else:
+                self.scope.misses = self.scope.misses + 1
+
+    def addNotModified(self):
+        with self.lock:
+            self.validators.notModified = self.validators.notModified + 1
+
+    def addUnchanged(self, size):
+        with self.lock:
+            self.validators.unchanged = self.validators.unchanged + 1
+            self.validators.bytes = self.validators.bytes + size
+
+    def addDeduped(self, eid, deduped):
+        with self.lock:
+            tab = self._tab(eid)
+            tab.deduped = tab.deduped + deduped
+
+    def toDict(self, t_names=None):
+        """Everything as a JSON-ready dict, t_names maps the tab ids to their names."""
+        if t_names is None:
+            t_names = {}
+        with self.lock:
+            t_stats = {}
+            t_stats["stages"] = {}
+            for stage, hist in self.stages.items():
+                t_stats["stages"][stage] = hist.toDict()
+            t_stats["validators"] = self.validators.toDict()
+            t_stats["scope"] = self.scope.toDict()
+            t_stats["tabs"] = {}
+            for eid, tab in self.tabs.items():
+                t_tab = tab.toDict()
+                t_tab["name"] = t_names.get(eid, eid)
+                t_tab["patterns"] = {}
+                t_stats["tabs"][eid] = t_tab
+            for (eid, key), pattern in self.patterns.items():
+                if not eid in t_stats["tabs"]:
+                    t_stats["tabs"][eid] = TabStats().toDict()
+                    t_stats["tabs"][eid]["name"] = t_names.get(eid, eid)
+                    t_stats["tabs"][eid]["patterns"] = {}
+                t_stats["tabs"][eid]["patterns"][key] = pattern.toDict()
+        return t_stats
+
+
+def formatStats(t_stats):
+    """Plain text tables of a toDict() output, slowest patterns first."""
+    lines = []
+    lines.append("%-16s %10s %12s %10s %10s %10s" % ("Stage", "count", "total ms", "p50 ms", "p95 ms", "max ms"))
+    for stage in sorted(t_stats["stages"]):
+        hist = t_stats["stages"][stage]
+        lines.append("%-16s %10d %12.1f %10.3f %10.3f %10.3f" % (stage, hist["count"], hist["total"], hist["p50"], hist["p95"], hist["max"]))
+    if "validators" in t_stats:
+        validators = t_stats["validators"]
+        lines.append("")
+        lines.append("Not modified (304): %d, unchanged (same validators): %d, %d bytes not read" % (validators["notModified"], validators["unchanged"], validators["bytes"]))
+    if "scope" in t_stats:
+        scope = t_stats["scope"]
+        checks = scope["hits"] + scope["misses"]
+        rate = 0.0
+        if checks:
+            rate = scope["hits"] * 100.0 / checks
+        lines.append("Scope checks: %d, %.1f%% from the cache of verdicts (%d entries, one per %s)" % (checks, rate, scope.get("entries", 0), scope.get("key", "url")))
+
+    lines.append("")
+    lines.append("%-30s %9s %12s %12s %10s %10s %8s %9s %8s %8s" % ("Tab", "responses", "bytes", "total ms", "p95 ms", "max ms", "matches", "excluded", "deduped", "cached"))
+    t_tabs = sorted(t_stats["tabs"].values(), key=lambda t: -t["time"]["total"])
+    for tab in t_tabs:
+        lines.append("%-30s %9d %12d %12.1f %10.3f %10.3f %8d %9d %8d %8d" % (tab["name"][:30], tab["responses"], tab["bytes"], tab["time"]["total"], tab["time"]["p95"], tab["time"]["max"], tab["matches"], tab["excluded"], tab["deduped"], tab["cacheHits"]))
+
+    if "provenance" in t_stats:
+        lines.append("")
+        lines.append("%-30s %9s %9s %12s %12s" % ("Provenance", "datas", "urls", "pairs", "KB"))
+        for provenance in sorted(t_stats["provenance"].values(), key=lambda p: -p["size"]):
+            lines.append("%-30s %9d %9d %12d %12d" % (provenance["name"][:30], provenance["datas"], provenance["urls"], provenance["pairs"], provenance["size"]/1024))
+
+    lines.append("")
+    lines.append("%-50s %9s %12s %12s %10s %10s %10s %8s %8s" % ("Pattern", "runs", "bytes", "total ms", "p50 ms", "p95 ms", "max ms", "matches", "skipped"))
+    t_patterns = []
+    for tab in t_tabs:
+        for key, pattern in tab["patterns"].items():
+            t_patterns.append( (tab["name"]+" / "+key, pattern) )
+    t_patterns.sort(key=lambda p: -p[1]["time"]["total"])
+    for name, pattern in t_patterns:
+        lines.append("%-50s %9d %12d %12.1f %10.3f %10.3f %10.3f %8d %8d" % (name[:50], pattern["time"]["count"], pattern["bytes"], pattern["time"]["total"], pattern["time"]["p50"], pattern["time"]["p95"], pattern["time"]["max"], pattern["matches"], pattern["skipped"]))
+
+    return "\n".join(lines)
@@ -0,0 +1,265 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Append-only store of the datas of a tab, so they survive a reload of the
+# extension. One directory per tab made of NDJSON segments:
+#
+# {"v": "key: value", "k": "key", "u": "https://...", "f": 1612345678}   first seen
+# {"v": "key: value", "l": 1612349999}                                   seen again
+# {"d": "key: value"}                                                    removed by hand
+#
+# Nothing is ever rewritten, reading replays the records in order. The
+# window of the UI (tail()) reads them backwards from the last segment and
+# stops once it's full: its cost is the size of the window, not of the store.
+#
+
+import os
+import re
+import json
+import time
+import codecs
+import shutil
+import threading
+
+from dataextractor_core.cache import LRUCache
+
+
+# a new segment is started above this size, in bytes
+STORE_SEGMENT_SIZE = 8*1024*1024
+# records buffered before they're written
+STORE_BATCH_SIZE = 500
+# "seen again" is written at most once per value and per period, in seconds
+STORE_LAST_SEEN_RESOLUTION = 3600
+STORE_LAST_SEEN_CACHE_SIZE = 10000
+STORE_SEGMENT = re.compile(r'^(\d{8})\.ndjson$')
+# bytes read at once when a segment is read backwards
+STORE_READ_BLOCK = 64*1024
+
+EXPORT_FORMATS = ("plain", "csv", "json")
+
+
+def exportFormat(filename):
+    """Format of an export from the extension of the file, plain text by default."""
+    ext = os.path.splitext(filename)[1].lower()[1:]
+    if ext in EXPORT_FORMATS:
+        return ext
+    return "plain"
+
+
+def reverseLines(filename, blockSize=STORE_READ_BLOCK):
+    """Lines of the file, the last one first, read by blocks from the end."""
+    with open(filename, 'rb') as fp:
+        fp.seek(0, os.SEEK_END)
+        pos = fp.tell()
+        rest = b""
+        while pos > 0:
+            size = min(blockSize, pos)
+            pos = pos - size
+            fp.seek(pos)
+            t_lines = (fp.read(size) + rest).split(b"\n")
+            # the start of the first line is in the previous block
+            rest = t_lines[0]
+            for line in reversed(t_lines[1:]):
+                yield line
+        yield rest
+
+
+def csvField(value):
+    if value is None:
+        return ""
+    value = str(value) if not isinstance(value, type(u"")) else value
+    if re.search(r'[",\r\n]', value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class ResultStore():
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.lastSeen = LRUCache(STORE_LAST_SEEN_CACHE_SIZE)
+        self.writer = None
+        t_segments = self.segments()
+        if len(t_segments):
+            self.segment = int(STORE_SEGMENT.match(t_segments[-1]).group(1))
+        else:
+            self.segment = 1
+
+    def segments(self):
+        return sorted([ filename for filename in os.listdir(self.directory) if STORE_SEGMENT.match(filename) ])
+
+    def segmentFilename(self, segment):
+        return os.path.join(self.directory, "%08d.ndjson" % segment)
+
+    def append(self, record):
+        with self.lock:
+            self.pending.append( json.dumps(record) )
+            full = len(self.pending) >= STORE_BATCH_SIZE
+        if full:
+            self.flush()
+
+    def add(self, value, key, url, now=None):
+        now = int(now or time.time())
+        self.lastSeen.put(value, now)
+        self.append( {"v": value, "k": key, "u": url, "f": now} )
+
+    def seen(self, value, now=None):
+        now = int(now or time.time())
+        last = self.lastSeen.get(value)
+        if last is not None and now - last < STORE_LAST_SEEN_RESOLUTION:
+            return
+        self.lastSeen.put(value, now)
+        self.append( {"v": value, "l": now} )
+
+    def delete(self, value):
+        self.lastSeen.put(value, None)
+        self.append( {"d": value} )
+
+    def flush(self):
+        with self.lock:
+            if not len(self.pending):
+                return
+            t_lines = self.pending
+            self.pending = []
+            if self.writer is None:
+                self.writer = open(self.segmentFilename(self.segment), 'a')
+            self.writer.write( "\n".join(t_lines) + "\n" )
+            self.writer.flush()
+            if self.writer.tell() >= STORE_SEGMENT_SIZE:
+                self.writer.close()
+                self.writer = None
+                self.segment = self.segment + 1
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+    def clear(self):
+        with self.lock:
+            self.pending = []
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            for filename in self.segments():
+                os.remove( os.path.join(self.directory, filename) )
+            self.segment = 1
+        self.lastSeen.clear()
+
+    def destroy(self):
+        self.clear()
+        shutil.rmtree(self.directory, True)
+
+    def iterRecords(self):
+        self.flush()
+        for filename in self.segments():
+            with open(os.path.join(self.directory, filename), 'r') as fp:
+                for line in fp:
+                    line = line.strip()
+                    if not len(line):
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        # truncated by a crash, the next records are fine
+                        continue
+
+    def iterRecordsBackwards(self):
+        """The records, the last one first."""
+        self.flush()
+        for filename in reversed(self.segments()):
+            for line in reverseLines(os.path.join(self.directory, filename)):
+                line = line.strip()
+                if not len(line):
+                    continue
+                try:
+                    yield json.loads(line.decode('utf-8'))
+                except ValueError as e:
+                    continue
+
+    def iterItems(self):
+        """Current datas in the order they were first seen, as dicts:
+        value, key, url, firstSeen, lastSeen.
+
+        Two passes over the segments, only the removed values and the
+        values seen again are kept in memory.
+        """
+        t_deleted = {}
+        t_lastSeen = {}
+        for i,record in enumerate(self.iterRecords()):
+            if "d" in record:
+                t_deleted[record["d"]] = i
+            elif "l" in record:
+                t_lastSeen[record["v"]] = record["l"]
+
+        for i,record in enumerate(self.iterRecords()):
+            if not "f" in record:
+                continue
+            value = record["v"]
+            if value in t_deleted and t_deleted[value] > i:
+                continue
+            item = {}
+            item["value"] = value
+            item["key"] = record.get("k")
+            item["url"] = record.get("u")
+            item["firstSeen"] = record["f"]
+            item["lastSeen"] = max(t_lastSeen.get(value, record["f"]), record["f"])
+            yield item
+
+    def iterValues(self):
+        for item in self.iterItems():
+            yield item["value"]
+
+    def tail(self, size, match=None):
+        """The last size values, only the ones match(value) accepts if given.
+
+        Read backwards until the window is full, only the removed values
+        met on the way are kept in memory: a value found again after its
+        removal has a newer first seen record, the older ones are skipped.
+        """
+        t_tail = []
+        t_deleted = set()
+        if size <= 0:
+            return t_tail
+        for record in self.iterRecordsBackwards():
+            if "d" in record:
+                t_deleted.add( record["d"] )
+                continue
+            if not "f" in record or record["v"] in t_deleted:
+                continue
+            if match is None or match(record["v"]):
+                t_tail.append( record["v"] )
+                if len(t_tail) >= size:
+                    break
+        t_tail.reverse()
+        return t_tail
+
+    def export(self, filename, fmt="plain"):
+        """Stream the datas to filename, return the number of datas written."""
+        n = 0
+        with codecs.open(filename, 'w', 'utf-8') as fp:
+            if fmt == "csv":
+                fp.write( "value,key,url,first_seen,last_seen\n" )
+            elif fmt == "json":
+                fp.write( "[" )
+            for item in self.iterItems():
+                if fmt == "csv":
+                    line = ",".join([ csvField(item[k]) for k in ("value","key","url","firstSeen","lastSeen") ])
+                elif fmt == "json":
+                    line = json.dumps(item, sort_keys=True)
+                    if n:
+                        line = "," + line
+                else:
+                    line = item["value"]
+                fp.write( line + "\n" )
+                n = n + 1
+            if fmt == "json":
+                fp.write( "]\n" )
+        return n
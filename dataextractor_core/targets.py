@@ -0,0 +1,126 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Targets of the patterns: the part of the response a pattern runs on.
+#
+#   "body"        the body, the default
+#   "full"        the headers and the body, same as "headers": true
+#   "headers"     the headers only (CSP, Location, Set-Cookie...)
+#   "url"         the url of the response
+#   "script"      the content of the <script> blocks
+#   "attributes"  the values of the href and src attributes
+#   "json"        the string values of a JSON body, unescaped
+#
+# The HTML targets are found together in a single pass over the tags, the
+# JSON values in a single pass over the string literals. Each target is
+# computed once per response, whatever the number of patterns running on it.
+# Its slices are joined with a newline so a match can't run from one to the
+# next with the usual [^\n] or . classes.
+#
+
+import re
+import json
+
+from dataextractor_core.javaregex import charSequence
+
+
+TARGETS = ("body","full","headers","url","script","attributes","json")
+# the targets made of parts of the body
+BODY_TARGETS = ("body","full","script","attributes","json")
+# the targets holding the body as is, or slices of it: what's in them is in the body
+SLICE_TARGETS = ("body","script","attributes")
+TARGETS_SEPARATOR = "\n"
+
+TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9:-]*)([^>]*)>')
+SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+ATTRIBUTE = re.compile(r'''(?:^|\s)(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.IGNORECASE)
+JSON_STRING = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"(\s*:)?')
+
+
+def readsHeaders(target):
+    return target in ("full", "headers")
+
+
+def htmlTargets(body):
+    """Return the content of the <script> blocks and the values of the href
+    and src attributes of the body, in one pass."""
+    t_scripts = []
+    t_attributes = []
+    pos = 0
+    search = TAG.search
+    while True:
+        m = search(body, pos)
+        if m is None:
+            break
+        pos = m.end()
+        if "=" in m.group(2):
+            for a in ATTRIBUTE.finditer(m.group(2)):
+                t_attributes.append( a.group(1) if a.group(1) is not None else a.group(2) if a.group(2) is not None else a.group(3) )
+        if m.group(1).lower() == "script":
+            end = SCRIPT_END.search(body, pos)
+            if end is None:
+                t_scripts.append( body[pos:] )
+                break
+            t_scripts.append( body[pos:end.start()] )
+            pos = end.end()
+    return t_scripts, t_attributes
+
+
+def _unescape(value):
+    if not "\\" in value:
+        return value
+    try:
+        return json.loads('"'+value+'"')
+    except ValueError as e:
+        return value
+
+
+def jsonValues(body):
+    """String values of a JSON body, the keys apart, nothing when the body isn't JSON."""
+    start = body[:64].lstrip()
+    if not start.startswith("{") and not start.startswith("["):
+        return []
+    return [ _unescape(m.group(1)) for m in JSON_STRING.finditer(body) if m.group(2) is None ]
+
+
+class TargetTexts():
+    """Texts of the targets of one Response, each one computed on the first request."""
+
+    def __init__(self, resp):
+        self.resp = resp
+        self.texts = {}
+
+    def get(self, target, native=False):
+        """Text of the target, a CharSequence for the java regexps when native is True."""
+        key = (target, native)
+        if key in self.texts:
+            return self.texts[key]
+        resp = self.resp
+        if target == "body":
+            text = resp.getBodySequence() if native else resp.getBody()
+        elif target == "full":
+            text = resp.getFullSequence() if native else resp.getFull()
+        elif native:
+            text = charSequence(self.get(target))
+        elif target == "headers":
+            text = resp.getHeaders()
+        elif target == "url":
+            text = str(resp.getUrl())
+        elif target == "json":
+            text = TARGETS_SEPARATOR.join( jsonValues(resp.getBody()) )
+        else:
+            t_scripts, t_attributes = htmlTargets(resp.getBody())
+            self.texts[("script",False)] = TARGETS_SEPARATOR.join(t_scripts)
+            self.texts[("attributes",False)] = TARGETS_SEPARATOR.join(t_attributes)
+            return self.texts[key]
+        self.texts[key] = text
+        return text
+
+    def size(self, target):
+        """Bytes of the target, without decoding the body for the body and full targets."""
+        if target == "body":
+            return self.resp.getBodySize()
+        if target == "full":
+            return self.resp.getBodySize() + len(self.resp.getHeaders())
+        return len(self.get(target))
@@ -0,0 +1,206 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Worker pool for the passive scan: Burp's thread only queues the responses,
+# the extraction runs on our own threads (real threads under Jython, no GIL).
+#
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from dataextractor_core.log import _print, _trace
+from dataextractor_core.response import Response
+
+
+# what to do with a new response when the queue is full
+POLICY_BLOCK = "block"
+POLICY_DROP = "drop"
+POLICY_SPILL = "spill"
+POLICIES = (POLICY_BLOCK, POLICY_DROP, POLICY_SPILL)
+
+
+class SpillFile():
+    """Responses that didn't fit in the queue, saved as JSON lines until a worker is free."""
+
+    def __init__(self, directory=None):
+        fd, self.filename = tempfile.mkstemp(prefix="dataextractor-spill-", suffix=".jsonl", dir=directory)
+        os.close(fd)
+        self.lock = threading.Lock()
+        self.writer = open(self.filename, 'a')
+        self.reader = open(self.filename, 'r')
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, resp):
+        record = {}
+        record["url"] = str(resp.getUrl())
+        record["headers"] = resp.getHeaders()
+        record["body"] = resp.getBody()
+        line = json.dumps(record)
+        with self.lock:
+            self.writer.write(line+"\n")
+            self.writer.flush()
+            self.count = self.count + 1
+
+    def pop(self):
+        with self.lock:
+            if not self.count:
+                return None
+            line = self.reader.readline()
+            self.count = self.count - 1
+            if not self.count:
+                # everything has been read, start again from an empty file
+                self.writer.truncate(0)
+                self.writer.seek(0)
+                self.reader.seek(0)
+        record = json.loads(line)
+        return Response(record["url"], record["headers"], record["body"])
+
+    def close(self):
+        with self.lock:
+            self.writer.close()
+            self.reader.close()
+            self.count = 0
+            try:
+                os.remove(self.filename)
+            except OSError as e:
+                pass
+
+
+class ScanPool():
+    """Bounded queue of responses processed by a fixed number of threads.
+
+    handler(resp) is called for every response. When the queue is full the
+    policy tells whether submit() blocks, drops the response or spills it to
+    disk.
+    """
+
+    def __init__(self, handler, workers=2, queueSize=200, policy=POLICY_SPILL, spillDirectory=None):
+        self.handler = handler
+        self.workers = workers
+        self.queueSize = queueSize
+        self.policy = policy
+        self.queue = queue.Queue(queueSize)
+        self.spill = None
+        if policy == POLICY_SPILL:
+            self.spill = SpillFile(spillDirectory)
+        self.stopping = False
+        self.dropped = 0
+        self.spilled = 0
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self.work, name="DataExtractor-worker-"+str(i+1))
+            t.setDaemon(True)
+            t.start()
+            self.threads.append( t )
+
+    def submit(self, resp):
+        if self.stopping:
+            return False
+        if self.policy == POLICY_BLOCK:
+            self.queue.put(resp)
+            return True
+        try:
+            self.queue.put_nowait(resp)
+            return True
+        except queue.Full:
+            pass
+        if self.policy == POLICY_SPILL:
+            self.spill.push(resp)
+            with self.lock:
+                self.spilled = self.spilled + 1
+            return True
+        with self.lock:
+            self.dropped = self.dropped + 1
+        _print("Queue full, dropped: %s", resp.getUrl())
+        _trace(resp.getUrl(), "queue", "dropped")
+        return False
+
+    def next(self):
+        if self.spill is not None and len(self.spill):
+            # the queue first, then what has been spilled, never waiting on the queue while the disk is full
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                resp = self.spill.pop()
+                if resp is not None:
+                    return resp
+        try:
+            return self.queue.get(True, 0.5)
+        except queue.Empty:
+            return None
+
+    def work(self):
+        while not self.stopping:
+            resp = self.next()
+            if resp is None:
+                continue
+            with self.lock:
+                self.busy = self.busy + 1
+            try:
+                self.handler(resp)
+            except Exception as e:
+                with self.lock:
+                    self.errors = self.errors + 1
+                print("Error while scanning "+str(resp.getUrl())+": "+str(e))
+            with self.lock:
+                self.busy = self.busy - 1
+                self.processed = self.processed + 1
+
+    def depth(self):
+        """Number of responses waiting, in the queue and on disk."""
+        depth = self.queue.qsize()
+        if self.spill is not None:
+            depth = depth + len(self.spill)
+        return depth
+
+    def getStats(self):
+        stats = {}
+        stats["workers"] = self.workers
+        stats["queued"] = self.queue.qsize()
+        stats["spilled"] = 0
+        if self.spill is not None:
+            stats["spilled"] = len(self.spill)
+        stats["busy"] = self.busy
+        stats["processed"] = self.processed
+        stats["dropped"] = self.dropped
+        stats["errors"] = self.errors
+        return stats
+
+    def shutdown(self, timeout=5):
+        """Let the workers drain the queue for up to timeout seconds then cancel what's left."""
+        deadline = time.time() + timeout
+        while (self.depth() or self.busy) and time.time() < deadline:
+            time.sleep(0.1)
+
+        self.stopping = True
+        cancelled = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+                cancelled = cancelled + 1
+            except queue.Empty:
+                break
+        for t in self.threads:
+            t.join(1)
+        if self.spill is not None:
+            cancelled = cancelled + len(self.spill)
+            self.spill.close()
+        if cancelled:
+            print("Scan cancelled for "+str(cancelled)+" responses.")
+        return cancelled
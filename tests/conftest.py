@@ -0,0 +1,154 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# The tests run under CPython. The java backend is run there on a small
+# stand-in of java.util.regex built on re: what is tested is the code of the
+# extension around it (flags, translation, scan plan), not java itself.
+#
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataextractor_core import javaregex
+from dataextractor_core.registry import registry
+from dataextractor_core.engine import ScanEngine
+from dataextractor_core.config import defaultSettings
+
+
+class FakeMatcher():
+    """The part of java.util.regex.Matcher used by javaregex.JavaRegexp."""
+
+    def __init__(self, regexp, text):
+        self.regexp = regexp
+        self.sequence = text
+        if hasattr(text, "toString"):
+            text = text.toString()
+        self.text = str(text)
+        self.pos = 0
+        self.limit = len(self.text)
+        self.m = None
+
+    def regionEnd(self):
+        return self.limit
+
+    def region(self, start, end):
+        self.pos = start
+        self.limit = end
+
+    def useTransparentBounds(self, enabled):
+        pass
+
+    def useAnchoringBounds(self, enabled):
+        pass
+
+    def find(self):
+        if self.pos > self.limit:
+            return False
+        if hasattr(self.sequence, "charAt"):
+            # java reads the text through charAt() all along the search
+            for i in range(self.pos, self.limit):
+                self.sequence.charAt(i)
+        self.m = self.regexp.search(self.text, self.pos, self.limit)
+        if self.m is None:
+            return False
+        # an empty match moves on by one char, like java
+        self.pos = self.m.end() if self.m.end() > self.m.start() else self.m.end()+1
+        return True
+
+    def lookingAt(self):
+        self.m = self.regexp.match(self.text, self.pos, self.limit)
+        return self.m is not None
+
+    def group(self, n=0):
+        return self.m.group(n)
+
+    def groupCount(self):
+        return self.regexp.groups
+
+    def toMatchResult(self):
+        return self
+
+    def start(self, n=0):
+        return self.m.start(n)
+
+    def end(self, n=0):
+        return self.m.end(n)
+
+
+class FakePattern():
+    """java.util.regex.Pattern on re, for the sources translate() writes."""
+
+    def __init__(self, source, jflags):
+        flags = 0
+        if jflags & javaregex.JAVA_CASE_INSENSITIVE:
+            flags = flags | re.IGNORECASE
+        if jflags & javaregex.JAVA_MULTILINE:
+            flags = flags | re.MULTILINE
+        if jflags & javaregex.JAVA_DOTALL:
+            flags = flags | re.DOTALL
+        self.regexp = re.compile(source.replace("\\z", "\\Z"), flags)
+
+    @staticmethod
+    def compile(source, jflags=0):
+        return FakePattern(source, jflags)
+
+    def matcher(self, text):
+        return FakeMatcher(self.regexp, text)
+
+
+class FakeCharBuffer():
+    """java.nio.CharBuffer over a python string."""
+
+    def __init__(self, text):
+        self.text = text
+
+    @staticmethod
+    def wrap(text):
+        return FakeCharBuffer(text)
+
+    def charAt(self, i):
+        return self.text[i]
+
+    def length(self):
+        return len(self.text)
+
+    def subSequence(self, start, end):
+        return FakeCharBuffer(self.text[start:end])
+
+    def toString(self):
+        return self.text
+
+
+@pytest.fixture
+def javaBackend(monkeypatch):
+    """Compile the regexps with the java backend for the test."""
+    if not javaregex.available():
+        monkeypatch.setattr(javaregex, "Pattern", FakePattern)
+        monkeypatch.setattr(javaregex, "CharBuffer", FakeCharBuffer, raising=False)
+    registry.setBackend("java")
+    yield registry
+    registry.setBackend("re")
+
+
+@pytest.fixture
+def reBackend():
+    registry.setBackend("re")
+    yield registry
+
+
+def makeEngine(config, **settings):
+    """ScanEngine with one tab "t" (eid "1") running config, the store disabled."""
+    engine = ScanEngine()
+    t_settings = defaultSettings()
+    t_settings["storeDirectory"] = ""
+    t_settings["regexBackend"] = registry.backend
+    t_settings.update(settings)
+    engine.loadSettings(t_settings)
+    engine.addExtractor("1", "t", config, "", True, None, "", "")
+    return engine
@@ -0,0 +1,65 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Content sniffing: the body says what the headers don't, it never turns a
+# declared text, JSON or JS into a binary.
+#
+
+import pytest
+
+from conftest import makeEngine
+from dataextractor_core.content import contentTypes, sniffMimeType
+from dataextractor_core.response import Response
+
+
+def headers(mime=None):
+    if mime is None:
+        return "HTTP/1.1 200 OK\r\n\r\n"
+    return "HTTP/1.1 200 OK\r\nContent-Type: " + mime + "\r\n\r\n"
+
+
+def types(mime, body):
+    return contentTypes(Response("https://x/a", headers(mime), body))
+
+
+def test_signatures():
+    assert sniffMimeType(u"\x89PNG\r\n\x1a\n....") == "image/png"
+    assert sniffMimeType(u"ID3\x03\x00") == "audio/mpeg"
+    assert sniffMimeType(u"ID3\x03\x00", True) is None
+    assert sniffMimeType(u"PK\x03\x04....", True) == "application/zip"
+    # positioned ones
+    assert sniffMimeType(u"RIFF\x10\x00\x00\x00WEBPVP8 ", True) == "image/webp"
+    assert sniffMimeType(u"\x00\x00\x00\x18ftypmp42", True) == "video/mp4"
+    assert sniffMimeType(u"RIFF is not WEBP") is None
+
+
+@pytest.mark.parametrize("mime", [None, "application/octet-stream"])
+def test_sniffed_without_a_type(mime):
+    assert types(mime, u"ID3\x03\x00\x00\x00") == ([mime] if mime else []) + ["audio/mpeg", "binary"]
+    assert types(mime, u"OTTO\x00\x0b\x00\x80") == ([mime] if mime else []) + ["font/otf", "binary"]
+    assert types(mime, u"x"*100 + u"\x00"*10) == ([mime] if mime else []) + ["binary"]
+    assert types(mime, u"var a = 1;") == ([mime] if mime else [])
+
+
+@pytest.mark.parametrize("mime", ["text/plain", "text/html", "application/json", "application/vnd.api+json", "application/javascript", "application/x-javascript"])
+def test_text_never_downgraded(mime):
+    assert types(mime, u"ID3 = require('id3');") == [mime]
+    assert types(mime, u"BZh = 1") == [mime]
+    assert types(mime, u"OTTO: 1") == [mime]
+    assert types(mime, u"%PDF-1.4 in a text") == [mime]
+    assert types(mime, u"{\"a\": \"\x00\x00\x00\x00\"}") == [mime]
+
+
+def test_strong_signatures_only_against_another_type():
+    assert types("application/x-thing", u"OTTO is a name") == ["application/x-thing"]
+    assert types("application/x-thing", u"fLaC data") == ["application/x-thing"]
+    assert types("application/x-thing", u"PK\x03\x04\x14\x00") == ["application/x-thing", "application/zip", "binary"]
+    assert types("image/svg+xml", u"GIF89a\x01\x00") == ["image/svg+xml", "image/gif", "binary"]
+
+
+def test_engine_keeps_the_declared_script(reBackend):
+    engine = makeEngine('{"a": "(tok[0-9]+)"}')
+    body = u"ID3.parse('tok1');"
+    assert engine.extract(Response("https://x/a.js", headers("application/javascript"), body)) == {"1": ["a: tok1"]}
+    assert engine.extract(Response("https://x/a.mp3", headers(), body)) == {}
@@ -0,0 +1,55 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Duplicate removal: the per-tab index of the datas already collected.
+#
+
+from conftest import makeEngine
+from dataextractor_core.dedup import ResultIndex
+from dataextractor_core.response import Response
+
+
+HEADERS = "HTTP/1.1 200 OK\r\nContent-Type: application/javascript\r\n\r\n"
+
+
+def test_add_new_keeps_the_order():
+    index = ResultIndex()
+    assert index.addNew(["k: b", "k: a", "k: b"]) == ["k: b", "k: a"]
+    assert index.addNew(["k: c", "k: a"]) == ["k: c"]
+    assert len(index) == 3
+    assert not index.add("k: c")
+
+
+def test_compact_after():
+    index = ResultIndex(compactAfter=2)
+    index.addNew([ "k: %d" % i for i in range(10) ])
+    assert len(index.exact) == 2
+    assert len(index.hashed) == 8
+    assert "k: 7" in index
+    assert "k: 10" not in index
+    index.discard("k: 7")
+    assert "k: 7" not in index
+    assert index.addNew(["k: 7", "k: 8"]) == ["k: 7"]
+
+
+def test_rebuild_and_clear():
+    index = ResultIndex()
+    index.addNew(["k: a", "k: b"])
+    index.rebuild(["k: b", "", "k: c"])
+    assert len(index) == 2
+    assert "k: a" not in index
+    index.clear()
+    assert len(index) == 0
+
+
+def test_remove_duplicates_across_responses(reBackend):
+    engine = makeEngine('{"k": "(tok[0-9]+)"}')
+    extractor = engine.extractors[0]
+    t_hits = engine.extract(Response("https://x.test/a.js", HEADERS, "tok1 tok2 tok1"))["1"]
+    assert extractor.dedup(t_hits, True) == ["k: tok1", "k: tok2"]
+    t_hits = engine.extract(Response("https://x.test/b.js", HEADERS, "tok2 tok3"))["1"]
+    assert extractor.dedup(t_hits, True) == ["k: tok3"]
+    # kept when duplicates aren't removed, still indexed
+    assert extractor.dedup(["k: tok3", "k: tok4"], False) == ["k: tok3", "k: tok4"]
+    assert "k: tok4" in extractor.datas
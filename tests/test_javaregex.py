@@ -0,0 +1,36 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# java backend: the inline flags of the configs, e.g. (?i), reach the prefilter.
+#
+
+import re
+
+from conftest import makeEngine
+from dataextractor_core.response import Response
+from dataextractor_core.scanplan import Prefilter, requiredLiterals
+
+
+HEADERS = "HTTP/1.1 200 OK\r\nContent-Type: application/javascript\r\n\r\n"
+
+
+def test_inline_flags_are_kept(javaBackend):
+    regexp = javaBackend.build(r"(?i)(([0-9a-z_\-\.]+)\.GitHub\.com)")
+    assert getattr(regexp, "native", False)
+    assert regexp.flags & re.IGNORECASE
+    assert requiredLiterals(regexp) == frozenset([".github.com"])
+
+
+def test_prefilter_ignorecase(javaBackend):
+    prefilter = Prefilter([".github.com"], True)
+    assert prefilter.search("foo.GITHUB.com") == set([".github.com"])
+    assert prefilter.search("foo.github.com") == set([".github.com"])
+
+
+def test_inline_ignorecase_through_the_plan(javaBackend):
+    engine = makeEngine('{"gh": "(?i)(([0-9a-z_\\\\-\\\\.]+)\\\\.GitHub\\\\.com)"}')
+    # none of them with the case of the regexp
+    body = 'a="foo.github.com";b="bar.GITHUB.COM"'
+    t_results = engine.extract(Response("https://x/a.js", HEADERS, body))
+    assert sorted(t_results["1"]) == ["gh: bar.GITHUB.COM", "gh: foo.github.com"]
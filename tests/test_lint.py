@@ -0,0 +1,31 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Patterns check: the suggested rewrites are valid regexps.
+#
+
+import re
+
+from dataextractor_core.lint import PatternReport, analyze
+
+
+def suggestion(source):
+    report = PatternReport("key")
+    analyze(report, re.compile(source))
+    return report.suggestion
+
+
+def test_group_after_the_inline_flags(reBackend):
+    assert suggestion(r"(?i)[a-z]+\.example\.com") == r"(?i)([a-z]+\.example\.com)"
+    assert suggestion(r"(?i)(?s)a.b") == r"(?i)(?s)(a.b)"
+    assert suggestion(r"[a-z]+\.example\.com") == r"([a-z]+\.example\.com)"
+
+
+def test_suggestions_compile(reBackend):
+    for source in (r"(?i)[a-z]+\.example\.com", r".*(foo)", r"(foo).*", r"(foo).*?", r"(?m)^x$"):
+        report = PatternReport("key")
+        regexp = re.compile(source)
+        analyze(report, regexp)
+        if report.suggestion is not None:
+            re.compile(report.suggestion.split("   (")[0], regexp.flags)
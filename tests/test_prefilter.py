@@ -0,0 +1,22 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Prefilter: literals found in one pass, shared by the scan workers.
+#
+
+from dataextractor_core.scanplan import Prefilter
+
+
+def test_compile_while_another_thread_empties_the_cache(reBackend):
+    prefilter = Prefilter(["alpha", "bravo", "charlie"], False)
+
+    class EmptiedCache(dict):
+        # another worker empties the cache right after the store
+        def __setitem__(self, key, value):
+            dict.__setitem__(self, key, value)
+            prefilter.cache = {}
+
+    prefilter.cache = EmptiedCache()
+    regexp = prefilter.compile(["bravo", "charlie"])
+    assert regexp.search("xx charlie").group(0) == "charlie"
@@ -0,0 +1,69 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Provenance: the urls of every data and the datas of every url, sampled
+# above maxUrls, the postings kept the same both ways.
+#
+
+from conftest import makeEngine
+from dataextractor_core.provenance import ProvenanceIndex
+
+
+def checkPostings(index):
+    n = sum([ len(postings) for postings in index.byValue ])
+    assert n == sum([ len(postings) for postings in index.byUrl ])
+    assert n == index.pairs
+
+
+def test_both_ways():
+    index = ProvenanceIndex(0)
+    index.addAll(["a: 1", "b: 2"], "https://x/1")
+    index.addAll(["a: 1"], "https://x/2")
+    # same pair twice
+    index.add("a: 1", "https://x/2")
+    assert index.urlsOf("a: 1") == ["https://x/1", "https://x/2"]
+    assert index.urlCount("a: 1") == 2
+    assert index.valuesOf("https://x/1") == ["a: 1", "b: 2"]
+    assert index.urlsOf("c: 3") == []
+    assert index.valuesOf("https://x/3") == []
+    checkPostings(index)
+
+
+def test_sample_above_max_urls():
+    index = ProvenanceIndex(5)
+    for i in range(1000):
+        index.addAll(["a: x", "b: %d" % (i % 50)], "https://x/%d" % i)
+    assert index.urlCount("a: x") == 1000
+    t_urls = index.urlsOf("a: x")
+    assert len(t_urls) == 5
+    assert len(set(t_urls)) == 5
+    for url in t_urls:
+        assert "a: x" in index.valuesOf(url)
+    # 20 urls each, a sample of 5
+    assert index.urlCount("b: 7") == 20
+    assert len(index.urlsOf("b: 7")) == 5
+    checkPostings(index)
+
+
+def test_discard_and_clear():
+    index = ProvenanceIndex(0)
+    index.addAll(["a: 1", "b: 2"], "https://x/1")
+    index.discard("b: 2")
+    index.discard("c: 3")
+    assert index.valuesOf("https://x/1") == ["a: 1"]
+    assert index.urlCount("b: 2") == 0
+    assert index.getStats()["datas"] == 1
+    checkPostings(index)
+    index.clear()
+    assert len(index) == 0
+    assert index.getStats()["pairs"] == 0
+
+
+def test_engine_records_the_urls(reBackend):
+    engine = makeEngine('{"tok": "(tok[0-9]+)"}', provenanceUrls=2)
+    extractor = engine.extractors[0]
+    for i in range(4):
+        extractor.dedup(["tok: tok1"], True, "https://x/%d.js" % i)
+    assert extractor.provenance.urlCount("tok: tok1") == 4
+    assert len(extractor.provenance.urlsOf("tok: tok1")) == 2
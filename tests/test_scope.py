@@ -0,0 +1,93 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Cache of the scope verdicts: keyed by as much of the url as Burp's scope
+# rules look at, the verdicts are the ones of isInScope() for every url.
+#
+
+import json
+
+from dataextractor_core.engine import ScanEngine
+from dataextractor_core.scope import ScopeCache, scopeDepth
+
+
+def scope(advanced, t_include):
+    return json.dumps({"target": {"scope": {"advanced_mode": advanced, "include": t_include, "exclude": []}}})
+
+
+ORIGIN = scope(True, [{"enabled": True, "host": "^x\\.com$", "port": "^443$", "protocol": "https", "file": ""}])
+FILE = scope(True, [{"enabled": True, "host": "x", "file": "^/api/.*"}])
+PREFIX = scope(False, [{"enabled": True, "prefix": "https://x.com/api/v"}, {"enabled": True, "prefix": "https://y.com/"}])
+
+
+def test_depth():
+    assert scopeDepth(ORIGIN) == 0
+    assert scopeDepth(FILE) is None
+    assert scopeDepth(PREFIX) == 2
+    # a disabled rule doesn't count
+    assert scopeDepth(scope(True, [{"enabled": False, "host": "x", "file": "^/a"}])) == 0
+    assert scopeDepth(scope(False, [{"enabled": True, "prefix": "https://x.com/?a=1"}])) is None
+    assert scopeDepth(None) is None
+    assert scopeDepth("not json") is None
+
+
+def test_keys():
+    cache = ScopeCache(100, 2)
+    assert cache.key("https://x.com/api/v1/a?b") == ("https", "x.com", 443, "/api/v1/")
+    assert cache.key("https://X.com:443/api/v1/c") == cache.key("https://x.com/api/v1/a")
+    assert cache.key("https://x.com/api") == ("https", "x.com", 443, "/api")
+    assert cache.key("http://x.com/") == ("http", "x.com", 80, "/")
+    cache.setDepth(0)
+    assert cache.key("https://x.com/a/b") == ("https", "x.com", 443)
+    cache.setDepth(None)
+    assert cache.key("https://x.com/a/b") == "https://x.com/a/b"
+
+
+def test_set_depth_empties():
+    cache = ScopeCache(100, 0)
+    cache.put("https://x.com/a", True)
+    assert cache.get("https://x.com/b") is True
+    cache.setDepth(1)
+    assert cache.get("https://x.com/a") is None
+    assert len(cache) == 0
+
+
+def checkVerdicts(config, t_urls, inScope):
+    t_calls = []
+
+    def callback(url):
+        t_calls.append( url )
+        return inScope(url)
+
+    engine = ScanEngine(callback)
+    engine.settings["scopeOnly"] = True
+    engine.setScope(config)
+    assert [ engine.checkScope(url) for url in t_urls ] == [ inScope(url) for url in t_urls ]
+    return len(t_calls)
+
+
+def test_verdicts_are_burp_ones():
+    t_urls = [ "https://x.com/api/v1/%d" % i for i in range(50) ]
+    t_urls = t_urls + [ "https://x.com/api/w/%d" % i for i in range(50) ]
+    t_urls = t_urls + [ "https://y.com/%d/z" % i for i in range(50) ]
+    t_urls = t_urls + [ "https://x.com/api/v1/%d" % i for i in range(50) ]
+
+    def inScope(url):
+        return url.startswith("https://x.com/api/v") or url.startswith("https://y.com/")
+
+    calls = checkVerdicts(PREFIX, t_urls, inScope)
+    # /api/v1/, /api/w/ and one per /N/ on y.com
+    assert calls == 52
+
+    def inFile(url):
+        return url.startswith("https://x.com/api/")
+
+    # the file regexp sees the whole path, no two urls share a verdict
+    assert checkVerdicts(FILE, t_urls, inFile) == 150
+
+
+def test_scope_off():
+    engine = ScanEngine(lambda url: False)
+    engine.settings["scopeOnly"] = False
+    assert engine.checkScope("https://x.com/")
@@ -0,0 +1,119 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Saved traffic: the dumps are streamed whatever the size of the reads, the
+# bulk mode finds what a single process finds, in the same order.
+#
+
+import json
+import base64
+
+import pytest
+
+from dataextractor_core import sources, cli
+from dataextractor_core.sources import iterInputs, iterTasks, iterTask, iterJsonArray
+
+
+BODIES = ["var k='tok%d';" % i + "x"*(i*37) for i in range(20)]
+
+
+def harEntry(i):
+    content = {"mimeType": "application/javascript", "text": BODIES[i]}
+    if i % 3 == 0:
+        content["text"] = base64.b64encode(BODIES[i].encode('latin-1')).decode('ascii')
+        content["encoding"] = "base64"
+    headers = [{"name": "Content-Type", "value": "application/javascript"}]
+    return {"request": {"url": "https://x/%d.js" % i}, "response": {"status": 200, "headers": headers, "content": content}}
+
+
+def writeHar(tmpdir):
+    har = {"log": {"comment": "\"entries\" before the array", "entries": [ harEntry(i) for i in range(20) ]}}
+    path = tmpdir.join("t.har")
+    path.write(json.dumps(har, indent=1))
+    return str(path)
+
+
+def writeJsonl(tmpdir):
+    t_lines = []
+    t_lines.append( json.dumps({"url": "https://y/1", "response": "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n<p>tok100</p>"}) )
+    t_lines.append( "" )
+    t_lines.append( "not json" )
+    t_lines.append( json.dumps({"url": "https://y/2", "status": 200, "headers": {"Content-Type": "text/plain"}, "body_base64": base64.b64encode(b"tok101 \xe9").decode('ascii')}) )
+    path = tmpdir.join("r.jsonl")
+    path.write("\n".join(t_lines)+"\n")
+    return str(path)
+
+
+def writeBurpXml(tmpdir):
+    raw = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\ntok200"
+    t_items = []
+    t_items.append( "<item><url><![CDATA[https://z/1]]></url><response base64=\"true\"><![CDATA[%s]]></response></item>" % base64.b64encode(raw.encode('latin-1')).decode('ascii') )
+    t_items.append( "<item><url><![CDATA[https://z/2]]></url><response base64=\"false\"><![CDATA[%s]]></response></item>" % raw.replace("tok200", "tok201") )
+    path = tmpdir.join("b.xml")
+    path.write("<?xml version=\"1.0\"?>\n<items burpVersion=\"2023\">" + "".join(t_items) + "</items>\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("readSize", [7, 64, 1024*1024])
+def test_har_streamed(tmpdir, monkeypatch, readSize):
+    monkeypatch.setattr(sources, "READ_SIZE", readSize)
+    t_responses = list(iterInputs([writeHar(tmpdir)]))
+    assert [ str(resp.getUrl()) for resp in t_responses ] == [ "https://x/%d.js" % i for i in range(20) ]
+    assert [ resp.getBody() for resp in t_responses ] == BODIES
+    assert t_responses[0].getStatusCode() == 200
+    assert "Content-Type: application/javascript" in t_responses[0].getHeaders()
+
+
+def test_json_array_key_cut_by_the_reads(tmpdir, monkeypatch):
+    monkeypatch.setattr(sources, "READ_SIZE", 3)
+    path = tmpdir.join("a.json")
+    path.write('{"entries": "x", "other": [1], "entries" :\n [ {"a": 1}, {"b": [2, 3]} ] }')
+    with open(str(path), 'rb') as fp:
+        assert list(iterJsonArray(fp, "entries")) == [{"a": 1}, {"b": [2, 3]}]
+
+
+def test_mmap_same_as_read(tmpdir, monkeypatch):
+    t_paths = [writeHar(tmpdir), writeJsonl(tmpdir), writeBurpXml(tmpdir)]
+    t_read = [ (resp.getUrl(), resp.getHeaders(), resp.getBody()) for resp in iterInputs(t_paths) ]
+    monkeypatch.setattr(sources, "MMAP_THRESHOLD", 0)
+    t_mapped = [ (resp.getUrl(), resp.getHeaders(), resp.getBody()) for resp in iterInputs(t_paths) ]
+    assert t_mapped == t_read
+
+
+def test_jsonl_and_burp_xml(tmpdir):
+    t_responses = list(iterInputs([writeJsonl(tmpdir), writeBurpXml(tmpdir)]))
+    assert [ str(resp.getUrl()) for resp in t_responses ] == ["https://y/1", "https://y/2", "https://z/1", "https://z/2"]
+    assert t_responses[0].getBody() == "<p>tok100</p>"
+    # one char per byte
+    assert t_responses[1].getBody() == u"tok101 \xe9"
+    assert t_responses[2].getBody() == "tok200"
+    assert t_responses[3].getBody() == "tok201"
+
+
+def test_tasks_in_input_order(tmpdir):
+    tmpdir.mkdir("d").join("a.js").write("tok300")
+    t_paths = [writeHar(tmpdir), str(tmpdir.join("d")), writeJsonl(tmpdir)]
+    t_tasks = list(iterTasks(t_paths, 512))
+    assert t_tasks[0][0] == "responses"
+    assert len([ task for task in t_tasks if task[0] == "file" ]) == 1
+    t_urls = [ str(resp.getUrl()) for task in t_tasks for resp in iterTask(task) ]
+    assert t_urls == [ str(resp.getUrl()) for resp in iterInputs(t_paths) ]
+
+
+def scanOutput(tmpdir, jobs):
+    config = tmpdir.join("c.json")
+    config.write(json.dumps({"tok": "(tok[0-9]+)"}))
+    t_paths = [writeHar(tmpdir), writeJsonl(tmpdir), writeBurpXml(tmpdir), writeHar(tmpdir)]
+    args = cli.parseArgs(["-c", str(config), "-j", str(jobs)] + t_paths)
+    engine = cli.buildEngine(args)
+    return [ (extractor.name, line) for extractor, t_lines in cli.scanInputs(engine, args) for line in t_lines ]
+
+
+def test_bulk_is_a_single_process_run(tmpdir, monkeypatch):
+    monkeypatch.setattr(cli.bulk, "BULK_BATCH_SIZE", 256)
+    t_single = scanOutput(tmpdir, 1)
+    assert len(t_single) == 24
+    # the second HAR only brings duplicates
+    assert len(set(t_single)) == 24
+    assert scanOutput(tmpdir, 2) == t_single
@@ -0,0 +1,28 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Stage timings: the url checks are timed whether they pass or reject.
+#
+
+from conftest import makeEngine
+
+
+def stageCounts(engine):
+    t_stages = engine.getStats()["stages"]
+    return dict([ (stage, t_stages[stage]["count"]) for stage in ("checkScope", "checkExtension", "checkFile") ])
+
+
+def test_rejects_are_timed(reBackend):
+    engine = makeEngine('{"a": "(a)"}', ignoreFiles='["/logout"]')
+    assert engine.checkUrl("https://x/a.js")
+    assert not engine.checkUrl("https://x/a.png")
+    assert not engine.checkUrl("https://x/logout")
+    assert stageCounts(engine) == {"checkScope": 3, "checkExtension": 3, "checkFile": 2}
+
+
+def test_out_of_scope_is_timed(reBackend):
+    engine = makeEngine('{"a": "(a)"}', scopeOnly=True)
+    engine.inScope = lambda url: False
+    assert not engine.checkUrl("https://x/a.js")
+    assert stageCounts(engine) == {"checkScope": 1, "checkExtension": 0, "checkFile": 0}
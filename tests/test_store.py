@@ -0,0 +1,71 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# NDJSON store of the datas: segments, window, removed datas, exports.
+#
+
+import json
+
+from dataextractor_core import store as storeModule
+from dataextractor_core.store import ResultStore, reverseLines
+from dataextractor_core.config import defaultSettings
+
+
+def fill(store, n, start=0):
+    for i in range(start, start+n):
+        store.add("k: value%d" % i, "k", "https://x.test/%d" % i, 1000+i)
+
+
+def test_memory_only_by_default():
+    assert defaultSettings()["storeDirectory"] == ""
+
+
+def test_reverse_lines(tmp_path):
+    filename = str(tmp_path / "f")
+    with open(filename, "w") as fp:
+        fp.write("a\nbb\n" + "c"*100 + "\nd")
+    assert list(reverseLines(filename, 7)) == [b"d", b"c"*100, b"bb", b"a"]
+
+
+def test_segments_and_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(storeModule, "STORE_SEGMENT_SIZE", 1024)
+    monkeypatch.setattr(storeModule, "STORE_BATCH_SIZE", 10)
+    store = ResultStore(str(tmp_path))
+    fill(store, 200)
+    store.flush()
+    assert len(store.segments()) > 5
+    assert store.tail(3) == ["k: value197", "k: value198", "k: value199"]
+    assert store.tail(2, lambda r: r.endswith("5")) == ["k: value185", "k: value195"]
+    assert len(store.tail(1000)) == 200
+    assert list(store.iterValues()) == [ "k: value%d" % i for i in range(200) ]
+    # read back from the disk
+    store.close()
+    assert ResultStore(str(tmp_path)).tail(1) == ["k: value199"]
+
+
+def test_delete_and_found_again(tmp_path):
+    store = ResultStore(str(tmp_path))
+    fill(store, 5)
+    store.delete("k: value4")
+    store.delete("k: value1")
+    assert store.tail(3) == ["k: value0", "k: value2", "k: value3"]
+    # found again after its removal: the newest one
+    store.add("k: value1", "k", "https://x.test/again", 2000)
+    assert store.tail(2) == ["k: value3", "k: value1"]
+    assert list(store.iterValues()) == ["k: value0", "k: value2", "k: value3", "k: value1"]
+
+
+def test_export(tmp_path):
+    store = ResultStore(str(tmp_path / "store"))
+    fill(store, 2)
+    store.seen("k: value0", 5000)
+    filename = str(tmp_path / "out.json")
+    assert store.export(filename, "json") == 2
+    with open(filename) as fp:
+        t_items = json.load(fp)
+    assert [ (item["value"], item["firstSeen"], item["lastSeen"]) for item in t_items ] == [("k: value0", 1000, 5000), ("k: value1", 1001, 1001)]
+    filename = str(tmp_path / "out.csv")
+    store.export(filename, "csv")
+    with open(filename) as fp:
+        assert fp.read().splitlines()[1] == "k: value0,k,https://x.test/0,1000,5000"
@@ -0,0 +1,75 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Time budget of the patterns: java is stopped during the search, re between
+# two matches, the patterns quarantined after repeated overruns only.
+#
+
+import json
+import time
+
+from conftest import makeEngine
+from dataextractor_core import javaregex
+from dataextractor_core.response import Response
+from dataextractor_core.lint import lintPatterns
+
+
+HEADERS = "HTTP/1.1 200 OK\r\nContent-Type: application/javascript\r\n\r\n"
+# quadratic on a long line without quotes, minutes for 2 MB
+SLOW = r"url\s*[:=].*['](.*?)[']"
+
+
+def scanOnce(engine, body, url="https://x/a.js"):
+    return engine.extract(Response(url, HEADERS, body))
+
+
+def test_java_search_is_stopped(javaBackend):
+    engine = makeEngine(json.dumps({"slow": SLOW}), patternTimeout=50, quarantineAfter=2)
+    extractor = engine.extractors[0]
+    start = time.time()
+    scanOnce(engine, "url=a,"*400000)
+    assert time.time()-start < 5
+    assert extractor.timeouts == {"slow": 1}
+    scanOnce(engine, "url=b,"*400000, "https://x/b.js")
+    assert "slow" in extractor.quarantined
+
+
+def test_java_guard_only_risky(javaBackend, monkeypatch):
+    t_guarded = []
+    DeadlineSequence = javaregex.DeadlineSequence
+
+    class CountedSequence(DeadlineSequence):
+        def __init__(self, text, deadline):
+            DeadlineSequence.__init__(self, text, deadline)
+            t_guarded.append( text )
+
+    monkeypatch.setattr(javaregex, "DeadlineSequence", CountedSequence)
+    engine = makeEngine(json.dumps({"plain": "(tok[0-9]+)", "slow": SLOW}), patternTimeout=1000)
+    t_results = scanOnce(engine, "tok1 url=a,'b'")
+    assert sorted(t_results["1"]) == ["plain: tok1", "slow: b"]
+    # the .* of slow only
+    assert len(t_guarded) == 1
+    # plain went over the budget once, it's guarded from now on
+    engine.extractors[0].timeouts["plain"] = 1
+    scanOnce(engine, "tok2 url=b,'c'", "https://x/b.js")
+    assert len(t_guarded) == 3
+
+
+def test_re_budget_between_matches(reBackend):
+    engine = makeEngine('{"a": "(a)"}', patternTimeout=1)
+    t_results = scanOnce(engine, "a"*1000000)
+    assert engine.extractors[0].timeouts == {"a": 1}
+    assert len(t_results.get("1", [])) < 1000000
+
+
+def test_backtracking_only_flagged_on_re(reBackend):
+    engine = makeEngine('{"nested": "((a+)+c)", "ok": "(a+b)"}')
+    extractor = engine.extractors[0]
+    # quarantined after timeouts only, the patterns check warns
+    assert extractor.quarantined == set()
+    t_reports = dict([ (report.key, report) for report in lintPatterns(extractor.getPatterns()) ])
+    assert t_reports["nested"].nested
+    assert not t_reports["ok"].nested
+    t_results = scanOnce(engine, "aac ab")
+    assert sorted(t_results["1"]) == ["nested: aac", "ok: ab"]
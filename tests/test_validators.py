@@ -0,0 +1,91 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Validators: a 304 has nothing to grep, a response with the ETag or
+# Last-Modified of the last one scanned on its url is replayed unread.
+#
+
+import json
+
+from conftest import makeEngine
+from dataextractor_core.response import Response, parseValidators
+
+
+URL = "https://x/a.js"
+STATUS = "HTTP/1.1 200 OK\r\nContent-Type: application/javascript\r\n"
+NOT_MODIFIED = "HTTP/1.1 304 Not Modified\r\nETag: \"v1\"\r\n\r\n"
+
+
+def headers(validator, length=9):
+    return STATUS + validator + "\r\nContent-Length: " + str(length) + "\r\n\r\n"
+
+
+class CountedResponse(Response):
+    """Response counting the reads of its body by the regexps."""
+
+    def __init__(self, url, headers, body):
+        Response.__init__(self, url, headers, body)
+        self.sequences = 0
+
+    def getBodySequence(self):
+        self.sequences = self.sequences + 1
+        return Response.getBodySequence(self)
+
+
+def scan(engine, t_headers, body):
+    resp = CountedResponse(URL, t_headers, body)
+    return engine.extract(resp), resp.sequences
+
+
+def test_parse():
+    assert parseValidators("ETag: \"v1\"\r\nContent-Length: 12\r\n") == ('"v1"', None, "12")
+    assert parseValidators("last-modified:  Mon, 01 Jan 2024 00:00:00 GMT\r\n") == (None, "Mon, 01 Jan 2024 00:00:00 GMT", None)
+    # a Content-Length alone says nothing about the body
+    assert parseValidators("Content-Length: 12\r\n") is None
+    assert parseValidators(None) is None
+
+
+def test_not_modified(javaBackend):
+    engine = makeEngine('{"a": "(foo[0-9]+)"}')
+    assert engine.extract(Response(URL, NOT_MODIFIED, "")) == {}
+    assert engine.getStats()["validators"]["notModified"] == 1
+
+
+def test_same_etag_is_replayed(javaBackend):
+    engine = makeEngine('{"a": "(foo[0-9]+)"}')
+    t_results, reads = scan(engine, headers("ETag: \"v1\""), "foo1 foo2")
+    assert t_results == {"1": ["a: foo1", "a: foo2"]}
+    assert reads == 1
+    # same validators: the body isn't grepped, even if it says otherwise
+    t_results, reads = scan(engine, headers("ETag: \"v1\""), "foo3 foo4")
+    assert t_results == {"1": ["a: foo1", "a: foo2"]}
+    assert reads == 0
+    t_validators = engine.getStats()["validators"]
+    assert t_validators["unchanged"] == 1
+    assert t_validators["bytes"] == 9
+    # new ETag, new results
+    t_results, reads = scan(engine, headers("ETag: \"v2\""), "foo3 foo4")
+    assert t_results == {"1": ["a: foo3", "a: foo4"]}
+    assert reads == 1
+
+
+def test_last_modified_and_length(javaBackend):
+    engine = makeEngine('{"a": "(foo[0-9]+)"}')
+    date = "Last-Modified: Mon, 01 Jan 2024 00:00:00 GMT"
+    scan(engine, headers(date), "foo1 foo2")
+    t_results, reads = scan(engine, headers(date), "foo1 foo2")
+    assert reads == 0
+    # another length is another body
+    t_results, reads = scan(engine, headers(date, 14), "foo1 foo2 foo5")
+    assert t_results == {"1": ["a: foo1", "a: foo2", "a: foo5"]}
+    assert reads == 1
+
+
+def test_ignored_when_patterns_read_the_headers(javaBackend):
+    config = json.dumps({"a": "(foo[0-9]+)", "etag": {"regexp": "ETag: (\"[^\"]+\")", "headers": True}})
+    engine = makeEngine(config)
+    scan(engine, headers("ETag: \"v1\""), "foo1 foo2")
+    t_results, reads = scan(engine, headers("ETag: \"v1\""), "foo3 foo4")
+    assert sorted(t_results["1"]) == ["a: foo3", "a: foo4", "etag: \"v1\""]
+    assert engine.getStats()["validators"]["unchanged"] == 0
@@ -0,0 +1,127 @@
+#
+# DataExtractor - Find datas within (almost) ALL files.
+# Copyright (c) 2021 Gwendal Le Coguic
+#
+# Scan pool: what happens to a response when the queue is full (block, drop
+# or spill to disk), and the spill file itself.
+#
+
+import os
+import time
+import threading
+
+from dataextractor_core.config import defaultSettings
+from dataextractor_core.response import Response
+from dataextractor_core.workers import ScanPool, SpillFile, POLICY_BLOCK, POLICY_DROP, POLICY_SPILL
+
+
+HEADERS = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
+
+
+def response(i):
+    return Response("https://x/%d" % i, HEADERS, "body %d \xe9" % i)
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class Handler():
+    """Hold the first response until released, record the urls scanned."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.urls = []
+
+    def __call__(self, resp):
+        self.release.wait(5)
+        self.urls.append( str(resp.getUrl()) )
+
+
+def fullPool(policy, tmpdir=None):
+    """One worker busy on response 0, response 1 in the queue of 1."""
+    handler = Handler()
+    pool = ScanPool(handler, 1, 1, policy, tmpdir)
+    assert pool.submit(response(0))
+    assert waitFor(lambda: pool.busy == 1)
+    assert pool.submit(response(1))
+    return handler, pool
+
+
+def test_block_waits_for_a_free_slot():
+    handler, pool = fullPool(POLICY_BLOCK)
+    t_submitted = []
+    t = threading.Thread(target=lambda: t_submitted.append(pool.submit(response(2))))
+    t.start()
+    time.sleep(0.2)
+    assert t_submitted == []
+    handler.release.set()
+    t.join(5)
+    assert t_submitted == [True]
+    assert waitFor(lambda: pool.getStats()["processed"] == 3)
+    assert handler.urls == ["https://x/0", "https://x/1", "https://x/2"]
+    assert pool.shutdown() == 0
+
+
+def test_drop_when_full():
+    handler, pool = fullPool(POLICY_DROP)
+    assert not pool.submit(response(2))
+    assert pool.getStats()["dropped"] == 1
+    handler.release.set()
+    assert waitFor(lambda: pool.getStats()["processed"] == 2)
+    assert handler.urls == ["https://x/0", "https://x/1"]
+    pool.shutdown()
+
+
+def test_spill_when_full(tmpdir):
+    handler, pool = fullPool(POLICY_SPILL, str(tmpdir))
+    for i in range(2, 6):
+        assert pool.submit(response(i))
+    assert pool.spilled == 4
+    assert pool.depth() == 5
+    handler.release.set()
+    assert waitFor(lambda: pool.getStats()["processed"] == 6)
+    assert sorted(handler.urls) == [ "https://x/%d" % i for i in range(6) ]
+    filename = pool.spill.filename
+    assert pool.shutdown() == 0
+    assert not os.path.exists(filename)
+
+
+def test_shutdown_cancels_what_is_left(tmpdir):
+    handler, pool = fullPool(POLICY_SPILL, str(tmpdir))
+    pool.submit(response(2))
+    pool.submit(response(3))
+    threading.Timer(0.3, handler.release.set).start()
+    # the worker can't drain the queue within the timeout
+    cancelled = pool.shutdown(0)
+    assert cancelled + len(handler.urls) == 4
+
+
+def test_spill_file(tmpdir):
+    spill = SpillFile(str(tmpdir))
+    assert spill.pop() is None
+    spill.push(response(1))
+    spill.push(response(2))
+    assert len(spill) == 2
+    resp = spill.pop()
+    assert str(resp.getUrl()) == "https://x/1"
+    assert resp.getBody() == response(1).getBody()
+    assert resp.getHeaders() == response(1).getHeaders()
+    assert str(spill.pop().getUrl()) == "https://x/2"
+    assert spill.pop() is None
+    # emptied, written again from the start
+    assert os.path.getsize(spill.filename) == 0
+    spill.push(response(3))
+    assert str(spill.pop().getUrl()) == "https://x/3"
+    spill.close()
+    assert not os.path.exists(spill.filename)
+
+
+def test_spill_by_default():
+    pool = ScanPool(Handler())
+    assert pool.policy == POLICY_SPILL
+    assert defaultSettings()["queuePolicy"] == POLICY_SPILL
+    pool.shutdown()